@@ -0,0 +1,6 @@
+-- The ivfflat index from 001 was built on an empty table, so its list
+-- centroids are meaningless and recall degrades as rows arrive. Vector
+-- indexes are now built after bulk load with:
+--   python -m patent_mvp index build --type hnsw
+-- (or --type ivfflat, with lists sized to the row count).
+DROP INDEX IF EXISTS idx_chunks_embedding;
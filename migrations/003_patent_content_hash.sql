@@ -0,0 +1,4 @@
+-- Hash of the parsed patent record, written with every patent upsert.
+-- Incremental ingest compares it to skip rewriting unchanged patents;
+-- rows from before this migration have NULL and are rewritten once.
+ALTER TABLE patents ADD COLUMN IF NOT EXISTS content_hash TEXT;
@@ -0,0 +1,4 @@
+-- Embedding namespace (model, revision, normalize flag) of each stored
+-- vector. Incremental ingest reuses a chunk only if it matches the current
+-- embedder; rows from before this migration have NULL and are re-embedded once.
+ALTER TABLE evidence_chunks ADD COLUMN IF NOT EXISTS embedding_namespace TEXT;
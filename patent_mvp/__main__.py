@@ -2,13 +2,23 @@ from __future__ import annotations
 
 import argparse
 import json
+from pathlib import Path
 
+from patent_mvp.bench import WRITER_MODES, bench_ingest, bench_parse, bench_search
 from patent_mvp.config import SETTINGS
-from patent_mvp.embeddings import SentenceTransformerProvider
-from patent_mvp.ingest import run_ingest
+from patent_mvp.downloader import PTGRXMLDownloader
+from patent_mvp.columnar import ColumnarStore
+from patent_mvp.embeddings import EXPECTED_EMBED_DIM, SentenceTransformerProvider, open_embedding_cache
+from patent_mvp.ingest import StageWorkers, run_ingest
 from patent_mvp.logging_utils import configure_logging
-from patent_mvp.search import hybrid_search
+from patent_mvp.metrics import export_metrics
+from patent_mvp.query_cache import open_query_cache
+from patent_mvp.reindex import REINDEX_SOURCES, REINDEX_TARGETS, run_reindex
+from patent_mvp.search import hybrid_search, hybrid_search_batch
+from patent_mvp.service import serve
 from patent_mvp.storage import OpenSearchStore, PostgresStore
+from patent_mvp.synthetic import SCHEMA_VARIANTS
+from patent_mvp.vector_index import VECTOR_BACKENDS, LocalVectorIndex, open_vector_index, vector_index_dir
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -19,13 +29,132 @@ def build_parser() -> argparse.ArgumentParser:
     ingest.add_argument("--weeks", type=int, default=12)
     ingest.add_argument("--cpc", default="G06F")
     ingest.add_argument("--since-last", action="store_true")
+    ingest.add_argument("--parse-workers", type=int, default=1, help="Processes used to parse each weekly file")
+    ingest.add_argument(
+        "--download-workers", type=int, default=SETTINGS.download_workers, help="Weeks downloaded concurrently (default DOWNLOAD_WORKERS)"
+    )
+    ingest.add_argument("--parse-weeks", type=int, default=1, help="Weeks parsed concurrently")
+    ingest.add_argument("--chunk-workers", type=int, default=2)
+    ingest.add_argument("--embed-workers", type=int, default=1)
+    ingest.add_argument("--write-workers", type=int, default=2, help="Threads writing chunk batches to Postgres/OpenSearch")
+    ingest.add_argument("--queue-size", type=int, default=4, help="Batches buffered between pipeline stages")
+    ingest.add_argument(
+        "--reprocess",
+        action="store_true",
+        help="Rewrite and re-embed every patent and chunk instead of only new or changed ones (e.g. after a model change)",
+    )
+    ingest.add_argument(
+        "--columnar",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Also write Arrow IPC patents/chunks/embeddings per week under data/derived/columnar (default COLUMNAR_ENABLED)",
+    )
+
+    sub.add_parser("ingest-status", help="Processed weeks and per-stage batch checkpoints of interrupted weeks")
+
+    reindex = sub.add_parser(
+        "reindex", help="Rebuild Postgres/OpenSearch from local chunk files and the embedding cache (no download, parse or model)"
+    )
+    reindex.add_argument("--weeks", nargs="+", help="Week ids (YYYYMMDD); default every week with local chunk files")
+    reindex.add_argument("--targets", nargs="+", choices=REINDEX_TARGETS, default=list(REINDEX_TARGETS))
+    reindex.add_argument(
+        "--source", choices=REINDEX_SOURCES, default="auto", help="auto prefers a week's columnar files over its chunk JSONL"
+    )
+    reindex.add_argument("--read-workers", type=int, default=2, help="Weeks read concurrently")
+    reindex.add_argument("--write-workers", type=int, default=2, help="Threads writing batches to the stores")
+    reindex.add_argument("--queue-size", type=int, default=4)
+    reindex.add_argument("--batch-size", type=int, help="Patents per write batch (default INGEST_BATCH_SIZE)")
+    reindex.add_argument(
+        "--recreate-index", action="store_true", help="Drop and recreate the OpenSearch index first (e.g. after a mapping change)"
+    )
+
+    download = sub.add_parser("download", help="Prefetch weekly PTGRXML zips concurrently without ingesting")
+    download.add_argument("--weeks", type=int, default=12)
+    download.add_argument("--since-last", action="store_true")
+    download.add_argument("--workers", type=int, help="Weeks downloaded concurrently (default DOWNLOAD_WORKERS)")
+    download.add_argument("--segments", type=int, help="Parallel byte-range segments per file (default DOWNLOAD_SEGMENTS)")
 
     search = sub.add_parser("search", help="Hybrid chunk search")
-    search.add_argument("--query", required=True)
+    query_src = search.add_mutually_exclusive_group(required=True)
+    query_src.add_argument("--query")
+    query_src.add_argument("--queries-file", help="Text file with one query per line, searched as a single batch")
     search.add_argument("--topk", type=int, default=50)
     search.add_argument("--topk-bm25", type=int, default=200)
     search.add_argument("--topk-vec", type=int, default=200)
     search.add_argument("--graph-expand", action="store_true")
+    search.add_argument("--ef-search", type=int, help="hnsw.ef_search for this query (default VECTOR_EF_SEARCH)")
+    search.add_argument("--probes", type=int, help="ivfflat.probes for this query (default VECTOR_PROBES)")
+    search.add_argument("--no-cache", action="store_true", help="Bypass the query result cache")
+    search.add_argument("--timeout-bm25", type=float, help="Seconds before the BM25 leg is dropped (default SEARCH_BM25_TIMEOUT)")
+    search.add_argument("--timeout-vec", type=float, help="Seconds before the vector leg is dropped (default SEARCH_VECTOR_TIMEOUT)")
+    search.add_argument(
+        "--vector-backend", choices=VECTOR_BACKENDS, help="pgvector or the exact local index built by `index build-local` (default VECTOR_BACKEND)"
+    )
+
+    index = sub.add_parser("index", help="Build or inspect the pgvector index on evidence_chunks")
+    index_sub = index.add_subparsers(dest="index_cmd", required=True)
+    index_sub.add_parser("status", help="Embedded row count, recommended IVF lists and current vector indexes")
+    build = index_sub.add_parser("build", help="(Re)build the vector index after bulk load")
+    build.add_argument("--type", choices=["hnsw", "ivfflat"], default="hnsw")
+    build.add_argument("--m", type=int, default=16, help="HNSW max connections per layer")
+    build.add_argument("--ef-construction", type=int, default=64, help="HNSW candidate list size while building")
+    build.add_argument("--lists", type=int, help="IVF list count (default: sized to the embedded row count)")
+    build.add_argument("--concurrently", action="store_true", help="Build without blocking writes (slower)")
+    build.add_argument("--maintenance-work-mem", help="Override VECTOR_INDEX_MAINTENANCE_WORK_MEM for the build")
+    build_local = index_sub.add_parser("build-local", help="Export embeddings into the exact in-process vector index")
+    build_local.add_argument("--source", choices=["postgres", "columnar"], default="postgres")
+    build_local.add_argument("--weeks", nargs="+", help="Columnar weeks to include (default all)")
+    build_local.add_argument("--out", help="Index directory (default VECTOR_INDEX_DIR or data/vector_index)")
+
+    bench = sub.add_parser("bench", help="Benchmarks; prints JSON results")
+    bench.add_argument("suite", choices=["search", "ingest", "parse"])
+    bench.add_argument("--backend", choices=["memory", "live"], default="memory", help="In-memory stand-ins or the configured services")
+    bench.add_argument("--chunks", type=int, default=20_000, help="Synthetic corpus size (memory backend)")
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--queries-file", help="One query per line (required for the live backend)")
+    bench.add_argument("--dim", type=int, default=256, help="Hashing-embedder dimension (memory backend)")
+    bench.add_argument("--lists", type=int, default=0, help="IVF lists for the in-memory vector index (0 = exact)")
+    bench.add_argument("--probes", type=int, default=1)
+    bench.add_argument("--ef-search", type=int)
+    bench.add_argument("--topk", type=int, default=10)
+    bench.add_argument("--topk-bm25", type=int, default=200)
+    bench.add_argument("--topk-vec", type=int, default=200)
+    bench.add_argument("--no-graph-expand", action="store_true")
+    bench.add_argument(
+        "--exact-baseline",
+        choices=["seqscan", "local"],
+        default="seqscan",
+        help="Live recall baseline: pgvector with index scans off, or the local exact index (`index build-local`)",
+    )
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument("--output", help="Also write the JSON report to this file")
+    bench.add_argument("--patents", type=int, default=1000, help="Synthetic grants in the generated week (ingest, parse)")
+    bench.add_argument("--schema", choices=SCHEMA_VARIANTS, default="mixed", help="Grant XML layout to generate (ingest, parse)")
+    bench.add_argument("--claims", type=int, nargs=2, default=[10, 25], metavar=("MIN", "MAX"))
+    bench.add_argument("--paragraphs", type=int, nargs=2, default=[20, 60], metavar=("MIN", "MAX"), help="Description paragraphs per grant")
+    bench.add_argument("--words", type=int, nargs=2, default=[40, 160], metavar=("MIN", "MAX"), help="Words per paragraph")
+    bench.add_argument("--cpc-mix", help="Comma-separated CPC weights, e.g. G06F=0.6,H04L=0.4 (ingest)")
+    bench.add_argument("--cpc", help="CPC prefix filter applied while parsing (ingest)")
+    bench.add_argument("--parse-workers", type=int, default=1)
+    bench.add_argument("--writer", choices=WRITER_MODES, default="bulk", help="bulk = COPY merges, rows = per-row upserts")
+    bench.add_argument("--batch-size", type=int, default=256, help="Rows per Postgres write (ingest)")
+    bench.add_argument("--embedding-batch-size", type=int, default=64)
+    bench.add_argument("--os-threads", type=int, default=1, help="OpenSearch bulk threads (ingest)")
+    bench.add_argument("--trace-memory", action="store_true", help="Per-stage peak Python allocations via tracemalloc (slower)")
+    bench.add_argument("--repeat", type=int, default=3, help="Runs per parser engine; the best is reported (parse)")
+
+    serve = sub.add_parser("serve", help="Long-running HTTP search service with a warm model and pools")
+    serve.add_argument("--host", help="Bind address (default SERVE_HOST)")
+    serve.add_argument("--port", type=int, help="Bind port (default SERVE_PORT)")
+    serve.add_argument("--threads", type=int, help="Threads running blocking search calls (default SERVE_THREADS)")
+
+    cache = sub.add_parser("cache", help="Inspect or prune the embedding cache")
+    cache_sub = cache.add_subparsers(dest="cache_cmd", required=True)
+    cache_sub.add_parser("stats", help="Entry counts, size and hit/miss/eviction counters per model namespace")
+    prune = cache_sub.add_parser("prune", help="Evict cache entries")
+    prune.add_argument("--max-entries", type=int, help="Evict least-recently-used entries down to this many")
+    prune.add_argument("--drop-namespace", action="append", default=[], help="Evict every entry of a namespace")
+    prune.add_argument("--drop-stale", action="store_true", help="Evict namespaces other than the configured model's")
     return parser
 
 
@@ -34,15 +163,39 @@ def main() -> None:
     args = build_parser().parse_args()
 
     if args.cmd == "ingest":
-        run_ingest(weeks=args.weeks, cpc_prefix=args.cpc, since_last=args.since_last)
+        run_ingest(
+            weeks=args.weeks,
+            cpc_prefix=args.cpc,
+            since_last=args.since_last,
+            parse_workers=args.parse_workers,
+            stage_workers=StageWorkers(
+                download=args.download_workers,
+                parse=args.parse_weeks,
+                chunk=args.chunk_workers,
+                embed=args.embed_workers,
+                write=args.write_workers,
+            ),
+            queue_size=args.queue_size,
+            reprocess=args.reprocess,
+            columnar=args.columnar,
+        )
+        return
+
+    if args.cmd == "download":
+        downloader = PTGRXMLDownloader(data_root=SETTINGS.data_root, download_workers=args.workers, segments=args.segments)
+        selected = downloader.select_weeks(weeks=args.weeks, since_last=args.since_last)
+        paths = downloader.download_weeks(selected)
+        export_metrics()
+        print(json.dumps({week_date: str(path) for week_date, path in paths}, indent=2))
         return
 
     if args.cmd == "search":
-        pg = PostgresStore(SETTINGS.postgres_dsn)
-        os_store = OpenSearchStore(SETTINGS.opensearch_url, SETTINGS.opensearch_index)
+        pg = PostgresStore(SETTINGS.postgres_dsn, pooled=SETTINGS.pg_pool_enabled, search_timeout=args.timeout_vec)
+        os_store = OpenSearchStore(SETTINGS.opensearch_url, SETTINGS.opensearch_index, search_timeout=args.timeout_bm25)
         embedder = SentenceTransformerProvider(SETTINGS.embedding_model)
-        out = hybrid_search(
-            query=args.query,
+        query_cache = None if args.no_cache else open_query_cache()
+        vector_index = open_vector_index(args.vector_backend)
+        params = dict(
             embedder=embedder,
             pg=pg,
             os_store=os_store,
@@ -50,8 +203,148 @@ def main() -> None:
             topk_bm25=args.topk_bm25,
             topk_vec=args.topk_vec,
             graph_expand=args.graph_expand,
+            timeout_bm25=args.timeout_bm25,
+            timeout_vec=args.timeout_vec,
+            cache=query_cache,
+            ef_search=args.ef_search,
+            probes=args.probes,
+            vector_index=vector_index,
+        )
+        try:
+            if args.queries_file:
+                queries = [q.strip() for q in Path(args.queries_file).read_text().splitlines() if q.strip()]
+                results = hybrid_search_batch(queries=queries, **params)
+                out = [{"query": q, **r} for q, r in zip(queries, results)]
+            else:
+                out = hybrid_search(query=args.query, **params)
+        finally:
+            pg.close()
+            if query_cache is not None:
+                query_cache.close()
+            export_metrics()
+        print(json.dumps(out, indent=2))
+        return
+
+    if args.cmd == "reindex":
+        out = run_reindex(
+            weeks=args.weeks,
+            targets=args.targets,
+            source=args.source,
+            read_workers=args.read_workers,
+            write_workers=args.write_workers,
+            queue_size=args.queue_size,
+            batch_size=args.batch_size,
+            recreate_index=args.recreate_index,
         )
         print(json.dumps(out, indent=2))
+        return
+
+    if args.cmd == "index" and args.index_cmd == "build-local":
+        if args.source == "columnar":
+            local = LocalVectorIndex.from_columnar(ColumnarStore(Path(SETTINGS.data_root) / "derived" / "columnar"), args.weeks)
+        else:
+            pg = PostgresStore(SETTINGS.postgres_dsn)
+            local = LocalVectorIndex.from_rows(pg.iter_embeddings(), dim=EXPECTED_EMBED_DIM)
+        out_dir = local.save(args.out or vector_index_dir())
+        print(json.dumps({"path": str(out_dir), **local.describe()}, indent=2))
+        return
+
+    if args.cmd == "index":
+        pg = PostgresStore(SETTINGS.postgres_dsn)
+        if args.index_cmd == "build":
+            out = pg.build_vector_index(
+                kind=args.type,
+                m=args.m,
+                ef_construction=args.ef_construction,
+                lists=args.lists,
+                concurrently=args.concurrently,
+                maintenance_work_mem=args.maintenance_work_mem,
+            )
+        else:
+            out = pg.vector_index_info()
+        print(json.dumps(out, indent=2))
+        return
+
+    if args.cmd == "bench":
+        if args.suite == "parse":
+            report = bench_parse(
+                patents=args.patents,
+                schema=args.schema,
+                claims=tuple(args.claims),
+                description_paragraphs=tuple(args.paragraphs),
+                words_per_paragraph=tuple(args.words),
+                repeat=args.repeat,
+                seed=args.seed,
+            )
+        elif args.suite == "ingest":
+            cpc_mix = None
+            if args.cpc_mix:
+                cpc_mix = {code.strip(): float(weight) for code, _, weight in (item.partition("=") for item in args.cpc_mix.split(","))}
+            report = bench_ingest(
+                patents=args.patents,
+                schema=args.schema,
+                claims=tuple(args.claims),
+                description_paragraphs=tuple(args.paragraphs),
+                words_per_paragraph=tuple(args.words),
+                cpc_mix=cpc_mix,
+                cpc_prefix=args.cpc,
+                parse_workers=args.parse_workers,
+                writer=args.writer,
+                batch_size=args.batch_size,
+                embedding_batch_size=args.embedding_batch_size,
+                os_threads=args.os_threads,
+                dim=args.dim,
+                seed=args.seed,
+                trace_memory=args.trace_memory,
+            )
+        else:
+            report = bench_search(
+                backend=args.backend,
+                chunks=args.chunks,
+                queries=args.queries,
+                queries_file=args.queries_file,
+                dim=args.dim,
+                lists=args.lists,
+                probes=args.probes,
+                ef_search=args.ef_search,
+                topk=args.topk,
+                topk_bm25=args.topk_bm25,
+                topk_vec=args.topk_vec,
+                graph_expand=not args.no_graph_expand,
+                seed=args.seed,
+                exact_baseline=args.exact_baseline,
+            )
+        text = json.dumps(report, indent=2)
+        if args.output:
+            Path(args.output).write_text(text + "\n")
+        print(text)
+        return
+
+    if args.cmd == "ingest-status":
+        state = PTGRXMLDownloader(data_root=SETTINGS.data_root).state
+        try:
+            print(json.dumps(state.describe(), indent=2))
+        finally:
+            state.close()
+        return
+
+    if args.cmd == "serve":
+        serve(host=args.host, port=args.port, threads=args.threads)
+        return
+
+    if args.cmd == "cache":
+        emb_cache = open_embedding_cache()
+        try:
+            out = {"current_namespace": emb_cache.namespace}
+            if args.cache_cmd == "prune":
+                drop = list(args.drop_namespace)
+                if args.drop_stale:
+                    drop += [ns for ns in emb_cache.namespaces() if ns != emb_cache.namespace]
+                out["evicted"] = emb_cache.prune(max_entries=args.max_entries, drop_namespaces=drop)
+            out.update(emb_cache.describe())
+        finally:
+            emb_cache.close()
+        print(json.dumps(out, indent=2))
 
 
 if __name__ == "__main__":
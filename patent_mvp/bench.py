@@ -0,0 +1,642 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import math
+import random
+import re
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Iterator, Sequence
+
+import numpy as np
+
+from patent_mvp.chunker import build_chunks
+from patent_mvp.embeddings import EmbeddingProvider, EmbeddingScheduler
+from patent_mvp.ingest import batched
+from patent_mvp.models import EvidenceChunk
+from patent_mvp.parser import PARSER_ENGINES, parse_patent_xml, parse_week_zip
+from patent_mvp.search import hybrid_search, merge_scores, rank_patents
+from patent_mvp.storage import OpenSearchStore, PostgresStore
+from patent_mvp.synthetic import SyntheticWeekSpec, iter_synthetic_week, write_synthetic_week
+from patent_mvp.vector_index import LocalVectorIndex, top_k_indices, vector_index_dir
+
+TOKEN_RE = re.compile(r"\w+")
+STAGES = ("embed", "bm25", "vector", "merge", "graph", "end_to_end")
+INGEST_STAGES = ("parse", "chunk", "embed", "postgres", "opensearch")
+WRITER_MODES = ("bulk", "rows")
+
+
+def percentiles(samples: Sequence[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+    }
+
+
+def recall_at_k(found: Sequence[str], exact: Sequence[str], k: int) -> float:
+    truth = set(exact[:k])
+    return len(truth & set(found[:k])) / max(1, len(truth))
+
+
+class HashingEmbedder(EmbeddingProvider):
+    # Deterministic, dependency-free stand-in for the sentence-transformer:
+    # signed feature hashing of tokens into `dim` buckets, L2-normalised, so
+    # texts sharing words land close together under cosine similarity.
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+        self.model_name = f"hashing-{dim}"
+        self._buckets: dict[str, tuple[int, float]] = {}
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        if token not in self._buckets:
+            h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            self._buckets[token] = (h % self.dim, 1.0 if (h >> 63) & 1 else -1.0)
+        return self._buckets[token]
+
+    def embed_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(TOKEN_RE.findall(text.lower())).items():
+                idx, sign = self._bucket(token)
+                out[row, idx] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        return [len(TOKEN_RE.findall(t)) for t in texts]
+
+
+@dataclass
+class SyntheticCorpus:
+    chunks: list[EvidenceChunk]
+    cpc: dict[str, list[str]]
+    citations: dict[str, list[str]]
+    queries: list[str] = field(default_factory=list)
+
+
+def synthetic_corpus(
+    n_chunks: int = 20_000,
+    n_queries: int = 200,
+    chunks_per_patent: int = 10,
+    n_topics: int = 64,
+    words_per_chunk: int = 40,
+    seed: int = 0,
+) -> SyntheticCorpus:
+    # Chunks draw most words from their patent's topic and the rest from a
+    # shared Zipf-like vocabulary; queries are noisy word samples of random
+    # chunks. That yields clustered vectors and skewed term statistics, which
+    # is what the indexes and BM25 are sensitive to.
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1.0 / (i + 1) for i in range(len(vocab))))
+    topics = [rng.sample(vocab[200:], 60) for _ in range(n_topics)]
+    cpc_codes = [f"G06F {i}/{j:02d}" for i in range(1, 17) for j in range(0, 100, 10)]
+
+    chunks: list[EvidenceChunk] = []
+    cpc: dict[str, list[str]] = {}
+    citations: dict[str, list[str]] = {}
+    n_patents = max(1, math.ceil(n_chunks / chunks_per_patent))
+    pubs = [f"US{10_000_000 + i}B2" for i in range(n_patents)]
+    for p_idx, pub in enumerate(pubs):
+        topic = topics[p_idx % n_topics]
+        cpc[pub] = rng.sample(cpc_codes, 2)
+        citations[pub] = rng.sample(pubs, min(3, len(pubs)))
+        for c_idx in range(chunks_per_patent):
+            if len(chunks) == n_chunks:
+                break
+            n_topic = int(words_per_chunk * 0.7)
+            words = rng.choices(topic, k=n_topic) + rng.choices(vocab, cum_weights=cum_weights, k=words_per_chunk - n_topic)
+            rng.shuffle(words)
+            section = "CLAIM" if c_idx < 3 else "DESCRIPTION"
+            chunks.append(
+                EvidenceChunk(
+                    chunk_id=f"{pub}:{section}:{c_idx}",
+                    publication_number=pub,
+                    section_type=section,
+                    text=" ".join(words),
+                )
+            )
+
+    queries = []
+    for _ in range(n_queries):
+        words = rng.choice(chunks).text.split()
+        queries.append(" ".join(rng.sample(words, min(10, len(words))) + rng.choices(vocab, cum_weights=cum_weights, k=2)))
+    return SyntheticCorpus(chunks=chunks, cpc=cpc, citations=citations, queries=queries)
+
+
+class MemoryBM25Store:
+    # Okapi BM25 over an in-memory inverted index; implements the
+    # OpenSearchStore search surface used by hybrid_search.
+
+    def __init__(self, chunks: Sequence[EvidenceChunk], k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.chunks = list(chunks)
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.lengths = np.zeros(len(self.chunks), dtype=np.float32)
+        for i, chunk in enumerate(self.chunks):
+            counts = Counter(TOKEN_RE.findall(chunk.text.lower()))
+            self.lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+        self.avg_length = float(self.lengths.mean()) if len(self.chunks) else 0.0
+
+    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
+        n = len(self.chunks)
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(TOKEN_RE.findall(query.lower())):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:topk]
+        return [(self.chunks[i].chunk_id, self.chunks[i].publication_number, float(s), "") for i, s in best]
+
+    def bm25_msearch(self, queries: Sequence[str], topk: int) -> list[list[tuple[str, str, float, str]]]:
+        return [self.bm25_search(q, topk) for q in queries]
+
+
+class MemoryVectorStore:
+    # Implements the PostgresStore search surface over a numpy matrix. With
+    # lists > 0 it behaves like an IVF index (k-means lists, `probes` lists
+    # scanned per query), so recall against exact search (a LocalVectorIndex
+    # over the same matrix) is measurable.
+
+    def __init__(
+        self,
+        chunks: Sequence[EvidenceChunk],
+        matrix: np.ndarray,
+        cpc: dict[str, list[str]] | None = None,
+        citations: dict[str, list[str]] | None = None,
+        lists: int = 0,
+        probes: int = 1,
+        seed: int = 0,
+    ) -> None:
+        self.chunks = list(chunks)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        # Hashing-embedder rows are already unit length.
+        self.exact = LocalVectorIndex(
+            [c.chunk_id for c in self.chunks], [c.publication_number for c in self.chunks], self.matrix, normalize=False
+        )
+        self.probes = probes
+        self.cpc = cpc or {}
+        self.citations = citations or {}
+        self.by_cpc: dict[str, set[str]] = defaultdict(set)
+        for pub, codes in self.cpc.items():
+            for code in codes:
+                self.by_cpc[code].add(pub)
+        self.centroids: np.ndarray | None = None
+        self.members: list[np.ndarray] = []
+        if lists:
+            self._train(lists, seed)
+
+    def _train(self, lists: int, seed: int, iterations: int = 8) -> None:
+        rng = np.random.default_rng(seed)
+        centroids = self.matrix[rng.choice(len(self.matrix), size=min(lists, len(self.matrix)), replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(self.matrix @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = self.matrix[assign == c]
+                if len(members):
+                    mean = members.mean(axis=0)
+                    centroids[c] = mean / max(float(np.linalg.norm(mean)), 1e-12)
+        assign = np.argmax(self.matrix @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.members = [np.flatnonzero(assign == c) for c in range(len(centroids))]
+
+    def _rows(self, idx: np.ndarray, scores: np.ndarray) -> list[tuple[str, str, float]]:
+        return [(self.chunks[i].chunk_id, self.chunks[i].publication_number, float(s)) for i, s in zip(idx, scores)]
+
+    def exact_search(self, query_embedding: Sequence[float], topk: int) -> list[tuple[str, str, float]]:
+        return self.exact.vector_search(query_embedding, topk)
+
+    def vector_search(
+        self,
+        query_embedding: Sequence[float],
+        topk: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[tuple[str, str, float]]:
+        if self.centroids is None:
+            return self.exact_search(query_embedding, topk)
+        q = np.asarray(query_embedding, dtype=np.float32)
+        n_probe = min(probes or self.probes, len(self.centroids))
+        nearest = top_k_indices(self.centroids @ q, n_probe)
+        candidates = np.concatenate([self.members[c] for c in nearest])
+        scores = self.matrix[candidates] @ q
+        top = top_k_indices(scores, topk)
+        return self._rows(candidates[top], scores[top])
+
+    def vector_search_batch(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        topk: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[list[tuple[str, str, float]]]:
+        return [self.vector_search(q, topk, ef_search=ef_search, probes=probes) for q in query_embeddings]
+
+    def graph_expand_patents(self, patents: set[str], limit: int = 300) -> set[str]:
+        neighbours: set[str] = set()
+        for pub in patents:
+            for code in self.cpc.get(pub, ()):
+                neighbours |= self.by_cpc[code]
+            neighbours.update(self.citations.get(pub, ()))
+        return patents | set(sorted(neighbours)[:limit])
+
+
+def run_search_bench(
+    queries: Sequence[str],
+    embedder: EmbeddingProvider,
+    pg,
+    os_store,
+    exact_search: Callable[[Sequence[float], int], list[tuple[str, str, float]]],
+    topk: int = 10,
+    topk_bm25: int = 200,
+    topk_vec: int = 200,
+    graph_expand: bool = True,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> dict:
+    # Each stage is timed on its own, in the order hybrid_search depends on
+    # them, and the whole query is then timed through hybrid_search itself
+    # (concurrent legs). Recall compares the vector leg with exact search.
+    timings: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    recalls: list[float] = []
+    for query in queries:
+        t0 = time.perf_counter()
+        q_vec = embedder.embed([query])[0]
+        t1 = time.perf_counter()
+        bm25 = os_store.bm25_search(query, topk_bm25)
+        t2 = time.perf_counter()
+        vec = pg.vector_search(q_vec, topk_vec, ef_search=ef_search, probes=probes)
+        t3 = time.perf_counter()
+        merged = merge_scores(bm25, vec)
+        rank_patents(merged[:topk])
+        t4 = time.perf_counter()
+        if graph_expand:
+            pg.graph_expand_patents({x["publication_number"] for x in merged[:topk]})
+        t5 = time.perf_counter()
+        hybrid_search(
+            query, embedder, pg, os_store, topk=topk, topk_bm25=topk_bm25, topk_vec=topk_vec,
+            graph_expand=graph_expand, ef_search=ef_search, probes=probes,
+        )
+        t6 = time.perf_counter()
+        for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5)):
+            timings[stage].append(seconds)
+        exact = exact_search(q_vec, topk)
+        recalls.append(recall_at_k([r[0] for r in vec], [r[0] for r in exact], topk))
+    if not graph_expand:
+        timings.pop("graph")
+    return {
+        "queries": len(queries),
+        "latency": {stage: percentiles(samples) for stage, samples in timings.items()},
+        "recall": {f"vector@{topk}": round(float(np.mean(recalls)), 4) if recalls else None},
+    }
+
+
+def bench_search(
+    backend: str = "memory",
+    chunks: int = 20_000,
+    queries: int = 200,
+    queries_file: str | None = None,
+    dim: int = 256,
+    lists: int = 0,
+    probes: int = 1,
+    ef_search: int | None = None,
+    topk: int = 10,
+    topk_bm25: int = 200,
+    topk_vec: int = 200,
+    graph_expand: bool = True,
+    seed: int = 0,
+    exact_baseline: str = "seqscan",
+) -> dict:
+    config = {k: v for k, v in locals().items()}
+    query_list: list[str] | None = None
+    if queries_file:
+        with open(queries_file, encoding="utf-8") as f:
+            query_list = [q.strip() for q in f if q.strip()][:queries]
+
+    if backend == "memory":
+        corpus = synthetic_corpus(n_chunks=chunks, n_queries=queries, seed=seed)
+        embedder = HashingEmbedder(dim)
+        t0 = time.perf_counter()
+        matrix = embedder.embed_matrix([c.text for c in corpus.chunks])
+        pg = MemoryVectorStore(corpus.chunks, matrix, corpus.cpc, corpus.citations, lists=lists, probes=probes, seed=seed)
+        os_store = MemoryBM25Store(corpus.chunks)
+        build_seconds = time.perf_counter() - t0
+        result = run_search_bench(
+            query_list or corpus.queries, embedder, pg, os_store, pg.exact_search,
+            topk=topk, topk_bm25=topk_bm25, topk_vec=topk_vec, graph_expand=graph_expand,
+            ef_search=ef_search, probes=probes,
+        )
+        return {
+            "suite": "search", "config": config, "embedding_cache": False,
+            "build_seconds": round(build_seconds, 3), **result,
+        }
+
+    if backend == "live":
+        # Read-only run against the configured services and their current
+        # data; the exact baseline is the same query with index scans off,
+        # or the local exact index. The embedding cache is bypassed so the
+        # embed and end_to_end stages time the model, not a cache hit.
+        from patent_mvp.config import SETTINGS
+        from patent_mvp.embeddings import SentenceTransformerProvider
+        from patent_mvp.storage import OpenSearchStore, PostgresStore
+
+        if not query_list:
+            raise ValueError("The live backend needs --queries-file")
+        pg = PostgresStore(SETTINGS.postgres_dsn, pooled=True)
+        if exact_baseline == "local":
+            # Brute force in-process over an export of the same vectors
+            # (`index build-local`); no sequential scans on the database.
+            exact_search = LocalVectorIndex.load(vector_index_dir()).vector_search
+        elif exact_baseline == "seqscan":
+            exact_search = lambda q_vec, k: pg.vector_search(q_vec, k, exact=True)  # noqa: E731
+        else:
+            raise ValueError(f"Unknown exact baseline {exact_baseline!r}; expected 'seqscan' or 'local'")
+        try:
+            result = run_search_bench(
+                query_list,
+                SentenceTransformerProvider(SETTINGS.embedding_model, cache=False),
+                pg,
+                OpenSearchStore(SETTINGS.opensearch_url, SETTINGS.opensearch_index),
+                exact_search,
+                topk=topk, topk_bm25=topk_bm25, topk_vec=topk_vec, graph_expand=graph_expand,
+                ef_search=ef_search, probes=probes,
+            )
+        finally:
+            pg.close()
+        return {"suite": "search", "config": config, "embedding_cache": False, **result}
+
+    raise ValueError(f"Unknown bench backend {backend!r}; expected 'memory' or 'live'")
+
+
+class _CountingCopy:
+    def __init__(self, counts: Counter) -> None:
+        self.counts = counts
+
+    def __enter__(self) -> _CountingCopy:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+    def set_types(self, types: Sequence[str]) -> None:
+        pass
+
+    def write_row(self, row: Sequence[object]) -> None:
+        self.counts["copy_rows"] += 1
+
+
+class _CountingCursor:
+    def __init__(self, counts: Counter) -> None:
+        self.counts = counts
+
+    def __enter__(self) -> _CountingCursor:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+    def execute(self, sql: str, params: object = None, prepare: bool | None = None) -> None:
+        self.counts["statements"] += 1
+
+    def copy(self, sql: str) -> _CountingCopy:
+        self.counts["copies"] += 1
+        return _CountingCopy(self.counts)
+
+
+class _CountingConnection:
+    def __init__(self, counts: Counter) -> None:
+        self.counts = counts
+
+    def __enter__(self) -> _CountingConnection:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.counts["transactions"] += 1
+
+    def cursor(self) -> _CountingCursor:
+        return _CountingCursor(self.counts)
+
+
+class NullPostgresPool:
+    # Drop-in for PostgresStore.pool: the store builds every statement and
+    # COPY row as usual, nothing leaves the process. Measures client-side
+    # writer cost and round trips, not server time.
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+
+    def connection(self) -> _CountingConnection:
+        return _CountingConnection(self.counts)
+
+    def close(self) -> None:
+        pass
+
+
+class NullOpenSearchClient:
+    # Accepts _bulk bodies from opensearch-py's helpers and acknowledges
+    # every action, counting requests and serialized bytes.
+
+    def __init__(self) -> None:
+        from opensearchpy.serializer import JSONSerializer
+
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def bulk(self, body: str, **kwargs: object) -> dict:
+        items = [{"index": {"status": 201}} for line in body.splitlines() if line.startswith('{"index"')]
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts["bytes"] += len(body.encode("utf-8"))
+        return {"errors": False, "items": items}
+
+
+def _max_rss_mb() -> dict[str, float]:
+    # ru_maxrss is KiB on Linux; "children" covers parse worker processes.
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+@contextmanager
+def _stage(report: dict, name: str, trace_memory: bool) -> Iterator[dict]:
+    stats: dict = {}
+    if trace_memory:
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    yield stats
+    seconds = time.perf_counter() - t0
+    out = {"seconds": round(seconds, 4)}
+    for unit in ("docs", "chunks", "tokens", "rows", "mb"):
+        if unit in stats:
+            out[f"{unit}_per_sec"] = round(stats[unit] / max(seconds, 1e-9), 1)
+    out.update({k: round(v, 2) if isinstance(v, float) else v for k, v in stats.items()})
+    if trace_memory:
+        out["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+    report[name] = out
+
+
+def bench_ingest(
+    patents: int = 1000,
+    schema: str = "mixed",
+    claims: tuple[int, int] = (10, 25),
+    description_paragraphs: tuple[int, int] = (20, 60),
+    words_per_paragraph: tuple[int, int] = (40, 160),
+    cpc_mix: dict[str, float] | None = None,
+    cpc_prefix: str | None = None,
+    parse_workers: int = 1,
+    writer: str = "bulk",
+    batch_size: int = 256,
+    embedding_batch_size: int = 64,
+    os_threads: int = 1,
+    dim: int = 256,
+    seed: int = 0,
+    trace_memory: bool = False,
+    workdir: str | None = None,
+) -> dict:
+    # Generates one synthetic week and pushes it through the real ingest
+    # code: parse_week_zip, build_chunks, EmbeddingScheduler and both stores'
+    # writers. Only the I/O ends are fakes (hashing embedder, counting
+    # Postgres pool, acknowledging OpenSearch client), so parser and writer
+    # modes can be compared on CPU and memory cost alone.
+    if writer not in WRITER_MODES:
+        raise ValueError(f"Unknown writer mode {writer!r}; expected one of {WRITER_MODES}")
+    config = {k: v for k, v in locals().items()}
+    spec_kwargs = {} if cpc_mix is None else {"cpc_mix": cpc_mix}
+    spec = SyntheticWeekSpec(
+        patents=patents,
+        claims=claims,
+        description_paragraphs=description_paragraphs,
+        words_per_paragraph=words_per_paragraph,
+        schema=schema,
+        seed=seed,
+        **spec_kwargs,
+    )
+    stages: dict[str, dict] = {}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+            t0 = time.perf_counter()
+            zip_path = write_synthetic_week(tmp, spec)
+            generate_seconds = time.perf_counter() - t0
+            with zipfile.ZipFile(zip_path) as zf:
+                xml_bytes = sum(info.file_size for info in zf.infolist())
+            source = {
+                "docs": patents,
+                "xml_mb": round(xml_bytes / 1e6, 2),
+                "zip_mb": round(zip_path.stat().st_size / 1e6, 2),
+                "generate_seconds": round(generate_seconds, 3),
+            }
+
+            with _stage(stages, "parse", trace_memory) as stats:
+                records = parse_week_zip(zip_path, Path(tmp) / "parsed", workers=parse_workers, cpc_prefix=cpc_prefix)
+                stats.update(docs=patents, mb=xml_bytes / 1e6, patents=len(records))
+
+            with _stage(stages, "chunk", trace_memory) as stats:
+                chunks = [c for p in records for c in build_chunks(p)]
+                stats.update(chunks=len(chunks), mb=sum(len(c.text) for c in chunks) / 1e6)
+
+            with _stage(stages, "embed", trace_memory) as stats:
+                scheduler = EmbeddingScheduler(HashingEmbedder(dim), batch_size=embedding_batch_size)
+                vectors: dict[str, list[float]] = {}
+                for batch, batch_vectors in scheduler.iter_batches(chunks):
+                    vectors.update(zip((c.chunk_id for c in batch), batch_vectors))
+                stats.update(chunks=scheduler.total.chunks, tokens=scheduler.total.tokens)
+
+            pg = PostgresStore("postgresql://bench")
+            pg.pool = NullPostgresPool()
+            with _stage(stages, "postgres", trace_memory) as stats:
+                if writer == "bulk":
+                    for group in batched(records, batch_size):
+                        pg.bulk_write(group, [])
+                    for group in batched(chunks, batch_size):
+                        pg.bulk_write([], group, [vectors[c.chunk_id] for c in group])
+                else:
+                    for p in records:
+                        pg.upsert_patent(p)
+                    for group in batched(chunks, batch_size):
+                        pg.upsert_chunks(group)
+                    for c in chunks:
+                        pg.update_embedding(c.chunk_id, vectors[c.chunk_id])
+                stats.update(rows=len(records) + len(chunks), **pg.pool.counts)
+
+            os_store = OpenSearchStore("http://bench", "bench", bulk_threads=os_threads)
+            os_store.client = NullOpenSearchClient()
+            with _stage(stages, "opensearch", trace_memory) as stats:
+                indexed = os_store.index_chunks(chunks, refresh=False)
+                stats.update(chunks=indexed, mb=os_store.client.counts["bytes"] / 1e6, requests=os_store.client.counts["requests"])
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return {"suite": "ingest", "config": config, "source": source, "stages": stages, "max_rss_mb": _max_rss_mb()}
+
+
+def bench_parse(
+    patents: int = 5000,
+    schema: str = "mixed",
+    claims: tuple[int, int] = (10, 25),
+    description_paragraphs: tuple[int, int] = (20, 60),
+    words_per_paragraph: tuple[int, int] = (40, 160),
+    repeat: int = 3,
+    seed: int = 0,
+) -> dict:
+    # Parser engines only: the single-pass walk against the per-field XPath
+    # reference engine over the same in-memory synthetic week. Best of
+    # `repeat` runs per engine; both must produce identical records.
+    config = {k: v for k, v in locals().items()}
+    spec = SyntheticWeekSpec(
+        patents=patents,
+        claims=claims,
+        description_paragraphs=description_paragraphs,
+        words_per_paragraph=words_per_paragraph,
+        schema=schema,
+        seed=seed,
+    )
+    corpus = b"".join(iter_synthetic_week(spec))
+    engines: dict[str, dict[str, float]] = {}
+    outputs = {}
+    for engine in PARSER_ENGINES:
+        best = float("inf")
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            outputs[engine] = parse_patent_xml(corpus, engine=engine)
+            best = min(best, time.perf_counter() - t0)
+        engines[engine] = {"seconds": round(best, 4), "docs_per_sec": round(patents / best, 1)}
+    if outputs["walk"] != outputs["xpath"]:
+        raise RuntimeError("Parser engines disagree on the synthetic week")
+    return {
+        "suite": "parse",
+        "config": config,
+        "source": {"docs": patents, "xml_mb": round(len(corpus) / 1e6, 2)},
+        "engines": engines,
+        "speedup": round(engines["xpath"]["seconds"] / engines["walk"]["seconds"], 2),
+    }
@@ -55,8 +55,8 @@ def build_chunks(patent: PatentRecord, max_chars: int = 1200, overlap: int = 150
     return chunks
 
 
-def write_chunk_jsonl(chunks: list[EvidenceChunk], out_file: Path) -> None:
+def write_chunk_jsonl(chunks: list[EvidenceChunk], out_file: Path, append: bool = False) -> None:
     out_file.parent.mkdir(parents=True, exist_ok=True)
-    with out_file.open("w", encoding="utf-8") as f:
+    with out_file.open("a" if append else "w", encoding="utf-8") as f:
         for c in chunks:
             f.write(json.dumps(c.__dict__, ensure_ascii=False) + "\n")
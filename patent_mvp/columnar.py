@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from patent_mvp.models import EvidenceChunk, PatentRecord
+
+LOGGER = logging.getLogger(__name__)
+COLUMNAR_TABLES = ("patents", "chunks", "embeddings")
+# Nested, schema-less fields are kept as JSON text columns.
+_PATENT_JSON_FIELDS = ("claims", "raw_json")
+_PATENT_LIST_FIELDS = ("summary_paragraphs", "description_paragraphs", "cpc_codes", "citations")
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("The columnar store needs pyarrow: pip install 'patent-mvp[columnar]'") from exc
+    return pyarrow
+
+
+def _schemas(pa: Any, dim: int) -> dict[str, Any]:
+    text = pa.string()
+    return {
+        "patents": pa.schema(
+            [("publication_number", text), ("grant_date", text), ("title", text), ("abstract", text)]
+            + [(name, pa.list_(text)) for name in _PATENT_LIST_FIELDS]
+            + [(name, text) for name in _PATENT_JSON_FIELDS]
+        ),
+        "chunks": pa.schema(
+            [
+                ("chunk_id", text),
+                ("publication_number", text),
+                ("section_type", text),
+                ("text", text),
+                ("claim_num", text),
+                ("para_id", text),
+                ("is_independent", pa.bool_()),
+                ("text_hash", text),
+                ("metadata", text),
+            ]
+        ),
+        "embeddings": pa.schema(
+            [("chunk_id", text), ("text_hash", text), ("embedding", pa.list_(pa.float32(), dim))],
+            metadata={"dim": str(dim)},
+        ),
+    }
+
+
+def _patent_columns(patents: Sequence[PatentRecord]) -> dict[str, list]:
+    cols: dict[str, list] = {
+        "publication_number": [p.publication_number for p in patents],
+        "grant_date": [p.grant_date for p in patents],
+        "title": [p.title for p in patents],
+        "abstract": [p.abstract for p in patents],
+    }
+    for name in _PATENT_LIST_FIELDS:
+        cols[name] = [getattr(p, name) for p in patents]
+    for name in _PATENT_JSON_FIELDS:
+        cols[name] = [json.dumps(getattr(p, name), ensure_ascii=False) for p in patents]
+    return cols
+
+
+def _chunk_columns(chunks: Sequence[EvidenceChunk]) -> dict[str, list]:
+    return {
+        "chunk_id": [c.chunk_id for c in chunks],
+        "publication_number": [c.publication_number for c in chunks],
+        "section_type": [c.section_type for c in chunks],
+        "text": [c.text for c in chunks],
+        "claim_num": [c.claim_num for c in chunks],
+        "para_id": [c.para_id for c in chunks],
+        "is_independent": [c.is_independent for c in chunks],
+        "text_hash": [c.metadata.get("text_hash", "") for c in chunks],
+        "metadata": [json.dumps(c.metadata, ensure_ascii=False) for c in chunks],
+    }
+
+
+class ColumnarWeekWriter:
+    # Appends record batches to one Arrow IPC file per table for a week.
+    # Files are written as .part and renamed on close(), so readers only ever
+    # see complete weeks; abort() (or a crash) leaves the last good copy.
+
+    def __init__(self, root: Path, week_date: str, dim: int) -> None:
+        self.pa = _pyarrow()
+        self.root = root
+        self.week_date = week_date
+        self.schemas = _schemas(self.pa, dim)
+        self.dim = dim
+        self.rows = {table: 0 for table in COLUMNAR_TABLES}
+        self._writers: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _part(self, table: str) -> Path:
+        return self.root / table / f"ipg{self.week_date}.arrow.part"
+
+    def _write(self, table: str, columns: dict[str, Any]) -> None:
+        batch = self.pa.RecordBatch.from_pydict(columns, schema=self.schemas[table])
+        if batch.num_rows == 0:
+            return
+        with self._lock:
+            writer = self._writers.get(table)
+            if writer is None:
+                path = self._part(table)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                writer = self._writers[table] = self.pa.ipc.new_file(str(path), self.schemas[table])
+            writer.write_batch(batch)
+            self.rows[table] += batch.num_rows
+
+    def write_patents(self, patents: Sequence[PatentRecord]) -> None:
+        self._write("patents", _patent_columns(patents))
+
+    def write_chunks(self, chunks: Sequence[EvidenceChunk]) -> None:
+        self._write("chunks", _chunk_columns(chunks))
+
+    def write_embeddings(self, chunks: Sequence[EvidenceChunk], vectors: Sequence[Sequence[float]] | np.ndarray) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        embedding = self.pa.FixedSizeListArray.from_arrays(self.pa.array(matrix.ravel()), self.dim)
+        self._write(
+            "embeddings",
+            {
+                "chunk_id": [c.chunk_id for c in chunks],
+                "text_hash": [c.metadata.get("text_hash", "") for c in chunks],
+                "embedding": embedding,
+            },
+        )
+
+    def close(self) -> dict[str, int]:
+        with self._lock:
+            for table, writer in self._writers.items():
+                writer.close()
+                part = self._part(table)
+                part.replace(part.with_suffix(""))
+            self._writers.clear()
+        return dict(self.rows)
+
+    def abort(self) -> None:
+        with self._lock:
+            for table, writer in self._writers.items():
+                writer.close()
+                self._part(table).unlink(missing_ok=True)
+            self._writers.clear()
+
+
+class ColumnarStore:
+    # Week-partitioned Arrow IPC files: <root>/<table>/ipgYYYYMMDD.arrow.
+    # Reads memory-map the file, so tables and embedding matrices are
+    # zero-copy views over the page cache rather than parsed copies.
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def path(self, table: str, week_date: str) -> Path:
+        if table not in COLUMNAR_TABLES:
+            raise ValueError(f"Unknown columnar table {table!r}; expected one of {COLUMNAR_TABLES}")
+        return self.root / table / f"ipg{week_date}.arrow"
+
+    def writer(self, week_date: str, dim: int) -> ColumnarWeekWriter:
+        return ColumnarWeekWriter(self.root, week_date, dim)
+
+    def weeks(self, table: str = "chunks") -> list[str]:
+        folder = self.path(table, "").parent
+        return sorted(p.name[len("ipg") : -len(".arrow")] for p in folder.glob("ipg*.arrow"))
+
+    def read_table(self, table: str, week_date: str, columns: Sequence[str] | None = None) -> Any:
+        pa = _pyarrow()
+        source = pa.memory_map(str(self.path(table, week_date)), "r")
+        result = pa.ipc.open_file(source).read_all()
+        return result.select(list(columns)) if columns is not None else result
+
+    def scan(self, table: str, weeks: Iterable[str] | None = None, columns: Sequence[str] | None = None) -> Iterator[Any]:
+        # Record batches across weeks without materialising any week.
+        pa = _pyarrow()
+        for week_date in weeks if weeks is not None else self.weeks(table):
+            source = pa.memory_map(str(self.path(table, week_date)), "r")
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield batch.select(list(columns)) if columns is not None else batch
+
+    def embedding_matrix(self, week_date: str) -> tuple[list[str], np.ndarray]:
+        # (chunk_ids, float32 matrix) for the whole week. Batches are joined
+        # into one matrix; scan("embeddings") gives zero-copy per-batch views.
+        t = self.read_table("embeddings", week_date)
+        dim = int(t.schema.metadata[b"dim"])
+        values = t.column("embedding").combine_chunks().flatten()
+        return t.column("chunk_id").to_pylist(), values.to_numpy(zero_copy_only=False).reshape(-1, dim)
+
+    def iter_patents(self, week_date: str) -> Iterator[PatentRecord]:
+        for batch in self.scan("patents", [week_date]):
+            for row in batch.to_pylist():
+                for name in _PATENT_JSON_FIELDS:
+                    row[name] = json.loads(row[name])
+                yield PatentRecord(**row)
+
+    def iter_chunks(self, week_date: str) -> Iterator[EvidenceChunk]:
+        for batch in self.scan("chunks", [week_date]):
+            for row in batch.to_pylist():
+                row.pop("text_hash")
+                row["metadata"] = json.loads(row["metadata"])
+                yield EvidenceChunk(**row)
@@ -11,12 +11,52 @@ class Settings:
     opensearch_index: str = os.getenv("OPENSEARCH_INDEX", "patent_chunks")
     data_root: str = os.getenv("DATA_ROOT", "data")
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-en-v1.5")
+    embedding_revision: str | None = os.getenv("EMBEDDING_MODEL_REVISION")
+    embedding_normalize: bool = os.getenv("EMBEDDING_NORMALIZE", "1") == "1"
+    embedding_cache_dir: str = os.getenv("EMBEDDING_CACHE_DIR", "embeddings_cache")
+    embedding_cache_max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "0"))
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
     odp_bulk_search_url: str = os.getenv("ODP_BULK_SEARCH_URL", "https://api.uspto.gov/api/v1/bulk-data/search")
     odp_dataset_page_url: str = os.getenv(
         "ODP_PTGRXML_DATASET_PAGE_URL",
         "https://data.uspto.gov/datasets/patent-grant-full-text-data-no-images-xml",
     )
     odp_api_key: str | None = os.getenv("ODP_API_KEY")
+    download_workers: int = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+    download_segments: int = int(os.getenv("DOWNLOAD_SEGMENTS", "4"))
+    download_segment_min_bytes: int = int(os.getenv("DOWNLOAD_SEGMENT_MIN_BYTES", str(16 * 1024 * 1024)))
+    download_verify: bool = os.getenv("DOWNLOAD_VERIFY", "1") == "1"
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+    pg_pool_enabled: bool = os.getenv("PG_POOL_ENABLED", "1") == "1"
+    pg_pool_min_size: int = int(os.getenv("PG_POOL_MIN_SIZE", "1"))
+    pg_pool_max_size: int = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+    pg_pool_timeout: float = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+    pg_pool_max_idle: float = float(os.getenv("PG_POOL_MAX_IDLE", "600"))
+    pg_pool_check: bool = os.getenv("PG_POOL_CHECK", "1") == "1"
+    vector_ef_search: int = int(os.getenv("VECTOR_EF_SEARCH", "0"))
+    vector_probes: int = int(os.getenv("VECTOR_PROBES", "0"))
+    vector_backend: str = os.getenv("VECTOR_BACKEND", "pgvector")
+    vector_index_dir: str | None = os.getenv("VECTOR_INDEX_DIR")
+    vector_index_maintenance_work_mem: str = os.getenv("VECTOR_INDEX_MAINTENANCE_WORK_MEM", "2GB")
+    os_bulk_chunk_size: int = int(os.getenv("OPENSEARCH_BULK_CHUNK_SIZE", "500"))
+    os_bulk_max_bytes: int = int(os.getenv("OPENSEARCH_BULK_MAX_BYTES", str(10 * 1024 * 1024)))
+    os_bulk_threads: int = int(os.getenv("OPENSEARCH_BULK_THREADS", "4"))
+    search_bm25_timeout: float = float(os.getenv("SEARCH_BM25_TIMEOUT", "5"))
+    search_vector_timeout: float = float(os.getenv("SEARCH_VECTOR_TIMEOUT", "10"))
+    search_leg_threads: int = int(os.getenv("SEARCH_LEG_THREADS", "0"))
+    query_cache_enabled: bool = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+    query_cache_max_entries: int = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+    query_cache_ttl_seconds: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+    query_cache_dir: str | None = os.getenv("QUERY_CACHE_DIR")
+    query_cache_disk_max_entries: int = int(os.getenv("QUERY_CACHE_DISK_MAX_ENTRIES", "100000"))
+    serve_host: str = os.getenv("SERVE_HOST", "127.0.0.1")
+    serve_port: int = int(os.getenv("SERVE_PORT", "8080"))
+    serve_threads: int = int(os.getenv("SERVE_THREADS", "16"))
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "0") == "1"
+    metrics_file: str | None = os.getenv("METRICS_FILE")
+    metrics_interval_seconds: float = float(os.getenv("METRICS_INTERVAL_SECONDS", "60"))
+    log_format: str = os.getenv("LOG_FORMAT", "text")
+    columnar_enabled: bool = os.getenv("COLUMNAR_ENABLED", "0") == "1"
 
 
 SETTINGS = Settings()
@@ -1,16 +1,62 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import hashlib
 import json
 import logging
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Mapping
 from urllib.parse import urljoin
 
 from patent_mvp.config import SETTINGS
+from patent_mvp.ingest_state import STATE_FILE, IngestStateStore
+from patent_mvp.metrics import DOWNLOAD_BYTES, DOWNLOAD_SECONDS
 
 LOGGER = logging.getLogger(__name__)
 WEEK_RE = re.compile(r"ipg(\d{8})\.zip", re.IGNORECASE)
 HREF_RE = re.compile(r'href=["\']([^"\']*ipg\d{8}\.zip)["\']', re.IGNORECASE)
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def _b64_to_hex(value: str) -> str | None:
+    try:
+        raw = base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return raw.hex() if len(raw) == 16 else None
+
+
+@dataclass(frozen=True)
+class RemoteFile:
+    url: str
+    size: int | None = None
+    accept_ranges: bool = False
+    md5: str | None = None
+
+    @classmethod
+    def from_headers(cls, url: str, headers: Mapping[str, str]) -> RemoteFile:
+        md5 = None
+        if headers.get("Content-MD5"):
+            md5 = _b64_to_hex(headers["Content-MD5"])
+        for part in headers.get("x-goog-hash", "").split(","):
+            name, _, value = part.strip().partition("=")
+            if md5 is None and name == "md5":
+                md5 = _b64_to_hex(value)
+        # ETags are deliberately ignored: even a 32-hex strong ETag is only
+        # an opaque version tag, and a false mismatch would discard a good file.
+        length = headers.get("Content-Length")
+        return cls(
+            url=url,
+            size=int(length) if length and length.isdigit() else None,
+            accept_ranges=headers.get("Accept-Ranges", "").lower() == "bytes",
+            md5=md5,
+        )
 
 
 class PTGRXMLDownloader:
@@ -20,21 +66,45 @@ class PTGRXMLDownloader:
         search_url: str | None = None,
         dataset_page_url: str | None = None,
         api_key: str | None = None,
+        download_workers: int | None = None,
+        segments: int | None = None,
+        segment_min_bytes: int | None = None,
+        verify: bool | None = None,
     ) -> None:
         self.raw_root = Path(data_root) / "raw" / "ptgrxml"
         self.raw_root.mkdir(parents=True, exist_ok=True)
-        self.state_path = self.raw_root / "processed_weeks.json"
+        self.state = IngestStateStore(Path(data_root) / STATE_FILE, legacy_json=self.raw_root / "processed_weeks.json")
         self.search_url = search_url or SETTINGS.odp_bulk_search_url
         self.dataset_page_url = dataset_page_url or SETTINGS.odp_dataset_page_url
         self.api_key = api_key or SETTINGS.odp_api_key
+        self.download_workers = download_workers or SETTINGS.download_workers
+        self.segments = segments or SETTINGS.download_segments
+        self.segment_min_bytes = max(1, segment_min_bytes if segment_min_bytes is not None else SETTINGS.download_segment_min_bytes)
+        self.verify = SETTINGS.download_verify if verify is None else verify
+        self._http: Any = None
+        self._http_lock = threading.Lock()
+
+    def session(self) -> Any:
+        # One Session shared by discovery and every download thread; the
+        # adapter pool is sized for all weeks' segments in flight at once.
+        with self._http_lock:
+            if self._http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                pool_size = max(10, self.download_workers * self.segments)
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                http = requests.Session()
+                http.mount("http://", adapter)
+                http.mount("https://", adapter)
+                self._http = http
+            return self._http
 
     def _load_state(self) -> set[str]:
-        if not self.state_path.exists():
-            return set()
-        return set(json.loads(self.state_path.read_text()))
+        return self.state.processed_weeks()
 
     def _save_state(self, weeks: set[str]) -> None:
-        self.state_path.write_text(json.dumps(sorted(weeks), indent=2))
+        self.state.set_processed(weeks)
 
     @staticmethod
     def _extract_week_id(record: dict) -> str | None:
@@ -90,9 +160,7 @@ class PTGRXMLDownloader:
         return sorted(dedup.items(), key=lambda x: x[0], reverse=True)
 
     def _discover_from_dataset_page(self, weeks: int) -> list[tuple[str, str]]:
-        import requests
-
-        response = requests.get(self.dataset_page_url, timeout=60)
+        response = self.session().get(self.dataset_page_url, timeout=60)
         response.raise_for_status()
         parsed = self.parse_dataset_page_links(response.text, self.dataset_page_url)
         selected = parsed[:weeks]
@@ -100,8 +168,6 @@ class PTGRXMLDownloader:
         return selected
 
     def _discover_from_search_api(self, weeks: int) -> list[tuple[str, str]]:
-        import requests
-
         headers = {"Accept": "application/json"}
         if self.api_key:
             headers["X-API-KEY"] = self.api_key
@@ -112,7 +178,7 @@ class PTGRXMLDownloader:
             "size": max(weeks * 4, 100),
             "sort": [{"fileDataToDate": "desc"}],
         }
-        response = requests.post(self.search_url, json=payload, headers=headers, timeout=60)
+        response = self.session().post(self.search_url, json=payload, headers=headers, timeout=60)
         response.raise_for_status()
         parsed = self.parse_search_response(response.json())
         selected = parsed[:weeks]
@@ -143,6 +209,102 @@ class PTGRXMLDownloader:
             )
         return unprocessed
 
+    def probe(self, url: str) -> RemoteFile:
+        try:
+            r = self.session().head(url, allow_redirects=True, timeout=60)
+            r.raise_for_status()
+        except Exception as exc:  # noqa: BLE001
+            LOGGER.warning("HEAD %s failed (%s); downloading without size/checksum verification", url, exc)
+            return RemoteFile(url=url)
+        return RemoteFile.from_headers(r.url, r.headers)
+
+    @staticmethod
+    def _segment_state_path(tmp_path: Path) -> Path:
+        return tmp_path.with_suffix(".segments")
+
+    def _download_stream(self, url: str, tmp_path: Path) -> None:
+        headers = {}
+        state_path = self._segment_state_path(tmp_path)
+        if state_path.exists():
+            # A preallocated, partly filled segmented .part has no meaningful
+            # resume offset; start the single stream from scratch.
+            LOGGER.info("Discarding interrupted segmented download of %s before streaming", url)
+            tmp_path.unlink(missing_ok=True)
+            state_path.unlink()
+        if tmp_path.exists():
+            headers["Range"] = f"bytes={tmp_path.stat().st_size}-"
+            LOGGER.info("Resuming download of %s from byte %s", url, tmp_path.stat().st_size)
+        with self.session().get(url, stream=True, timeout=180, headers=headers) as r:
+            r.raise_for_status()
+            # A 200 to a ranged request means the server sent the whole file.
+            mode = "ab" if r.status_code == 206 else "wb"
+            with tmp_path.open(mode) as f:
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    if chunk:
+                        f.write(chunk)
+                        DOWNLOAD_BYTES.inc(len(chunk))
+
+    def _download_segmented(self, url: str, tmp_path: Path, size: int, n_segments: int) -> None:
+        # The .part file is preallocated and each segment is written in place
+        # by its own thread. Finished segments are recorded next to it so an
+        # interrupted download only refetches the unfinished ranges.
+        bounds = [(i * size // n_segments, (i + 1) * size // n_segments - 1) for i in range(n_segments)]
+        state_path = self._segment_state_path(tmp_path)
+        plan = {"size": size, "segments": n_segments}
+        state = json.loads(state_path.read_text()) if state_path.exists() else {}
+        if {k: state.get(k) for k in plan} != plan or not tmp_path.exists() or tmp_path.stat().st_size != size:
+            state = {**plan, "done": []}
+            with tmp_path.open("wb") as f:
+                f.truncate(size)
+        done: set[int] = set(state["done"])
+        if done:
+            LOGGER.info("Resuming %s: %s/%s segments already downloaded", url, len(done), n_segments)
+        lock = threading.Lock()
+
+        def fetch(i: int) -> None:
+            start, end = bounds[i]
+            headers = {"Range": f"bytes={start}-{end}"}
+            with self.session().get(url, stream=True, timeout=180, headers=headers) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    raise RuntimeError(f"Server ignored range request {headers['Range']} for {url}")
+                written = 0
+                with tmp_path.open("r+b") as f:
+                    f.seek(start)
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                        f.write(chunk)
+                        written += len(chunk)
+                        DOWNLOAD_BYTES.inc(len(chunk))
+                    f.flush()
+                    os.fsync(f.fileno())
+            if written != end - start + 1:
+                raise RuntimeError(f"Segment {start}-{end} of {url} returned {written} bytes")
+            with lock:
+                done.add(i)
+                state_path.write_text(json.dumps({**plan, "done": sorted(done)}))
+
+        pending = [i for i in range(n_segments) if i not in done]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            list(pool.map(fetch, pending))
+        state_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _verify(tmp_path: Path, remote: RemoteFile) -> None:
+        size = tmp_path.stat().st_size
+        problem = None
+        if remote.size is not None and size != remote.size:
+            problem = f"size {size} != expected {remote.size}"
+        elif remote.md5 is not None:
+            digest = hashlib.md5()
+            with tmp_path.open("rb") as f:
+                while block := f.read(DOWNLOAD_CHUNK_BYTES):
+                    digest.update(block)
+            if digest.hexdigest() != remote.md5:
+                problem = f"md5 {digest.hexdigest()} != expected {remote.md5}"
+        if problem:
+            tmp_path.unlink(missing_ok=True)
+            raise RuntimeError(f"Download of {remote.url} failed verification: {problem}")
+
     def download_week(self, week_date: str, url: str) -> Path:
         out_dir = self.raw_root / f"ipg{week_date}"
         out_dir.mkdir(parents=True, exist_ok=True)
@@ -151,23 +313,24 @@ class PTGRXMLDownloader:
             LOGGER.info("Week %s already downloaded, skipping", week_date)
             return zip_path
         tmp_path = zip_path.with_suffix(".zip.part")
-        headers = {}
-        if tmp_path.exists():
-            headers["Range"] = f"bytes={tmp_path.stat().st_size}-"
-            LOGGER.info("Resuming download for week %s from byte %s", week_date, tmp_path.stat().st_size)
-        import requests
 
-        with requests.get(url, stream=True, timeout=180, headers=headers) as r:
-            r.raise_for_status()
-            mode = "ab" if tmp_path.exists() else "wb"
-            with tmp_path.open(mode) as f:
-                for chunk in r.iter_content(chunk_size=1024 * 1024):
-                    if chunk:
-                        f.write(chunk)
+        remote = self.probe(url)
+        n_segments = min(self.segments, (remote.size or 0) // self.segment_min_bytes)
+        with DOWNLOAD_SECONDS.time():
+            if remote.accept_ranges and n_segments > 1:
+                LOGGER.info("Downloading week %s (%s bytes) in %s segments", week_date, remote.size, n_segments)
+                self._download_segmented(remote.url, tmp_path, remote.size, n_segments)
+            else:
+                self._download_stream(remote.url, tmp_path)
+        if self.verify:
+            self._verify(tmp_path, remote)
         tmp_path.rename(zip_path)
         return zip_path
 
+    def download_weeks(self, selected: list[tuple[str, str]], workers: int | None = None) -> list[tuple[str, Path]]:
+        with ThreadPoolExecutor(max_workers=workers or self.download_workers) as pool:
+            paths = list(pool.map(lambda item: self.download_week(*item), selected))
+        return [(week_date, path) for (week_date, _), path in zip(selected, paths)]
+
     def mark_processed(self, week_date: str) -> None:
-        state = self._load_state()
-        state.add(week_date)
-        self._save_state(state)
+        self.state.mark_processed(week_date)
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Sequence
+
+import numpy as np
+
+from patent_mvp.metrics import CACHE_LOOKUPS
+
+LOGGER = logging.getLogger(__name__)
+SQLITE_MAX_PARAMS = 500
+LEGACY_NAMESPACE = "legacy"
+LOOKUP_FLUSH_EVERY = 1024
+
+
+class MmapEmbeddingCache:
+    # Float32 vector file plus a SQLite (namespace, key) -> slot index.
+    # Vectors are fsynced before their index rows commit, so a crash can only
+    # leave unreferenced bytes at the tail, which are truncated on the next
+    # open. Reads go through a memory map; opening loads no vectors. Entries
+    # carry a logical last-used tick for LRU eviction, and evicted slots are
+    # recycled before the file grows. Every write (slot allocation, vector
+    # bytes, eviction, tail truncation) happens inside one BEGIN IMMEDIATE
+    # transaction, so processes sharing the cache (serve alongside ingest)
+    # never hand out the same slot. Lookups are read-only: LRU touches and
+    # hit/miss counters are buffered and written with the next write
+    # transaction (or every LOOKUP_FLUSH_EVERY lookups).
+
+    def __init__(self, cache_dir: str | Path, dim: int, namespace: str = "default", max_entries: int = 0) -> None:
+        self.root = Path(cache_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.record_bytes = dim * 4
+        self.data_path = self.root / "vectors.f32"
+        self.index_path = self.root / "index.sqlite"
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._map: np.memmap | None = None
+        self._tick = 0
+        self._pending_counts: dict[str, int] = {}
+        self._pending_touch: dict[str, int] = {}
+        self._pending_lookups = 0
+        self.db = sqlite3.connect(self.index_path, timeout=30.0, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                  namespace TEXT NOT NULL,
+                  key TEXT NOT NULL,
+                  slot INTEGER NOT NULL,
+                  last_used INTEGER NOT NULL,
+                  PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+            self.db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS counters (
+                  namespace TEXT NOT NULL,
+                  name TEXT NOT NULL,
+                  value INTEGER NOT NULL,
+                  PRIMARY KEY (namespace, name)
+                )
+                """
+            )
+        self._check_dim()
+        self._recover()
+
+    def _check_dim(self) -> None:
+        row = self.db.execute("SELECT value FROM meta WHERE key='dim'").fetchone()
+        if row is None:
+            with self.db:
+                self.db.execute("INSERT INTO meta(key, value) VALUES ('dim', ?)", (str(self.dim),))
+        elif int(row[0]) != self.dim:
+            raise ValueError(f"Embedding cache at {self.root} stores {row[0]}-d vectors, expected {self.dim}")
+
+    @contextmanager
+    def _write_txn(self) -> Iterator[None]:
+        # Takes SQLite's write lock up front; it is also the cross-process
+        # lock for vectors.f32, so on-disk state read inside is authoritative.
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Buffered LRU touches land before any eviction decision inside.
+            self._flush_pending()
+            yield
+            self._flush_pending()
+        except BaseException:
+            self.db.rollback()
+            raise
+        self.db.commit()
+
+    def _allocated_slots(self) -> int:
+        (slots,) = self.db.execute(
+            "SELECT COALESCE(MAX(slot) + 1, 0) FROM (SELECT slot FROM entries UNION ALL SELECT slot FROM free_slots)"
+        ).fetchone()
+        return int(slots)
+
+    def _sync_tick(self) -> None:
+        (tick,) = self.db.execute("SELECT COALESCE(MAX(last_used), 0) FROM entries").fetchone()
+        self._tick = max(self._tick, int(tick))
+
+    def _recover(self) -> None:
+        # Under the write lock so a writer in another process that has
+        # appended bytes but not yet committed its rows is never truncated.
+        with self._write_txn():
+            slots = self._allocated_slots()
+            self._sync_tick()
+            expected = slots * self.record_bytes
+            size = self.data_path.stat().st_size if self.data_path.exists() else 0
+            if size < expected:
+                raise RuntimeError(f"Embedding cache {self.data_path} is truncated: {size} bytes, index expects {expected}")
+            if size > expected:
+                LOGGER.warning("Truncating %s unindexed bytes from %s", size - expected, self.data_path)
+                with self.data_path.open("r+b") as f:
+                    f.truncate(expected)
+            self.slots = slots
+
+    def __len__(self) -> int:
+        (count,) = self.db.execute("SELECT COUNT(*) FROM entries WHERE namespace=?", (self.namespace,)).fetchone()
+        return int(count)
+
+    def _next_tick(self) -> int:
+        self._tick += 1
+        return self._tick
+
+    def _lookup(self, keys: Sequence[str], namespace: str | None = None) -> dict[str, int]:
+        namespace = namespace or self.namespace
+        found: dict[str, int] = {}
+        for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+            part = keys[start : start + SQLITE_MAX_PARAMS]
+            marks = ",".join("?" * len(part))
+            found.update(
+                self.db.execute(
+                    f"SELECT key, slot FROM entries WHERE namespace=? AND key IN ({marks})",
+                    (namespace, *part),
+                ).fetchall()
+            )
+        return found
+
+    def _bump_counters(self, **deltas: int) -> None:
+        for name, value in deltas.items():
+            self.stats[name] += value
+            self._pending_counts[name] = self._pending_counts.get(name, 0) + value
+
+    def _flush_pending(self) -> None:
+        # Runs inside _write_txn, so buffered lookups cost no extra commit.
+        if self._pending_touch:
+            self.db.executemany(
+                "UPDATE entries SET last_used=? WHERE namespace=? AND key=?",
+                [(tick, self.namespace, k) for k, tick in self._pending_touch.items()],
+            )
+        self.db.executemany(
+            """
+            INSERT INTO counters(namespace, name, value) VALUES (?, ?, ?)
+            ON CONFLICT(namespace, name) DO UPDATE SET value = value + excluded.value
+            """,
+            [(self.namespace, name, value) for name, value in self._pending_counts.items() if value],
+        )
+        self._pending_touch.clear()
+        self._pending_counts.clear()
+        self._pending_lookups = 0
+
+    def _mapped(self, min_rows: int) -> np.memmap:
+        if self._map is None or self._map.shape[0] < min_rows:
+            # Other processes may have grown the file since this one last wrote.
+            self.slots = max(self.slots, self.data_path.stat().st_size // self.record_bytes)
+            self._map = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(self.slots, self.dim))
+        return self._map
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, np.ndarray]:
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            slots = self._lookup(unique)
+            found: dict[str, np.ndarray] = {}
+            if slots:
+                mm = self._mapped(max(slots.values()) + 1)
+                found = {k: np.array(mm[slot]) for k, slot in slots.items()}
+                # Eviction (here or in another process) commits before a freed
+                # slot is rewritten, so a key still mapped to the same slot
+                # after the copy was read intact; anything else is a miss.
+                current = self._lookup(list(found))
+                found = {k: v for k, v in found.items() if current.get(k) == slots[k]}
+            if found and self.max_entries:
+                tick = self._next_tick()
+                self._pending_touch.update((k, tick) for k in found)
+            self._bump_counters(hits=len(found), misses=len(unique) - len(found))
+            self._pending_lookups += len(unique)
+            if self._pending_lookups >= LOOKUP_FLUSH_EVERY:
+                with self._write_txn():
+                    pass
+            CACHE_LOOKUPS.inc(len(found), cache="embedding", result="hit")
+            CACHE_LOOKUPS.inc(len(unique) - len(found), cache="embedding", result="miss")
+            return found
+
+    def put_many(self, items: Mapping[str, Sequence[float] | np.ndarray]) -> int:
+        return self._put_many(items, self.namespace)
+
+    def _put_many(self, items: Mapping[str, Sequence[float] | np.ndarray], namespace: str) -> int:
+        with self._lock, self._write_txn():
+            # Re-read keys, the free list and the slot high-water mark while
+            # holding the write lock; another process may have changed them.
+            existing = self._lookup(list(items), namespace)
+            new_keys = [k for k in items if k not in existing]
+            if not new_keys:
+                return 0
+            matrix = np.asarray([items[k] for k in new_keys], dtype=np.float32)
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-d vectors, got {matrix.shape[1]}")
+
+            reused = [r[0] for r in self.db.execute("SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (len(new_keys),))]
+            next_slot = self._allocated_slots()
+            appended = list(range(next_slot, next_slot + len(new_keys) - len(reused)))
+            slots = reused + appended
+            with self.data_path.open("r+b" if self.data_path.exists() else "wb") as f:
+                for slot, row in zip(reused, matrix):
+                    f.seek(slot * self.record_bytes)
+                    f.write(row.tobytes())
+                if appended:
+                    f.seek(next_slot * self.record_bytes)
+                    f.write(matrix[len(reused) :].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._sync_tick()
+            tick = self._next_tick()
+            self.db.executemany("DELETE FROM free_slots WHERE slot=?", [(s,) for s in reused])
+            self.db.executemany(
+                "INSERT INTO entries(namespace, key, slot, last_used) VALUES (?, ?, ?, ?)",
+                [(namespace, k, slot, tick) for k, slot in zip(new_keys, slots)],
+            )
+            self.slots = next_slot + len(appended)
+            if self.max_entries:
+                self._evict_to(self.max_entries)
+            return len(new_keys)
+
+    def _evict(self, rows: list[tuple[str, str, int]]) -> int:
+        # Callers select `rows` inside the same write transaction, so a slot
+        # is never freed after another process has already reused it.
+        if not rows:
+            return 0
+        self.db.executemany("DELETE FROM entries WHERE namespace=? AND key=?", [(ns, k) for ns, k, _ in rows])
+        self.db.executemany("INSERT OR IGNORE INTO free_slots(slot) VALUES (?)", [(slot,) for _, _, slot in rows])
+        self._bump_counters(evictions=len(rows))
+        return len(rows)
+
+    def _evict_to(self, max_entries: int) -> int:
+        (total,) = self.db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        excess = total - max_entries
+        if excess <= 0:
+            return 0
+        rows = self.db.execute("SELECT namespace, key, slot FROM entries ORDER BY last_used LIMIT ?", (excess,)).fetchall()
+        return self._evict(rows)
+
+    def prune(self, max_entries: int | None = None, drop_namespaces: Iterable[str] = ()) -> int:
+        with self._lock, self._write_txn():
+            evicted = 0
+            for ns in drop_namespaces:
+                rows = self.db.execute("SELECT namespace, key, slot FROM entries WHERE namespace=?", (ns,)).fetchall()
+                evicted += self._evict(rows)
+            if max_entries is not None:
+                evicted += self._evict_to(max_entries)
+            return evicted
+
+    def namespaces(self) -> list[str]:
+        return [r[0] for r in self.db.execute("SELECT DISTINCT namespace FROM entries ORDER BY namespace")]
+
+    def describe(self) -> dict:
+        if self._pending_counts or self._pending_touch:
+            with self._lock, self._write_txn():
+                pass
+        per_ns: dict[str, dict[str, int]] = {}
+        for ns, count in self.db.execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace"):
+            per_ns[ns] = {"entries": count}
+        for ns, name, value in self.db.execute("SELECT namespace, name, value FROM counters"):
+            per_ns.setdefault(ns, {"entries": 0})[name] = value
+        (free,) = self.db.execute("SELECT COUNT(*) FROM free_slots").fetchone()
+        return {
+            "path": str(self.root),
+            "dim": self.dim,
+            "entries": sum(v["entries"] for v in per_ns.values()),
+            "slots": self.slots,
+            "free_slots": free,
+            "bytes": self.slots * self.record_bytes,
+            "max_entries": self.max_entries,
+            "namespaces": per_ns,
+        }
+
+    def import_json(self, path: Path) -> int:
+        # One-shot import of the pre-mmap embeddings.json. It records no model,
+        # so it lands in LEGACY_NAMESPACE and is never served to a model
+        # namespace.
+        if self.db.execute("SELECT 1 FROM meta WHERE key='legacy_json_imported'").fetchone():
+            return 0
+        legacy = json.loads(path.read_text())
+        items = {k: v for k, v in legacy.items() if len(v) == self.dim}
+        added = self._put_many(items, LEGACY_NAMESPACE)
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('legacy_json_imported', ?)", (LEGACY_NAMESPACE,))
+        LOGGER.warning("Imported %s vectors from legacy cache %s into namespace %s", added, path, LEGACY_NAMESPACE)
+        return added
+
+    def close(self) -> None:
+        if self._pending_counts or self._pending_touch:
+            with self._lock, self._write_txn():
+                pass
+        self._map = None
+        self.db.close()
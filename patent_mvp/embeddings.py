@@ -1,31 +1,89 @@
 from __future__ import annotations
 
-import json
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from pathlib import Path
+from dataclasses import dataclass
+from typing import Callable, Iterator, Sequence
 
+from patent_mvp.config import SETTINGS
+from patent_mvp.embedding_cache import MmapEmbeddingCache
+from patent_mvp.metrics import EMBED_BATCH_SECONDS, EMBEDDED_CHUNKS, EMBEDDED_TOKENS
+from patent_mvp.models import EvidenceChunk
 from patent_mvp.text_utils import sha256_hex
 
+LOGGER = logging.getLogger(__name__)
 EXPECTED_EMBED_DIM = 768
 
 
+def embedding_namespace(model_name: str, revision: str | None = None, normalize: bool = True) -> str:
+    return f"{model_name}@{revision or 'default'}|normalize={int(normalize)}"
+
+
+def provider_namespace(embedder: "EmbeddingProvider") -> str:
+    # Providers without model metadata (tests, benches) are keyed by class.
+    return embedding_namespace(
+        getattr(embedder, "model_name", type(embedder).__name__),
+        getattr(embedder, "revision", None),
+        getattr(embedder, "normalize", True),
+    )
+
+
+def open_embedding_cache(
+    model_name: str | None = None,
+    cache_dir: str | None = None,
+    revision: str | None = None,
+    normalize: bool | None = None,
+    max_entries: int | None = None,
+) -> MmapEmbeddingCache:
+    namespace = embedding_namespace(
+        model_name or SETTINGS.embedding_model,
+        revision if revision is not None else SETTINGS.embedding_revision,
+        normalize if normalize is not None else SETTINGS.embedding_normalize,
+    )
+    return MmapEmbeddingCache(
+        cache_dir or SETTINGS.embedding_cache_dir,
+        EXPECTED_EMBED_DIM,
+        namespace=namespace,
+        max_entries=max_entries if max_entries is not None else SETTINGS.embedding_cache_max_entries,
+    )
+
+
 class EmbeddingProvider(ABC):
     @abstractmethod
     def embed(self, texts: list[str]) -> list[list[float]]:
         raise NotImplementedError
 
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        return [len(t.split()) for t in texts]
+
 
 class SentenceTransformerProvider(EmbeddingProvider):
-    def __init__(self, model_name: str, cache_dir: str = "embeddings_cache") -> None:
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str | None = None,
+        revision: str | None = None,
+        normalize: bool | None = None,
+        cache: bool = True,
+    ) -> None:
         import torch
         from sentence_transformers import SentenceTransformer
 
         device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name, device=device)
-        self.cache_path = Path(cache_dir) / "embeddings.json"
-        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
-        self.cache = json.loads(self.cache_path.read_text()) if self.cache_path.exists() else {}
+        self.revision = revision if revision is not None else SETTINGS.embedding_revision
+        self.normalize = normalize if normalize is not None else SETTINGS.embedding_normalize
+        self.model = SentenceTransformer(model_name, device=device, revision=self.revision)
+        self.batch_size = SETTINGS.embedding_batch_size
+        # cache=False encodes every text, e.g. to benchmark the model itself.
+        self.cache: MmapEmbeddingCache | None = None
+        if cache:
+            self.cache = open_embedding_cache(model_name, cache_dir, self.revision, self.normalize)
+            legacy_path = self.cache.root / "embeddings.json"
+            if legacy_path.exists():
+                self.cache.import_json(legacy_path)
 
     def _validate_dimension(self, dim: int) -> None:
         if dim != EXPECTED_EMBED_DIM:
@@ -35,29 +93,106 @@ class SentenceTransformerProvider(EmbeddingProvider):
                 "Set EMBEDDING_MODEL to a 768-d model or run a DB migration to change vector dimension."
             )
 
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        encoded = self.model.tokenizer(texts, add_special_tokens=False, truncation=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
     def embed(self, texts: list[str]) -> list[list[float]]:
-        results: list[list[float]] = []
-        missing: list[str] = []
-        missing_idx: list[int] = []
-        for i, text in enumerate(texts):
-            key = sha256_hex(text)
-            if key in self.cache:
-                cached_vec = self.cache[key]
-                self._validate_dimension(len(cached_vec))
-                results.append(cached_vec)
-            else:
-                results.append([])
-                missing.append(text)
-                missing_idx.append(i)
+        keys = [sha256_hex(text) for text in texts]
+        found = self.cache.get_many(keys) if self.cache is not None else {}
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
 
         if missing:
-            new_vecs = self.model.encode(missing, convert_to_numpy=True, normalize_embeddings=True)
+            new_vecs = self.model.encode(
+                list(missing.values()),
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize,
+            )
             if len(new_vecs) > 0:
                 self._validate_dimension(int(new_vecs.shape[1]))
-            for i, vec in enumerate(new_vecs):
-                key = sha256_hex(missing[i])
-                vector = vec.tolist()
-                self.cache[key] = vector
-                results[missing_idx[i]] = vector
-            self.cache_path.write_text(json.dumps(self.cache))
-        return results
+            fresh = dict(zip(missing, new_vecs))
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            found.update(fresh)
+        return [found[key].tolist() for key in keys]
+
+
+@dataclass
+class EmbeddingThroughput:
+    chunks: int = 0
+    tokens: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    def add(self, other: EmbeddingThroughput) -> None:
+        self.chunks += other.chunks
+        self.tokens += other.tokens
+        self.batches += other.batches
+        self.seconds += other.seconds
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+
+class EmbeddingScheduler:
+    # Sorts chunks by token length so each fixed-size micro-batch pads to a
+    # similar length, and releases every finished batch immediately so vectors
+    # are persisted as they complete rather than after the whole week.
+
+    def __init__(self, embedder: EmbeddingProvider, batch_size: int | None = None) -> None:
+        self.embedder = embedder
+        self.batch_size = batch_size or SETTINGS.embedding_batch_size
+        self.total = EmbeddingThroughput()
+        self._lock = threading.Lock()
+
+    def iter_batches(self, chunks: Sequence[EvidenceChunk]) -> Iterator[tuple[list[EvidenceChunk], list[list[float]]]]:
+        if not chunks:
+            return
+        stats = EmbeddingThroughput()
+        lengths = self.embedder.count_tokens([c.text for c in chunks])
+        order = sorted(range(len(chunks)), key=lengths.__getitem__)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start : start + self.batch_size]
+            batch = [chunks[i] for i in idx]
+            t0 = time.perf_counter()
+            vectors = self.embedder.embed([c.text for c in batch])
+            seconds = time.perf_counter() - t0
+            tokens = sum(lengths[i] for i in idx)
+            stats.seconds += seconds
+            stats.chunks += len(batch)
+            stats.tokens += tokens
+            stats.batches += 1
+            EMBED_BATCH_SECONDS.observe(seconds)
+            EMBEDDED_CHUNKS.inc(len(batch))
+            EMBEDDED_TOKENS.inc(tokens)
+            yield batch, vectors
+        with self._lock:
+            self.total.add(stats)
+        LOGGER.info(
+            "Embedded %s chunks in %s batches: %.1f chunks/s, %.1f tokens/s",
+            stats.chunks,
+            stats.batches,
+            stats.chunks_per_sec,
+            stats.tokens_per_sec,
+        )
+
+    def run(
+        self,
+        chunks: Sequence[EvidenceChunk],
+        sink: Callable[[list[EvidenceChunk], list[list[float]]], None],
+    ) -> EmbeddingThroughput:
+        before = EmbeddingThroughput(**vars(self.total))
+        for batch, vectors in self.iter_batches(chunks):
+            sink(batch, vectors)
+        return EmbeddingThroughput(
+            chunks=self.total.chunks - before.chunks,
+            tokens=self.total.tokens - before.tokens,
+            batches=self.total.batches - before.batches,
+            seconds=self.total.seconds - before.seconds,
+        )
@@ -1,53 +1,304 @@
 from __future__ import annotations
 
+import json
 import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping, Sequence, TypeVar
 
-from patent_mvp.chunker import build_chunks, has_cpc_prefix, write_chunk_jsonl
+from patent_mvp.chunker import build_chunks, write_chunk_jsonl
+from patent_mvp.columnar import ColumnarStore, ColumnarWeekWriter
 from patent_mvp.config import SETTINGS
 from patent_mvp.downloader import PTGRXMLDownloader
-from patent_mvp.embeddings import SentenceTransformerProvider
-from patent_mvp.parser import parse_week_zip
+from patent_mvp.embeddings import EXPECTED_EMBED_DIM, EmbeddingScheduler, SentenceTransformerProvider, provider_namespace
+from patent_mvp.metrics import CHUNKS_BUILT, CHUNKS_UNCHANGED, exporting
+from patent_mvp.models import EvidenceChunk, PatentRecord
+from patent_mvp.parser import iter_week_zip
+from patent_mvp.pipeline import Pipeline
+from patent_mvp.query_cache import bump_generation, generation_path
 from patent_mvp.storage import OpenSearchStore, PostgresStore
+from patent_mvp.text_utils import content_hash
 
 LOGGER = logging.getLogger(__name__)
+T = TypeVar("T")
 
 
-def run_ingest(weeks: int = 12, cpc_prefix: str = "G06F", since_last: bool = False) -> None:
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+@dataclass(frozen=True)
+class StageWorkers:
+    download: int = SETTINGS.download_workers
+    parse: int = 1
+    chunk: int = 2
+    embed: int = 1
+    write: int = 2
+
+
+@dataclass
+class IngestBatch:
+    week_date: str
+    seq: int
+    patents: list[PatentRecord]
+    chunks: list[EvidenceChunk] = field(default_factory=list)
+    pending: int = 0
+    # Stages this batch committed in an earlier, interrupted run.
+    checkpoints: set[str] = field(default_factory=set)
+
+
+@dataclass
+class ChunkDiff:
+    patents: list[PatentRecord]
+    chunks: list[EvidenceChunk]
+    orphans: list[str]
+    unchanged: list[EvidenceChunk] = field(default_factory=list)
+
+
+def diff_chunks(
+    patents: Sequence[PatentRecord],
+    chunks: Sequence[EvidenceChunk],
+    stored_hashes: Mapping[str, str | None],
+    stored_chunks: Mapping[str, tuple[str, str | None]],
+    namespace: str,
+) -> ChunkDiff:
+    # Chunk ids are content-derived, so an edited passage shows up as one new
+    # id plus one orphan. A stored chunk is reused only if its text hash
+    # matches and it has a vector from the current embedding namespace;
+    # everything else is (re)written.
+    changed = [p for p in patents if stored_hashes.get(p.publication_number) != content_hash(p.__dict__)]
+    fresh: list[EvidenceChunk] = []
+    unchanged: list[EvidenceChunk] = []
+    for c in chunks:
+        state = stored_chunks.get(c.chunk_id)
+        if state is not None and state[1] == namespace and state[0] == c.metadata.get("text_hash"):
+            unchanged.append(c)
+        else:
+            fresh.append(c)
+    keep = {c.chunk_id for c in chunks}
+    orphans = sorted(cid for cid in stored_chunks if cid not in keep)
+    return ChunkDiff(patents=changed, chunks=fresh, orphans=orphans, unchanged=unchanged)
+
+
+class WeekProgress:
+    # A week is complete once its parse stage has reported how many batches it
+    # produced and every one of those batches has had all chunks written.
+    # Batches may finish before the count is known, so both paths check.
+    # Callbacks do I/O (checkpoints, refresh, state), so they run after the
+    # lock is released and never hold up other write workers.
+
+    def __init__(
+        self,
+        on_complete: Callable[[str, int], None],
+        on_batch: Callable[[IngestBatch], None] | None = None,
+    ) -> None:
+        self.on_complete = on_complete
+        self.on_batch = on_batch
+        self.expected: dict[str, int] = {}
+        self.completed: dict[str, int] = defaultdict(int)
+        self.chunks: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def parsed(self, week_date: str, n_batches: int) -> None:
+        with self._lock:
+            self.expected[week_date] = n_batches
+            done = self._check(week_date)
+        if done is not None:
+            self.on_complete(week_date, done)
+
+    def written(self, batch: IngestBatch, n_chunks: int) -> None:
+        with self._lock:
+            batch.pending -= n_chunks
+            self.chunks[batch.week_date] += n_chunks
+            finished = batch.pending <= 0
+            done = None
+            if finished:
+                self.completed[batch.week_date] += 1
+                done = self._check(batch.week_date)
+        if finished and self.on_batch is not None:
+            self.on_batch(batch)
+        if done is not None:
+            self.on_complete(batch.week_date, done)
+
+    def _check(self, week_date: str) -> int | None:
+        # Caller holds the lock; returns the week's chunk count once complete.
+        if self.expected.get(week_date) == self.completed[week_date]:
+            return self.chunks[week_date]
+        return None
+
+
+def run_ingest(
+    weeks: int = 12,
+    cpc_prefix: str = "G06F",
+    since_last: bool = False,
+    parse_workers: int = 1,
+    stage_workers: StageWorkers | None = None,
+    queue_size: int = 4,
+    reprocess: bool = False,
+    columnar: bool | None = None,
+) -> None:
     downloader = PTGRXMLDownloader(data_root=SETTINGS.data_root)
     selected = downloader.select_weeks(weeks=weeks, since_last=since_last)
     if not selected:
         LOGGER.info("No new weeks to process")
         return
     LOGGER.info("Resolved %s week(s) for ingest: %s", len(selected), selected)
+    workers = stage_workers or StageWorkers()
 
-    pg = PostgresStore(SETTINGS.postgres_dsn)
+    pg = PostgresStore(SETTINGS.postgres_dsn, pooled=SETTINGS.pg_pool_enabled)
     os_store = OpenSearchStore(SETTINGS.opensearch_url, SETTINGS.opensearch_index)
     os_store.ensure_index()
     embedder = SentenceTransformerProvider(SETTINGS.embedding_model)
+    scheduler = EmbeddingScheduler(embedder, batch_size=SETTINGS.embedding_batch_size)
+    namespace = provider_namespace(embedder)
 
     parsed_dir = Path(SETTINGS.data_root) / "parsed" / "patents"
     derived_dir = Path(SETTINGS.data_root) / "derived" / "chunks"
+    jsonl_locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+    state = downloader.state
+    use_columnar = SETTINGS.columnar_enabled if columnar is None else columnar
+    columnar_store = ColumnarStore(Path(SETTINGS.data_root) / "derived" / "columnar") if use_columnar else None
+    week_writers: dict[str, ColumnarWeekWriter] = {}
 
-    for week_date, url in selected:
-        LOGGER.info("Processing week=%s url=%s", week_date, url)
-        zip_path = downloader.download_week(week_date, url)
-        patents = parse_week_zip(zip_path, parsed_dir)
-
-        all_chunks = []
-        for p in patents:
-            if not has_cpc_prefix(p, cpc_prefix):
-                continue
-            pg.upsert_patent(p)
-            chunks = build_chunks(p)
-            pg.upsert_chunks(chunks)
-            os_store.index_chunks(chunks)
-            all_chunks.extend(chunks)
-
-        if all_chunks:
-            vectors = embedder.embed([c.text for c in all_chunks])
-            for c, vec in zip(all_chunks, vectors):
-                pg.update_embedding(c.chunk_id, vec)
-            write_chunk_jsonl(all_chunks, derived_dir / f"ipg{week_date}.jsonl")
+    def complete_week(week_date: str, n_chunks: int) -> None:
+        writer = week_writers.pop(week_date, None)
+        if writer is not None:
+            LOGGER.info("Wrote columnar week=%s rows=%s", week_date, writer.close())
+        # Periodic refresh is off for the whole run; make each finished week
+        # searchable now rather than when the last week completes.
+        os_store.refresh()
         downloader.mark_processed(week_date)
-        LOGGER.info("Completed week=%s chunks=%s", week_date, len(all_chunks))
+        bump_generation(generation_path(SETTINGS.data_root))
+        LOGGER.info(
+            "Completed week=%s chunks=%s embed_chunks_per_sec=%.1f embed_tokens_per_sec=%.1f",
+            week_date,
+            n_chunks,
+            scheduler.total.chunks_per_sec,
+            scheduler.total.tokens_per_sec,
+        )
+
+    def complete_batch(batch: IngestBatch) -> None:
+        state.checkpoint(batch.week_date, batch.seq, "indexed", len(batch.chunks))
+
+    progress = WeekProgress(complete_week, complete_batch)
+
+    def write_cached_embeddings(writer: ColumnarWeekWriter | None, chunks: list[EvidenceChunk]) -> None:
+        # Chunks skipped by the diff or a checkpoint are not re-embedded; their
+        # vectors for the columnar week come from the embedding cache, keyed by
+        # text hash like the embedder's own lookups.
+        cache = getattr(embedder, "cache", None)
+        if writer is None or cache is None or not chunks:
+            return
+        found = cache.get_many(c.metadata["text_hash"] for c in chunks)
+        hits = [c for c in chunks if c.metadata["text_hash"] in found]
+        if len(hits) < len(chunks):
+            LOGGER.warning(
+                "week=%s: %s chunk vector(s) not in the embedding cache; missing from the columnar embeddings",
+                writer.week_date,
+                len(chunks) - len(hits),
+            )
+        if hits:
+            writer.write_embeddings(hits, [found[c.metadata["text_hash"]] for c in hits])
+
+    def download_stage(item: tuple[str, str]) -> Iterator[tuple[str, Path]]:
+        week_date, url = item
+        LOGGER.info("Processing week=%s url=%s", week_date, url)
+        yield week_date, downloader.download_week(week_date, url)
+
+    def parse_stage(item: tuple[str, Path]) -> Iterator[IngestBatch]:
+        week_date, zip_path = item
+        (derived_dir / f"ipg{week_date}.jsonl").unlink(missing_ok=True)
+        # Parsing is replayed on resume (batches are numbered by position in
+        # the zip); what the checkpoints save is the storage and embedding work.
+        plan = json.dumps(
+            {"zip_bytes": zip_path.stat().st_size, "batch_size": SETTINGS.ingest_batch_size, "cpc_prefix": cpc_prefix}
+        )
+        done = state.start_week(week_date, plan, reset=reprocess)
+        if done:
+            resumable = sum(1 for stages in done.values() if "indexed" in stages)
+            LOGGER.info("Resuming week=%s: %s batch(es) already indexed", week_date, resumable)
+        if columnar_store is not None:
+            week_writers[week_date] = columnar_store.writer(week_date, EXPECTED_EMBED_DIM)
+        patents = iter_week_zip(zip_path, parsed_dir, workers=parse_workers, cpc_prefix=cpc_prefix)
+        n_batches = 0
+        for seq, patent_batch in enumerate(batched(patents, SETTINGS.ingest_batch_size)):
+            n_batches += 1
+            if columnar_store is not None:
+                week_writers[week_date].write_patents(patent_batch)
+            state.checkpoint(week_date, seq, "parsed", len(patent_batch))
+            yield IngestBatch(week_date=week_date, seq=seq, patents=patent_batch, checkpoints=done.get(seq, set()))
+        progress.parsed(week_date, n_batches)
+
+    def chunk_stage(batch: IngestBatch) -> Iterator[IngestBatch]:
+        chunks = [c for p in batch.patents for c in build_chunks(p)]
+        CHUNKS_BUILT.inc(len(chunks))
+        if chunks:
+            # The JSONL always holds the week's full chunk set.
+            with jsonl_locks[batch.week_date]:
+                write_chunk_jsonl(chunks, derived_dir / f"ipg{batch.week_date}.jsonl", append=True)
+        writer = week_writers.get(batch.week_date)
+        if writer is not None:
+            writer.write_chunks(chunks)
+        if "indexed" in batch.checkpoints:
+            batch.chunks = chunks
+            write_cached_embeddings(writer, chunks)
+            progress.written(batch, 0)
+            return
+        patents = batch.patents
+        pubs = [p.publication_number for p in batch.patents]
+        # Stale chunks (e.g. after a chunker or model change) are removed in
+        # both modes; only skipping unchanged work depends on `reprocess`.
+        stored_hashes = {} if reprocess else pg.fetch_patent_hashes(pubs)
+        diff = diff_chunks(batch.patents, chunks, stored_hashes, pg.fetch_chunk_state(pubs), namespace)
+        if diff.orphans:
+            pg.delete_chunks(diff.orphans)
+            os_store.delete_chunks(diff.orphans)
+        if not reprocess:
+            patents, chunks = diff.patents, diff.chunks
+            CHUNKS_UNCHANGED.inc(len(diff.unchanged))
+            if batch.checkpoints and diff.unchanged:
+                # An interrupted run may have stored these vectors in Postgres
+                # without reaching OpenSearch; re-index them, skip the embedding.
+                os_store.index_chunks(diff.unchanged, refresh=False)
+            write_cached_embeddings(writer, diff.unchanged)
+        batch.chunks = chunks
+        batch.pending = len(chunks)
+        # Patent rows go first: chunk rows reference them.
+        pg.bulk_write(patents, [])
+        if not chunks:
+            progress.written(batch, 0)
+            return
+        yield batch
+
+    def embed_stage(batch: IngestBatch) -> Iterator[tuple[IngestBatch, list[EvidenceChunk], list[list[float]]]]:
+        for chunks, vectors in scheduler.iter_batches(batch.chunks):
+            yield batch, chunks, vectors
+
+    def write_stage(item: tuple[IngestBatch, list[EvidenceChunk], list[list[float]]]) -> None:
+        batch, chunks, vectors = item
+        pg.bulk_write([], chunks, vectors, namespace)
+        os_store.index_chunks(chunks, refresh=False)
+        writer = week_writers.get(batch.week_date)
+        if writer is not None:
+            writer.write_embeddings(chunks, vectors)
+        progress.written(batch, len(chunks))
+
+    pipeline = Pipeline(queue_size=queue_size)
+    pipeline.add_stage("download", download_stage, workers.download)
+    pipeline.add_stage("parse", parse_stage, workers.parse)
+    pipeline.add_stage("chunk", chunk_stage, workers.chunk)
+    pipeline.add_stage("embed", embed_stage, workers.embed)
+    pipeline.add_stage("write", write_stage, workers.write)
+
+    try:
+        with exporting(), os_store.bulk_ingest_mode():
+            pipeline.run(selected)
+    finally:
+        for writer in week_writers.values():
+            writer.abort()
+        pg.close()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+LOGGER = logging.getLogger(__name__)
+STATE_FILE = "ingest_state.sqlite"
+# "parsed" marks a batch an earlier run reached, "indexed" one it fully
+# wrote. Finer-grained progress (patent rows, vectors) is recovered from the
+# stores themselves by the content-hash diff, not from checkpoints.
+BATCH_STAGES = ("parsed", "indexed")
+
+
+class IngestStateStore:
+    # Durable ingest progress in one SQLite file: which weeks are fully
+    # processed, and per in-flight week which batches have committed which
+    # stage. Every checkpoint is its own transaction, so a killed ingest
+    # resumes from the last committed batch instead of the start of the week.
+    # Batch numbers are only meaningful for the same parse plan (zip, batch
+    # size, CPC filter); a different plan discards the week's checkpoints.
+
+    def __init__(self, path: str | Path, legacy_json: str | Path | None = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS weeks (
+                  week_date TEXT PRIMARY KEY,
+                  status TEXT NOT NULL,
+                  plan TEXT,
+                  updated_at REAL NOT NULL
+                )
+                """
+            )
+            self.db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batches (
+                  week_date TEXT NOT NULL,
+                  seq INTEGER NOT NULL,
+                  stage TEXT NOT NULL,
+                  items INTEGER NOT NULL,
+                  updated_at REAL NOT NULL,
+                  PRIMARY KEY (week_date, seq, stage)
+                )
+                """
+            )
+        if legacy_json is not None:
+            self._migrate_json(Path(legacy_json))
+
+    def _migrate_json(self, legacy: Path) -> None:
+        if not legacy.exists():
+            return
+        weeks = set(json.loads(legacy.read_text() or "[]"))
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO weeks(week_date, status, updated_at) VALUES (?, 'processed', ?)",
+                [(w, time.time()) for w in sorted(weeks)],
+            )
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        LOGGER.info("Migrated %s processed week(s) from %s into %s", len(weeks), legacy, self.path)
+
+    def processed_weeks(self) -> set[str]:
+        with self._lock:
+            rows = self.db.execute("SELECT week_date FROM weeks WHERE status='processed'").fetchall()
+        return {w for (w,) in rows}
+
+    def set_processed(self, weeks: Iterable[str]) -> None:
+        # Replaces the processed set wholesale; in-flight weeks are kept.
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM weeks WHERE status='processed'")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO weeks(week_date, status, updated_at) VALUES (?, 'processed', ?)",
+                [(w, time.time()) for w in sorted(set(weeks))],
+            )
+
+    def mark_processed(self, week_date: str) -> None:
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO weeks(week_date, status, updated_at) VALUES (?, 'processed', ?)",
+                (week_date, time.time()),
+            )
+            self.db.execute("DELETE FROM batches WHERE week_date=?", (week_date,))
+
+    def start_week(self, week_date: str, plan: str, reset: bool = False) -> dict[int, set[str]]:
+        # Returns the stages each batch already committed under this plan.
+        with self._lock, self.db:
+            row = self.db.execute("SELECT plan FROM weeks WHERE week_date=?", (week_date,)).fetchone()
+            if reset or row is None or row[0] != plan:
+                self.db.execute("DELETE FROM batches WHERE week_date=?", (week_date,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO weeks(week_date, status, plan, updated_at) VALUES (?, 'in_progress', ?, ?)",
+                (week_date, plan, time.time()),
+            )
+            rows = self.db.execute("SELECT seq, stage FROM batches WHERE week_date=?", (week_date,)).fetchall()
+        done: dict[int, set[str]] = {}
+        for seq, stage in rows:
+            done.setdefault(seq, set()).add(stage)
+        return done
+
+    def checkpoint(self, week_date: str, seq: int, stage: str, items: int = 0) -> None:
+        if stage not in BATCH_STAGES:
+            raise ValueError(f"Unknown batch stage {stage!r}; expected one of {BATCH_STAGES}")
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO batches(week_date, seq, stage, items, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (week_date, seq, stage, items, time.time()),
+            )
+
+    def describe(self) -> dict:
+        with self._lock:
+            weeks = self.db.execute("SELECT week_date, status FROM weeks ORDER BY week_date").fetchall()
+            batches = self.db.execute(
+                "SELECT week_date, stage, COUNT(*), SUM(items) FROM batches GROUP BY week_date, stage"
+            ).fetchall()
+        in_progress: dict[str, dict] = {w: {} for w, status in weeks if status != "processed"}
+        for week_date, stage, n, items in batches:
+            in_progress.setdefault(week_date, {})[stage] = {"batches": n, "items": items}
+        return {
+            "processed": [w for w, status in weeks if status == "processed"],
+            "in_progress": in_progress,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self.db.close()
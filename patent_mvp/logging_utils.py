@@ -1,8 +1,42 @@
+import json
 import logging
+from datetime import datetime, timezone
 
+from patent_mvp.config import SETTINGS
 
-def configure_logging(level: int = logging.INFO) -> None:
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    )
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+
+class TextFormatter(logging.Formatter):
+    # Structured values passed as extra={"fields": {...}} are appended as
+    # key=value pairs (JSON-encoded values) after the message.
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " | " + " ".join(f"{k}={json.dumps(v, sort_keys=True, default=str)}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; extra={"fields": {...}} is merged in as
+    # top-level keys so log pipelines can index them directly.
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **(getattr(record, "fields", None) or {}),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level: int = logging.INFO, fmt: str | None = None) -> None:
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if (fmt or SETTINGS.log_format) == "json" else TextFormatter(TEXT_FORMAT))
+    logging.basicConfig(level=level, handlers=[handler])
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Iterator
+
+from patent_mvp.config import SETTINGS
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+_NULL_TIMER = nullcontext()
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str, labelnames: tuple[str, ...]) -> None:
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    @abstractmethod
+    def reset(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(registry, name, help_text, labelnames)
+        self.values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.values.clear()
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        with self._lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield self.name, _format_labels(key), value
+
+
+class Histogram(_Metric):
+    # Cumulative-bucket histogram in the Prometheus layout; time() is the
+    # timer: a context manager observing elapsed seconds on exit.
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels: Any) -> ContextManager[None]:
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels: dict[str, Any]) -> Iterator[None]:
+        t0 = self.registry.clock()
+        try:
+            yield
+        finally:
+            self.observe(self.registry.clock() - t0, **labels)
+
+    def summary(self, **labels: Any) -> dict[str, float]:
+        series = self.series.get(self._key(labels))
+        return {"count": series[2], "sum": series[1]} if series else {"count": 0, "sum": 0.0}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.series.clear()
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self.series.items())
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                running += n
+                yield f"{self.name}_bucket", _format_labels(key, (("le", _format_value(bound)),)), running
+            yield f"{self.name}_sum", _format_labels(key), total
+            yield f"{self.name}_count", _format_labels(key), count
+
+
+class MetricsRegistry:
+    # Process-wide named counters and histograms. When disabled every
+    # inc/observe returns after one attribute check and time() hands back a
+    # shared no-op context manager, so instrumented hot paths cost nothing.
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.clock = time.perf_counter
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls: type[_Metric], name: str, help_text: str, labelnames: tuple[str, ...], **kwargs: Any) -> Any:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if type(existing) is not cls or existing.labelnames != labelnames:
+                    raise ValueError(f"Metric {name} already registered as a different {existing.kind}")
+                return existing
+            metric = self._metrics[name] = cls(self, name, help_text, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def reset(self) -> None:
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            samples = list(metric.samples())
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(f"{sample}{labels} {_format_value(value)}" for sample, labels, value in samples)
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_prometheus(self, path: str | Path) -> Path:
+        # Atomic replace, so a node_exporter textfile collector never reads a
+        # half-written file.
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(out.name + ".tmp")
+        tmp.write_text(self.render_prometheus())
+        os.replace(tmp, out)
+        return out
+
+    def snapshot(self) -> dict[str, Any]:
+        # Flat, JSON-friendly view for structured logs: counter values and
+        # histogram count/sum keyed by Prometheus-style series names.
+        out: dict[str, Any] = {}
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            if isinstance(metric, Counter):
+                for sample, labels, value in metric.samples():
+                    out[sample + labels] = value
+            elif isinstance(metric, Histogram):
+                with metric._lock:
+                    items = sorted(metric.series.items())
+                for key, series in items:
+                    out[name + _format_labels(key)] = {"count": series[2], "sum": round(series[1], 6)}
+        return out
+
+
+METRICS = MetricsRegistry(enabled=SETTINGS.metrics_enabled)
+
+DOWNLOAD_BYTES = METRICS.counter("patent_mvp_download_bytes_total", "Bytes received while downloading weekly files")
+DOWNLOAD_SECONDS = METRICS.histogram("patent_mvp_download_seconds", "Wall time per weekly file download")
+PARSED_PATENTS = METRICS.counter("patent_mvp_parsed_patents_total", "Patent records parsed from weekly files")
+CHUNKS_BUILT = METRICS.counter("patent_mvp_chunks_built_total", "Evidence chunks built from parsed patents")
+CHUNKS_UNCHANGED = METRICS.counter(
+    "patent_mvp_chunks_unchanged_total", "Chunks skipped by incremental ingest because text and vector are already stored"
+)
+STAGE_SECONDS = METRICS.histogram(
+    "patent_mvp_pipeline_stage_seconds", "Busy time per item in each ingest pipeline stage", ("stage",)
+)
+EMBED_BATCH_SECONDS = METRICS.histogram("patent_mvp_embedding_batch_seconds", "Latency of one embedding micro-batch")
+EMBEDDED_CHUNKS = METRICS.counter("patent_mvp_embedded_chunks_total", "Chunks passed through the embedding scheduler")
+EMBEDDED_TOKENS = METRICS.counter("patent_mvp_embedded_tokens_total", "Tokens passed through the embedding scheduler")
+CACHE_LOOKUPS = METRICS.counter("patent_mvp_cache_lookups_total", "Embedding and query-result cache lookups", ("cache", "result"))
+DB_WRITE_SECONDS = METRICS.histogram("patent_mvp_db_write_seconds", "Latency of one bulk write call", ("store",))
+DB_ROWS = METRICS.counter("patent_mvp_db_rows_written_total", "Rows sent to the stores", ("store", "kind"))
+SEARCH_SECONDS = METRICS.histogram("patent_mvp_search_seconds", "End-to-end hybrid search latency", ("mode",))
+SEARCH_LEG_SECONDS = METRICS.histogram("patent_mvp_search_leg_seconds", "Latency of each hybrid search leg", ("leg",))
+SEARCH_DEGRADED = METRICS.counter("patent_mvp_search_degraded_total", "Search legs that failed or timed out", ("leg",))
+
+
+def export_metrics(path: str | Path | None = None) -> None:
+    if not METRICS.enabled:
+        return
+    target = path or SETTINGS.metrics_file
+    if target:
+        METRICS.write_prometheus(target)
+    LOGGER.info("Metrics snapshot", extra={"fields": {"metrics": METRICS.snapshot()}})
+
+
+@contextmanager
+def exporting(interval: float | None = None, path: str | Path | None = None) -> Iterator[None]:
+    # Exports every `interval` seconds while the block runs and once more on
+    # the way out, so long ingests show progress and short commands still
+    # leave a final snapshot behind.
+    if not METRICS.enabled:
+        yield
+        return
+    stop = threading.Event()
+    every = interval or SETTINGS.metrics_interval_seconds
+
+    def loop() -> None:
+        while not stop.wait(every):
+            try:
+                export_metrics(path)
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.warning("Metrics export failed: %s", exc)
+
+    thread = threading.Thread(target=loop, name="metrics-export", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+        export_metrics(path)
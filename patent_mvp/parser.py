@@ -1,18 +1,40 @@
 from __future__ import annotations
 
+import io
 import json
 import logging
 import re
 import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator
 
 from lxml import etree
 
+from patent_mvp.metrics import PARSED_PATENTS
 from patent_mvp.models import PatentRecord
 from patent_mvp.text_utils import normalize_text
 
 LOGGER = logging.getLogger(__name__)
 DEP_RE = re.compile(r"\b(claim|claims)\s+\d+", re.IGNORECASE)
+XML_DECL_RE = re.compile(rb"<\?xml\s")
+CPC_TEXT_RE = re.compile(
+    rb"<(?:[\w.-]+:)?classification-cpc-text\b[^>]*>(.*?)</(?:[\w.-]+:)?classification-cpc-text\s*>", re.DOTALL
+)
+CDATA_RE = re.compile(rb"<!\[CDATA\[(.*?)\]\]>", re.DOTALL)
+GRANT_TAG = "{*}us-patent-grant"
+DOCS_PER_TASK = 64
+
+SUMMARY_TAGS = frozenset({"summary", "summary-of-invention"})
+DESCRIPTION_TAGS = frozenset({"description", "detailed-description"})
+PUB_REF_TAGS = frozenset({"publication-reference", "document-id"})
+SCOPE_TAGS = PUB_REF_TAGS | SUMMARY_TAGS | DESCRIPTION_TAGS | {"abstract", "claims", "references-cited"}
+
+CLAIM_NUM_XPATH = etree.XPath("(.//*[local-name()='claim-num']/text())[1]")
+CLAIM_TEXT_XPATH = etree.XPath(".//*[local-name()='claim-text']")
+CPC_TEXT_XPATH = etree.XPath(".//*[local-name()='classification-cpc-text']/text()")
 
 def _xpath(node: etree._Element, expr: str) -> list[etree._Element | str]:
     return node.xpath(expr)
@@ -46,99 +68,340 @@ def parse_claim(text: str, claim_num: str | None) -> dict[str, object]:
     return {"claim_num": claim_num, "text": clean, "is_independent": not dep}
 
 
-def _find_patent_docs(root: etree._Element) -> list[etree._Element]:
-    if etree.QName(root).localname == "us-patent-grant":
-        return [root]
-    docs = [d for d in root.xpath("//*[local-name()='us-patent-grant']") if isinstance(d, etree._Element)]
-    return docs
+def _parse_grant_xpath(doc: etree._Element) -> PatentRecord | None:
+    # Reference engine: one local-name() XPath scan per field. Kept for
+    # equivalence tests and benchmarks against the single-pass walk below.
+    pub_num = _first_text(doc, "(.//*[local-name()='publication-reference']//*[local-name()='document-id']//*[local-name()='doc-number']/text())[1]")
+    if not pub_num:
+        return None
 
+    title = _first_text(doc, "(.//*[local-name()='invention-title']/text())[1]")
+    grant_date = _first_text(doc, "(.//*[local-name()='publication-reference']//*[local-name()='document-id']//*[local-name()='date']/text())[1]") or None
 
-def parse_patent_xml(xml_bytes: bytes) -> list[PatentRecord]:
-    patents: list[PatentRecord] = []
-    root = etree.fromstring(xml_bytes)
-    docs = _find_patent_docs(root)
+    abstract = normalize_text(" ".join(_texts(doc, ".//*[local-name()='abstract']//*[local-name()='p']")))
 
-    for doc in docs:
-        pub_num = _first_text(doc, "(.//*[local-name()='publication-reference']//*[local-name()='document-id']//*[local-name()='doc-number']/text())[1]")
-        if not pub_num:
+    claim_nodes = _xpath(doc, ".//*[local-name()='claims']//*[local-name()='claim']")
+    claims: list[dict[str, object]] = []
+    for claim in claim_nodes:
+        if not isinstance(claim, etree._Element):
             continue
+        claim_num = claim.get("num") or _first_text(claim, "(.//*[local-name()='claim-num']/text())[1]") or None
+        claim_text_parts = _texts(claim, ".//*[local-name()='claim-text']")
+        claim_text = " ".join(claim_text_parts) if claim_text_parts else normalize_text(" ".join(claim.itertext()))
+        if claim_text:
+            claims.append(parse_claim(claim_text, claim_num))
 
-        title = _first_text(doc, "(.//*[local-name()='invention-title']/text())[1]")
-        grant_date = _first_text(doc, "(.//*[local-name()='publication-reference']//*[local-name()='document-id']//*[local-name()='date']/text())[1]") or None
+    cpc_codes = _texts(doc, ".//*[local-name()='classification-cpc-text']/text()")
 
-        abstract = normalize_text(" ".join(_texts(doc, ".//*[local-name()='abstract']//*[local-name()='p']")))
+    citations = _texts(doc, ".//*[local-name()='references-cited']//*[local-name()='doc-number']/text()")
 
-        claim_nodes = _xpath(doc, ".//*[local-name()='claims']//*[local-name()='claim']")
-        claims: list[dict[str, object]] = []
-        for claim in claim_nodes:
-            if not isinstance(claim, etree._Element):
-                continue
-            claim_num = claim.get("num") or _first_text(claim, "(.//*[local-name()='claim-num']/text())[1]") or None
-            claim_text_parts = _texts(claim, ".//*[local-name()='claim-text']")
-            claim_text = " ".join(claim_text_parts) if claim_text_parts else normalize_text(" ".join(claim.itertext()))
-            if claim_text:
-                claims.append(parse_claim(claim_text, claim_num))
-
-        cpc_codes = _texts(doc, ".//*[local-name()='classification-cpc-text']/text()")
-
-        citations = _texts(doc, ".//*[local-name()='references-cited']//*[local-name()='doc-number']/text()")
-
-        summary_nodes = _xpath(
-            doc,
-            ".//*[local-name()='summary' or local-name()='summary-of-invention']//*[local-name()='p']",
-        )
-        summary_paragraphs = []
-        summary_node_ids: set[int] = set()
-        for node in summary_nodes:
-            if isinstance(node, etree._Element):
-                summary_node_ids.add(id(node))
-                text = normalize_text(" ".join(node.itertext()))
-                if text:
-                    summary_paragraphs.append(text)
-
-        description_nodes = _xpath(
-            doc,
-            ".//*[local-name()='description' or local-name()='detailed-description']//*[local-name()='p']",
-        )
-        description_paragraphs = []
-        for node in description_nodes:
-            if not isinstance(node, etree._Element):
-                continue
-            if id(node) in summary_node_ids:
-                continue
-            if node.xpath("ancestor::*[local-name()='summary' or local-name()='summary-of-invention']"):
-                continue
+    summary_nodes = _xpath(
+        doc,
+        ".//*[local-name()='summary' or local-name()='summary-of-invention']//*[local-name()='p']",
+    )
+    summary_paragraphs = []
+    summary_node_ids: set[int] = set()
+    for node in summary_nodes:
+        if isinstance(node, etree._Element):
+            summary_node_ids.add(id(node))
             text = normalize_text(" ".join(node.itertext()))
             if text:
-                description_paragraphs.append(text)
-
-        patents.append(
-            PatentRecord(
-                publication_number=pub_num,
-                grant_date=grant_date,
-                title=title,
-                abstract=abstract,
-                summary_paragraphs=summary_paragraphs,
-                description_paragraphs=description_paragraphs,
-                claims=claims,
-                cpc_codes=cpc_codes,
-                citations=citations,
-                raw_json={"publication_number": pub_num, "title": title},
-            )
-        )
-    return patents
-
-
-def parse_week_zip(zip_path: Path, parsed_dir: Path) -> list[PatentRecord]:
-    parsed_dir.mkdir(parents=True, exist_ok=True)
+                summary_paragraphs.append(text)
+
+    description_nodes = _xpath(
+        doc,
+        ".//*[local-name()='description' or local-name()='detailed-description']//*[local-name()='p']",
+    )
+    description_paragraphs = []
+    for node in description_nodes:
+        if not isinstance(node, etree._Element):
+            continue
+        if id(node) in summary_node_ids:
+            continue
+        if node.xpath("ancestor::*[local-name()='summary' or local-name()='summary-of-invention']"):
+            continue
+        text = normalize_text(" ".join(node.itertext()))
+        if text:
+            description_paragraphs.append(text)
+
+    return PatentRecord(
+        publication_number=pub_num,
+        grant_date=grant_date,
+        title=title,
+        abstract=abstract,
+        summary_paragraphs=summary_paragraphs,
+        description_paragraphs=description_paragraphs,
+        claims=claims,
+        cpc_codes=cpc_codes,
+        citations=citations,
+        raw_json={"publication_number": pub_num, "title": title},
+    )
+
+
+def _node_text(node: etree._Element) -> str:
+    return normalize_text(" ".join(node.itertext()))
+
+
+def _text_nodes(node: etree._Element) -> list[str]:
+    # Equivalent of node/text(): the element's own text plus each child's tail.
+    out = [node.text] if node.text is not None else []
+    out.extend(c.tail for c in node if c.tail is not None)
+    return out
+
+
+def _normalized_text_nodes(node: etree._Element) -> list[str]:
+    return [t for t in (normalize_text(x) for x in _text_nodes(node)) if t]
+
+
+def _parse_claim_node(claim: etree._Element) -> dict[str, object] | None:
+    claim_num = claim.get("num")
+    if not claim_num:
+        nums = CLAIM_NUM_XPATH(claim)
+        claim_num = normalize_text(nums[0]) if nums else ""
+    parts = [t for t in (_node_text(n) for n in CLAIM_TEXT_XPATH(claim)) if t]
+    claim_text = " ".join(parts) if parts else _node_text(claim)
+    if not claim_text:
+        return None
+    return parse_claim(claim_text, claim_num or None)
+
+
+def _parse_grant(doc: etree._Element) -> PatentRecord | None:
+    # Single preorder walk; `scope` holds the section tags enclosing the
+    # current node, which replaces the per-field and ancestor:: XPath scans.
+    first: dict[str, str] = {}
+    abstract_parts: list[str] = []
+    claims: list[dict[str, object]] = []
+    cpc_codes: list[str] = []
+    citations: list[str] = []
+    summary_paragraphs: list[str] = []
+    description_paragraphs: list[str] = []
+
+    def visit(node: etree._Element, scope: frozenset[str]) -> None:
+        for child in node:
+            tag = child.tag
+            if not isinstance(tag, str):
+                continue
+            name = tag.rpartition("}")[2]
+            if name == "p":
+                in_abstract = "abstract" in scope
+                in_summary = not SUMMARY_TAGS.isdisjoint(scope)
+                if in_abstract or in_summary or not DESCRIPTION_TAGS.isdisjoint(scope):
+                    text = _node_text(child)
+                    if text:
+                        if in_abstract:
+                            abstract_parts.append(text)
+                        if in_summary:
+                            summary_paragraphs.append(text)
+                        elif not DESCRIPTION_TAGS.isdisjoint(scope):
+                            description_paragraphs.append(text)
+            elif name == "doc-number":
+                if "references-cited" in scope:
+                    citations.extend(_normalized_text_nodes(child))
+                if "doc-number" not in first and PUB_REF_TAGS <= scope:
+                    nodes = _text_nodes(child)
+                    if nodes:
+                        first["doc-number"] = nodes[0]
+            elif name == "date":
+                if "date" not in first and PUB_REF_TAGS <= scope:
+                    nodes = _text_nodes(child)
+                    if nodes:
+                        first["date"] = nodes[0]
+            elif name == "invention-title":
+                if "invention-title" not in first:
+                    nodes = _text_nodes(child)
+                    if nodes:
+                        first["invention-title"] = nodes[0]
+            elif name == "classification-cpc-text":
+                cpc_codes.extend(_normalized_text_nodes(child))
+            elif name == "claim" and "claims" in scope:
+                claim = _parse_claim_node(child)
+                if claim is not None:
+                    claims.append(claim)
+            if len(child):
+                visit(child, scope | {name} if name in SCOPE_TAGS else scope)
+
+    visit(doc, frozenset())
+
+    pub_num = normalize_text(first.get("doc-number", ""))
+    if not pub_num:
+        return None
+    title = normalize_text(first.get("invention-title", ""))
+    return PatentRecord(
+        publication_number=pub_num,
+        grant_date=normalize_text(first.get("date", "")) or None,
+        title=title,
+        abstract=normalize_text(" ".join(abstract_parts)),
+        summary_paragraphs=summary_paragraphs,
+        description_paragraphs=description_paragraphs,
+        claims=claims,
+        cpc_codes=cpc_codes,
+        citations=citations,
+        raw_json={"publication_number": pub_num, "title": title},
+    )
+
+
+PARSER_ENGINES: dict[str, Callable[[etree._Element], PatentRecord | None]] = {
+    "walk": _parse_grant,
+    "xpath": _parse_grant_xpath,
+}
+
+
+def split_xml_documents(stream: IO[bytes]) -> Iterator[bytes]:
+    # Weekly ipgYYYYMMDD.xml files are standalone documents concatenated
+    # back to back; split on each declaration so only one is held at a time.
+    buf: list[bytes] = []
+    for line in stream:
+        match = XML_DECL_RE.search(line)
+        if match:
+            head = line[: match.start()]
+            if head.strip():
+                buf.append(head)
+            doc = b"".join(buf)
+            if doc.strip():
+                yield doc
+            buf = [line[match.start() :]]
+        else:
+            buf.append(line)
+    doc = b"".join(buf)
+    if doc.strip():
+        yield doc
+
+
+def _matches_cpc_prefix(codes: Iterable[str], prefix: str) -> bool:
+    up = prefix.upper()
+    return any(normalize_text(c).upper().startswith(up) for c in codes)
+
+
+def doc_matches_cpc(doc_bytes: bytes, prefix: str) -> bool:
+    # Cheap byte scan of classification-cpc-text values so non-matching
+    # documents never reach the XML parser. A match here is a necessary
+    # condition only; _iter_grants re-checks each grant in the tree. CDATA
+    # sections are unwrapped; a value still holding markup or an entity
+    # reference cannot be decoded here, so the document goes to the full parse.
+    codes: list[str] = []
+    for raw in CPC_TEXT_RE.findall(doc_bytes):
+        value = CDATA_RE.sub(rb"\1", raw)
+        if b"&" in value or b"<" in value:
+            return True
+        codes.append(value.decode("utf-8", "replace"))
+    return _matches_cpc_prefix(codes, prefix)
+
+
+def _iter_grants(doc_bytes: bytes, engine: str = "walk", cpc_prefix: str | None = None) -> Iterator[PatentRecord]:
+    parse_grant = PARSER_ENGINES[engine]
+    context = etree.iterparse(io.BytesIO(doc_bytes), events=("end",), tag=GRANT_TAG)
+    for _, elem in context:
+        if cpc_prefix and not _matches_cpc_prefix(CPC_TEXT_XPATH(elem), cpc_prefix):
+            patent = None
+        else:
+            patent = parse_grant(elem)
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+        if patent is not None:
+            yield patent
+    del context
+
+
+def iter_patent_xml(xml_bytes: bytes, engine: str = "walk", cpc_prefix: str | None = None) -> Iterator[PatentRecord]:
+    for doc in split_xml_documents(io.BytesIO(xml_bytes)):
+        if cpc_prefix and not doc_matches_cpc(doc, cpc_prefix):
+            continue
+        yield from _iter_grants(doc, engine, cpc_prefix)
+
+
+def parse_patent_xml(xml_bytes: bytes, engine: str = "walk", cpc_prefix: str | None = None) -> list[PatentRecord]:
+    return list(iter_patent_xml(xml_bytes, engine, cpc_prefix))
+
+
+def _parse_document_batch(docs: list[bytes], cpc_prefix: str | None = None) -> list[PatentRecord]:
     out: list[PatentRecord] = []
+    for doc in docs:
+        out.extend(_iter_grants(doc, cpc_prefix=cpc_prefix))
+    return out
+
+
+def _iter_zip_documents(zip_path: Path) -> Iterator[bytes]:
     with zipfile.ZipFile(zip_path, "r") as zf:
         for name in zf.namelist():
             if not name.lower().endswith(".xml"):
                 continue
-            patents = parse_patent_xml(zf.read(name))
-            for p in patents:
-                (parsed_dir / f"{p.publication_number}.json").write_text(json.dumps(p.__dict__, ensure_ascii=False, indent=2))
-            out.extend(patents)
-    LOGGER.info("Parsed %s patents from %s", len(out), zip_path)
-    return out
+            with zf.open(name) as member:
+                yield from split_xml_documents(member)
+
+
+def _parse_parallel(
+    docs: Iterator[bytes],
+    workers: int,
+    cpc_prefix: str | None = None,
+    docs_per_task: int = DOCS_PER_TASK,
+) -> Iterator[PatentRecord]:
+    # Futures are drained strictly in submission order, so output order matches
+    # the single-process path; the bounded window keeps memory flat.
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending: deque[Future[list[PatentRecord]]] = deque()
+    try:
+        while True:
+            batch = list(islice(docs, docs_per_task))
+            if not batch:
+                break
+            pending.append(pool.submit(_parse_document_batch, batch, cpc_prefix))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_week_zip(
+    zip_path: Path,
+    parsed_dir: Path | None = None,
+    workers: int = 1,
+    cpc_prefix: str | None = None,
+) -> Iterator[PatentRecord]:
+    if parsed_dir is not None:
+        parsed_dir.mkdir(parents=True, exist_ok=True)
+    skipped = 0
+
+    def prefiltered(docs: Iterator[bytes]) -> Iterator[bytes]:
+        nonlocal skipped
+        for doc in docs:
+            if doc_matches_cpc(doc, cpc_prefix):
+                yield doc
+            else:
+                skipped += 1
+
+    docs = _iter_zip_documents(zip_path)
+    if cpc_prefix:
+        docs = prefiltered(docs)
+    if workers > 1:
+        records = _parse_parallel(docs, workers, cpc_prefix)
+    else:
+        records = (p for doc in docs for p in _iter_grants(doc, cpc_prefix=cpc_prefix))
+    count = 0
+    for p in records:
+        if parsed_dir is not None:
+            (parsed_dir / f"{p.publication_number}.json").write_text(json.dumps(p.__dict__, ensure_ascii=False, indent=2))
+        count += 1
+        PARSED_PATENTS.inc()
+        yield p
+    LOGGER.info(
+        "Parsed %s patents from %s (workers=%s, cpc_prefix=%s, skipped_docs=%s)",
+        count,
+        zip_path,
+        workers,
+        cpc_prefix,
+        skipped,
+    )
+
+
+def parse_week_zip(
+    zip_path: Path,
+    parsed_dir: Path,
+    workers: int = 1,
+    cpc_prefix: str | None = None,
+) -> list[PatentRecord]:
+    return list(iter_week_zip(zip_path, parsed_dir, workers=workers, cpc_prefix=cpc_prefix))
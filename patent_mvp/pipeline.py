@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from patent_mvp.metrics import STAGE_SECONDS
+
+LOGGER = logging.getLogger(__name__)
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Iterable[Any] | None]
+    workers: int
+    inbox: queue.Queue
+    outbox: queue.Queue
+    items: int = 0
+    busy_seconds: float = 0.0
+    alive: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class Pipeline:
+    # Threaded stages connected by bounded queues. A full queue blocks its
+    # producers (backpressure); each stage owns its worker count. The first
+    # exception in any worker stops every stage and is re-raised by run().
+
+    def __init__(self, queue_size: int = 4) -> None:
+        self.queue_size = queue_size
+        self.stages: list[Stage] = []
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+
+    def add_stage(self, name: str, fn: Callable[[Any], Iterable[Any] | None], workers: int = 1) -> None:
+        inbox = self.stages[-1].outbox if self.stages else queue.Queue(maxsize=self.queue_size)
+        outbox: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self.stages.append(Stage(name=name, fn=fn, workers=max(1, workers), inbox=inbox, outbox=outbox))
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, stage: Stage, exc: BaseException) -> None:
+        if self._error is None:
+            self._error = exc
+            LOGGER.error("Pipeline stage %s failed: %s", stage.name, exc)
+        self._stop.set()
+
+    def _work(self, stage: Stage, last: bool) -> None:
+        try:
+            while True:
+                item = self._get(stage.inbox)
+                if item is _DONE:
+                    self._put(stage.inbox, _DONE)
+                    break
+                t0 = time.perf_counter()
+                blocked = 0.0
+                outputs = iter(stage.fn(item) or ())
+                stopped = False
+                try:
+                    for out in outputs:
+                        if self._stop.is_set():
+                            stopped = True
+                            break
+                        if not last:
+                            t1 = time.perf_counter()
+                            stopped = not self._put(stage.outbox, out)
+                            blocked += time.perf_counter() - t1
+                            if stopped:
+                                break
+                finally:
+                    # Another stage failed: abandon the rest of this item's
+                    # work (e.g. parsing the rest of a week) instead of draining it.
+                    close = getattr(outputs, "close", None)
+                    if close is not None:
+                        close()
+                if stopped:
+                    break
+                busy = time.perf_counter() - t0 - blocked
+                STAGE_SECONDS.observe(busy, stage=stage.name)
+                with stage.lock:
+                    stage.items += 1
+                    stage.busy_seconds += busy
+        except BaseException as exc:  # noqa: BLE001
+            self._fail(stage, exc)
+        finally:
+            with stage.lock:
+                stage.alive -= 1
+                finished = stage.alive == 0
+            if finished and not last:
+                self._put(stage.outbox, _DONE)
+
+    def _feed(self, items: Iterable[Any]) -> None:
+        try:
+            for item in items:
+                if not self._put(self.stages[0].inbox, item):
+                    return
+            self._put(self.stages[0].inbox, _DONE)
+        except BaseException as exc:  # noqa: BLE001
+            self._fail(self.stages[0], exc)
+
+    def run(self, items: Iterable[Any]) -> None:
+        threads = [threading.Thread(target=self._feed, args=(items,), name="pipeline-feed", daemon=True)]
+        for i, stage in enumerate(self.stages):
+            stage.alive = stage.workers
+            last = i == len(self.stages) - 1
+            for w in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, args=(stage, last), name=f"{stage.name}-{w}", daemon=True))
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        for stage in self.stages:
+            LOGGER.info(
+                "Stage %s: workers=%s items=%s busy=%.1fs (%.0f%% of %.1fs wall)",
+                stage.name,
+                stage.workers,
+                stage.items,
+                stage.busy_seconds,
+                100 * stage.busy_seconds / max(elapsed * stage.workers, 1e-9),
+                elapsed,
+            )
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from patent_mvp.config import SETTINGS
+from patent_mvp.metrics import CACHE_LOOKUPS
+
+GENERATION_FILE = "ingest_generation"
+DISK_PRUNE_EVERY = 64
+
+
+def generation_path(data_root: str | Path | None = None) -> Path:
+    return Path(data_root or SETTINGS.data_root) / GENERATION_FILE
+
+
+def read_generation(path: Path) -> int:
+    try:
+        return int(path.read_text().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def bump_generation(path: Path) -> int:
+    # Called by ingest whenever a week lands; every cached result tagged with
+    # an older generation is treated as a miss from then on.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    value = read_generation(path) + 1
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(str(value))
+    os.replace(tmp, path)
+    return value
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+def result_key(query: str, **params: Any) -> str:
+    payload = json.dumps({"query": normalize_query(query), **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class QueryResultCache:
+    # Two tiers of hybrid_search results: an in-process LRU and an optional
+    # SQLite file shared by CLI runs and the service. Entries expire after
+    # ttl_seconds and are ignored once the ingest generation moves on.
+    # Results are stored as JSON so every hit hands back a fresh copy.
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        disk_dir: str | Path | None = None,
+        disk_max_entries: int = 100_000,
+        generation_file: Path | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self.generation_file = generation_file or generation_path()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        self._memory: OrderedDict[str, tuple[float, int, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._generation_mtime: int | None = None
+        self.db: sqlite3.Connection | None = None
+        if disk_dir:
+            root = Path(disk_dir)
+            root.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(root / "query_cache.sqlite", check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            with self.db:
+                self.db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS results (
+                      key TEXT PRIMARY KEY,
+                      generation INTEGER NOT NULL,
+                      expires_at REAL NOT NULL,
+                      last_used REAL NOT NULL,
+                      payload TEXT NOT NULL
+                    )
+                    """
+                )
+                self.db.execute("CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used)")
+
+    def generation(self) -> int:
+        try:
+            mtime = self.generation_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._generation_mtime:
+            self._generation_mtime = mtime
+            self._generation = read_generation(self.generation_file)
+        return self._generation
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            generation = self.generation()
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, entry_generation, payload = entry
+                if expires_at > now and entry_generation == generation:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    CACHE_LOOKUPS.inc(cache="query", result="hit")
+                    return json.loads(payload)
+                del self._memory[key]
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT expires_at, payload FROM results WHERE key=? AND generation=? AND expires_at>?",
+                    (key, generation, now),
+                ).fetchone()
+                if row is not None:
+                    with self.db:
+                        self.db.execute("UPDATE results SET last_used=? WHERE key=?", (now, key))
+                    self._remember(key, row[0], generation, row[1])
+                    self.stats["disk_hits"] += 1
+                    CACHE_LOOKUPS.inc(cache="query", result="disk_hit")
+                    return json.loads(row[1])
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.inc(cache="query", result="miss")
+            return None
+
+    def put(self, key: str, result: dict) -> bool:
+        if result.get("degraded"):
+            return False
+        payload = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            generation = self.generation()
+            self._remember(key, now + self.ttl_seconds, generation, payload)
+            if self.db is not None:
+                with self.db:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO results(key, generation, expires_at, last_used, payload) VALUES (?, ?, ?, ?, ?)",
+                        (key, generation, now + self.ttl_seconds, now, payload),
+                    )
+                    if self.stats["stores"] % DISK_PRUNE_EVERY == 0:
+                        self._prune_disk(generation, now)
+            self.stats["stores"] += 1
+            return True
+
+    def _prune_disk(self, generation: int, now: float) -> None:
+        assert self.db is not None
+        self.db.execute("DELETE FROM results WHERE generation<>? OR expires_at<=?", (generation, now))
+        self.db.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        )
+
+    def _remember(self, key: str, expires_at: float, generation: int, payload: str) -> None:
+        self._memory[key] = (expires_at, generation, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self.db is not None:
+                with self.db:
+                    self.db.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def open_query_cache(disk: bool = True) -> QueryResultCache | None:
+    if not SETTINGS.query_cache_enabled:
+        return None
+    return QueryResultCache(
+        max_entries=SETTINGS.query_cache_max_entries,
+        ttl_seconds=SETTINGS.query_cache_ttl_seconds,
+        disk_dir=SETTINGS.query_cache_dir if disk else None,
+        disk_max_entries=SETTINGS.query_cache_disk_max_entries,
+    )
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import numpy as np
+
+from patent_mvp.columnar import ColumnarStore
+from patent_mvp.config import SETTINGS
+from patent_mvp.embedding_cache import MmapEmbeddingCache
+from patent_mvp.embeddings import open_embedding_cache
+from patent_mvp.ingest import batched
+from patent_mvp.metrics import exporting
+from patent_mvp.models import EvidenceChunk, PatentRecord
+from patent_mvp.pipeline import Pipeline
+from patent_mvp.query_cache import bump_generation, generation_path
+from patent_mvp.storage import OpenSearchStore, PostgresStore
+
+LOGGER = logging.getLogger(__name__)
+REINDEX_TARGETS = ("postgres", "opensearch")
+REINDEX_SOURCES = ("auto", "jsonl", "columnar")
+
+
+@dataclass
+class ReindexBatch:
+    week_date: str
+    patents: list[PatentRecord]
+    chunks: list[EvidenceChunk]
+    vectors: list[np.ndarray | None]
+
+
+@dataclass
+class ReindexStats:
+    weeks: int = 0
+    patents: int = 0
+    chunks: int = 0
+    # Neither in the columnar embeddings nor the cache; written without one.
+    missing_vectors: int = 0
+    # Chunks whose patent record was not found locally (skipped for Postgres).
+    missing_patents: int = 0
+    seconds: float = 0.0
+    sources: dict[str, str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in vars(self).items() if not k.startswith("_")}
+
+
+def local_weeks(data_root: str | Path, columnar: ColumnarStore | None = None) -> list[str]:
+    derived = Path(data_root) / "derived" / "chunks"
+    weeks = {p.stem[len("ipg") :] for p in derived.glob("ipg*.jsonl")}
+    if columnar is not None:
+        weeks.update(columnar.weeks("chunks"))
+    return sorted(weeks)
+
+
+def _jsonl_chunks(path: Path) -> Iterator[EvidenceChunk]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield EvidenceChunk(**json.loads(line))
+
+
+def _parsed_patent(parsed_dir: Path, pub: str) -> PatentRecord | None:
+    path = parsed_dir / f"{pub}.json"
+    return PatentRecord(**json.loads(path.read_text(encoding="utf-8"))) if path.exists() else None
+
+
+def run_reindex(
+    weeks: Sequence[str] | None = None,
+    targets: Sequence[str] = REINDEX_TARGETS,
+    source: str = "auto",
+    read_workers: int = 2,
+    write_workers: int = 2,
+    queue_size: int = 4,
+    batch_size: int | None = None,
+    recreate_index: bool = False,
+) -> dict:
+    # Rebuilds Postgres and/or OpenSearch from what ingest left on disk: the
+    # chunk JSONL (or columnar store), parsed patents and cached embeddings.
+    # Weeks are read concurrently and written by a separate stage, so the run
+    # is bound by the stores rather than by XML parsing or the model.
+    unknown = set(targets) - set(REINDEX_TARGETS)
+    if unknown or not targets:
+        raise ValueError(f"Unknown reindex targets {sorted(unknown)}; expected some of {REINDEX_TARGETS}")
+    if source not in REINDEX_SOURCES:
+        raise ValueError(f"Unknown reindex source {source!r}; expected one of {REINDEX_SOURCES}")
+
+    data_root = Path(SETTINGS.data_root)
+    derived_dir = data_root / "derived" / "chunks"
+    parsed_dir = data_root / "parsed" / "patents"
+    columnar = ColumnarStore(data_root / "derived" / "columnar") if source != "jsonl" else None
+    selected = list(weeks) if weeks else local_weeks(data_root, columnar)
+    stats = ReindexStats()
+    if not selected:
+        LOGGER.info("No local chunk artifacts found under %s", data_root / "derived")
+        return stats.as_dict()
+
+    pg = PostgresStore(SETTINGS.postgres_dsn, pooled=SETTINGS.pg_pool_enabled) if "postgres" in targets else None
+    os_store = OpenSearchStore(SETTINGS.opensearch_url, SETTINGS.opensearch_index) if "opensearch" in targets else None
+    if os_store is not None:
+        if recreate_index and os_store.client.indices.exists(index=os_store.index_name):
+            os_store.client.indices.delete(index=os_store.index_name)
+            LOGGER.info("Dropped OpenSearch index %s", os_store.index_name)
+        os_store.ensure_index()
+    # Vectors only matter for Postgres; the cache fills in for weeks without
+    # a columnar embeddings file.
+    cache: MmapEmbeddingCache | None = open_embedding_cache() if pg is not None else None
+    size = batch_size or SETTINGS.ingest_batch_size
+
+    def week_source(week_date: str) -> str:
+        if source != "auto":
+            return source
+        return "columnar" if columnar is not None and columnar.path("chunks", week_date).exists() else "jsonl"
+
+    def read_stage(week_date: str) -> Iterator[ReindexBatch]:
+        kind = week_source(week_date)
+        vectors_by_id: dict[str, np.ndarray] = {}
+        if kind == "columnar":
+            assert columnar is not None
+            chunks = columnar.iter_chunks(week_date)
+            patents = {p.publication_number: p for p in columnar.iter_patents(week_date)} if pg is not None else {}
+            if pg is not None and columnar.path("embeddings", week_date).exists():
+                ids, matrix = columnar.embedding_matrix(week_date)
+                vectors_by_id = dict(zip(ids, matrix))
+        else:
+            path = derived_dir / f"ipg{week_date}.jsonl"
+            if not path.exists():
+                raise FileNotFoundError(f"No chunk JSONL for week {week_date}: {path}")
+            chunks = _jsonl_chunks(path)
+            patents = {}
+        with stats._lock:
+            stats.weeks += 1
+            stats.sources[week_date] = kind
+
+        # Chunks of one patent are contiguous in both sources; batches never
+        # split a patent, so its row is written with (before) its chunks.
+        by_patent = ((pub, list(group)) for pub, group in groupby(chunks, key=lambda c: c.publication_number))
+        for group in batched(by_patent, size):
+            batch_patents: list[PatentRecord] = []
+            batch_chunks: list[EvidenceChunk] = []
+            missing = 0
+            for pub, pub_chunks in group:
+                batch_chunks.extend(pub_chunks)
+                if pg is None:
+                    continue
+                patent = patents.get(pub) or _parsed_patent(parsed_dir, pub)
+                if patent is None:
+                    missing += len(pub_chunks)
+                else:
+                    batch_patents.append(patent)
+            vectors: list[np.ndarray | None] = [vectors_by_id.get(c.chunk_id) for c in batch_chunks]
+            if cache is not None:
+                lookup = [c.metadata.get("text_hash", "") for c, v in zip(batch_chunks, vectors) if v is None]
+                found = cache.get_many(lookup) if lookup else {}
+                vectors = [v if v is not None else found.get(c.metadata.get("text_hash", "")) for c, v in zip(batch_chunks, vectors)]
+            with stats._lock:
+                stats.missing_patents += missing
+            yield ReindexBatch(week_date, batch_patents, batch_chunks, vectors)
+
+    def write_stage(batch: ReindexBatch) -> None:
+        missing_vectors = 0
+        if pg is not None:
+            # Chunk rows reference their patent; skip those without a record.
+            known = {p.publication_number for p in batch.patents}
+            keep = [i for i, c in enumerate(batch.chunks) if c.publication_number in known]
+            vectors = [batch.vectors[i] for i in keep]
+            # Columnar and cached vectors both come from the configured
+            # model, so they carry the cache's namespace.
+            pg.bulk_write(batch.patents, [batch.chunks[i] for i in keep], vectors, cache.namespace if cache is not None else None)
+            missing_vectors = sum(1 for v in vectors if v is None)
+        if os_store is not None:
+            os_store.index_chunks(batch.chunks, refresh=False)
+        with stats._lock:
+            stats.patents += len(batch.patents)
+            stats.chunks += len(batch.chunks)
+            stats.missing_vectors += missing_vectors
+
+    pipeline = Pipeline(queue_size=queue_size)
+    pipeline.add_stage("read", read_stage, read_workers)
+    pipeline.add_stage("write", write_stage, write_workers)
+
+    start = time.perf_counter()
+    try:
+        with exporting(), os_store.bulk_ingest_mode() if os_store is not None else nullcontext():
+            pipeline.run(selected)
+    finally:
+        if cache is not None:
+            cache.close()
+        if pg is not None:
+            pg.close()
+    stats.seconds = round(time.perf_counter() - start, 3)
+    bump_generation(generation_path(SETTINGS.data_root))
+    if stats.missing_vectors:
+        LOGGER.warning("%s chunk(s) had no columnar or cached vector and were written without one", stats.missing_vectors)
+    LOGGER.info("Reindexed %s", stats.as_dict())
+    return stats.as_dict()
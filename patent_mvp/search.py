@@ -1,12 +1,45 @@
 from __future__ import annotations
 
+import logging
+import threading
+import time
 from collections import defaultdict
-from typing import TYPE_CHECKING
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Sequence
 
+from patent_mvp.config import SETTINGS
 from patent_mvp.embeddings import EmbeddingProvider
+from patent_mvp.metrics import SEARCH_DEGRADED, SEARCH_LEG_SECONDS, SEARCH_SECONDS
+from patent_mvp.query_cache import result_key
 
 if TYPE_CHECKING:
+    from patent_mvp.query_cache import QueryResultCache
     from patent_mvp.storage import OpenSearchStore, PostgresStore
+    from patent_mvp.vector_index import LocalVectorIndex
+
+LOGGER = logging.getLogger(__name__)
+_LEG_EXECUTOR: ThreadPoolExecutor | None = None
+_LEG_LOCK = threading.Lock()
+
+
+def leg_threads() -> int:
+    # A leg's deadline runs from submission, so time queued behind other
+    # searches counts against it. Two legs per concurrent search keeps that
+    # queue empty at SERVE_THREADS concurrency.
+    return SETTINGS.search_leg_threads or 2 * SETTINGS.serve_threads
+
+
+def _leg_executor() -> ThreadPoolExecutor:
+    global _LEG_EXECUTOR
+    with _LEG_LOCK:
+        if _LEG_EXECUTOR is None:
+            _LEG_EXECUTOR = ThreadPoolExecutor(max_workers=leg_threads(), thread_name_prefix="search-leg")
+        return _LEG_EXECUTOR
+
+
+def timed_leg(name: str, fn: Callable[..., Any], *args: Any) -> Any:
+    with SEARCH_LEG_SECONDS.time(leg=name):
+        return fn(*args)
 
 
 def merge_scores(
@@ -37,20 +70,41 @@ def rank_patents(chunks: list[dict]) -> list[dict]:
     return [{"publication_number": p, "score": s} for p, s in sorted(patent_scores.items(), key=lambda kv: kv[1], reverse=True)]
 
 
-def hybrid_search(
+def vector_leg(
     query: str,
     embedder: EmbeddingProvider,
+    pg: "PostgresStore | LocalVectorIndex",
+    topk_vec: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> list[tuple[str, str, float]]:
+    q_vec = embedder.embed([query])[0]
+    return pg.vector_search(q_vec, topk_vec, ef_search=ef_search, probes=probes)
+
+
+def vector_leg_batch(
+    queries: Sequence[str],
+    embedder: EmbeddingProvider,
+    pg: "PostgresStore | LocalVectorIndex",
+    topk_vec: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> list[list[tuple[str, str, float]]]:
+    q_vecs = embedder.embed(list(queries))
+    return pg.vector_search_batch(q_vecs, topk_vec, ef_search=ef_search, probes=probes)
+
+
+def fuse_results(
+    bm25: list[tuple[str, str, float, str]] | None,
+    vec: list[tuple[str, str, float]] | None,
     pg: "PostgresStore",
-    os_store: "OpenSearchStore",
     topk: int = 50,
-    topk_bm25: int = 200,
-    topk_vec: int = 200,
     graph_expand: bool = False,
 ) -> dict:
-    bm25 = os_store.bm25_search(query, topk_bm25)
-    q_vec = embedder.embed([query])[0]
-    vec = pg.vector_search(q_vec, topk_vec)
-    merged = merge_scores(bm25, vec)
+    # A leg that failed or timed out is passed as None: the other leg's hits
+    # are still ranked and the response lists the missing leg as degraded.
+    degraded = [name for name, hits in (("bm25", bm25), ("vector", vec)) if hits is None]
+    merged = merge_scores(bm25 or [], vec or [])
 
     if graph_expand:
         seeds = {x["publication_number"] for x in merged[:topk]}
@@ -62,4 +116,134 @@ def hybrid_search(
 
     top_chunks = merged[:topk]
     patents = rank_patents(top_chunks)
-    return {"chunks": top_chunks, "patents": patents}
+    return {"chunks": top_chunks, "patents": patents, "degraded": degraded}
+
+
+def vector_backend(vector_index: "LocalVectorIndex | None") -> str:
+    return "pgvector" if vector_index is None else "local"
+
+
+def search_cache_key(query: str, embedder: EmbeddingProvider, **params: object) -> str:
+    # Everything that changes the query vector is part of the key, so a new
+    # model revision or normalize setting never serves stale results.
+    model = getattr(embedder, "model_name", type(embedder).__name__)
+    revision = getattr(embedder, "revision", None)
+    normalize = getattr(embedder, "normalize", None)
+    return result_key(query, model=model, revision=revision, normalize=normalize, **params)
+
+
+def collect_legs(names: Sequence[str], futures: Sequence[Future], timeouts: Sequence[float]) -> list:
+    # Waits for every leg against its own deadline, measured from the same
+    # start, so total latency is bounded by the slowest allowed leg rather
+    # than the sum. Raises only if every leg failed.
+    start = time.perf_counter()
+    results: list = []
+    errors: list[BaseException] = []
+    for name, future, timeout in zip(names, futures, timeouts):
+        try:
+            results.append(future.result(timeout=max(0.0, timeout - (time.perf_counter() - start))))
+        except Exception as exc:  # noqa: BLE001
+            future.cancel()
+            SEARCH_DEGRADED.inc(leg=name)
+            LOGGER.warning("Search leg %s degraded: %r", name, exc)
+            results.append(None)
+            errors.append(exc)
+    if len(errors) == len(futures):
+        raise errors[0]
+    return results
+
+
+def hybrid_search(
+    query: str,
+    embedder: EmbeddingProvider,
+    pg: "PostgresStore",
+    os_store: "OpenSearchStore",
+    topk: int = 50,
+    topk_bm25: int = 200,
+    topk_vec: int = 200,
+    graph_expand: bool = False,
+    timeout_bm25: float | None = None,
+    timeout_vec: float | None = None,
+    executor: ThreadPoolExecutor | None = None,
+    cache: "QueryResultCache | None" = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    vector_index: "LocalVectorIndex | None" = None,
+) -> dict:
+    # vector_index replaces pgvector for the vector leg; Postgres still
+    # serves graph expansion.
+    with SEARCH_SECONDS.time(mode="single"):
+        key = search_cache_key(
+            query, embedder, topk=topk, topk_bm25=topk_bm25, topk_vec=topk_vec, graph_expand=graph_expand,
+            ef_search=ef_search, probes=probes, vector_backend=vector_backend(vector_index),
+        )
+        if cache is not None and (hit := cache.get(key)) is not None:
+            return hit
+        pool = executor or _leg_executor()
+        bm25, vec = collect_legs(
+            ("bm25", "vector"),
+            (
+                pool.submit(timed_leg, "bm25", os_store.bm25_search, query, topk_bm25),
+                pool.submit(timed_leg, "vector", vector_leg, query, embedder, vector_index or pg, topk_vec, ef_search, probes),
+            ),
+            (timeout_bm25 or SETTINGS.search_bm25_timeout, timeout_vec or SETTINGS.search_vector_timeout),
+        )
+        out = timed_leg("fuse", fuse_results, bm25, vec, pg, topk, graph_expand)
+        if cache is not None:
+            cache.put(key, out)
+        return out
+
+
+def hybrid_search_batch(
+    queries: Sequence[str],
+    embedder: EmbeddingProvider,
+    pg: "PostgresStore",
+    os_store: "OpenSearchStore",
+    topk: int = 50,
+    topk_bm25: int = 200,
+    topk_vec: int = 200,
+    graph_expand: bool = False,
+    timeout_bm25: float | None = None,
+    timeout_vec: float | None = None,
+    executor: ThreadPoolExecutor | None = None,
+    cache: "QueryResultCache | None" = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    vector_index: "LocalVectorIndex | None" = None,
+) -> list[dict]:
+    # Same ranking as hybrid_search per query, but the whole set costs one
+    # encode call, one OpenSearch msearch and one SQL statement. Cached
+    # queries are answered up front and left out of the batch.
+    with SEARCH_SECONDS.time(mode="batch"):
+        keys = [
+            search_cache_key(
+                q, embedder, topk=topk, topk_bm25=topk_bm25, topk_vec=topk_vec, graph_expand=graph_expand,
+                ef_search=ef_search, probes=probes, vector_backend=vector_backend(vector_index),
+            )
+            for q in queries
+        ]
+        results: list[dict | None] = [cache.get(k) if cache is not None else None for k in keys]
+        misses = [i for i, r in enumerate(results) if r is None]
+        if not misses:
+            return results  # type: ignore[return-value]
+        pending = [queries[i] for i in misses]
+        pool = executor or _leg_executor()
+        bm25, vec = collect_legs(
+            ("bm25", "vector"),
+            (
+                pool.submit(timed_leg, "bm25", os_store.bm25_msearch, pending, topk_bm25),
+                pool.submit(timed_leg, "vector", vector_leg_batch, pending, embedder, vector_index or pg, topk_vec, ef_search, probes),
+            ),
+            (timeout_bm25 or SETTINGS.search_bm25_timeout, timeout_vec or SETTINGS.search_vector_timeout),
+        )
+        for j, i in enumerate(misses):
+            results[i] = fuse_results(
+                bm25[j] if bm25 is not None else None,
+                vec[j] if vec is not None else None,
+                pg,
+                topk=topk,
+                graph_expand=graph_expand,
+            )
+            if cache is not None:
+                cache.put(keys[i], results[i])
+        return results  # type: ignore[return-value]
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Callable
+
+from patent_mvp.config import SETTINGS
+from patent_mvp.embeddings import EmbeddingProvider
+from patent_mvp.metrics import METRICS, SEARCH_DEGRADED, SEARCH_SECONDS, exporting
+from patent_mvp.query_cache import QueryResultCache, open_query_cache
+from patent_mvp.search import fuse_results, search_cache_key, timed_leg, vector_backend, vector_leg
+from patent_mvp.vector_index import LocalVectorIndex, open_vector_index
+
+if TYPE_CHECKING:
+    from patent_mvp.storage import OpenSearchStore, PostgresStore
+
+LOGGER = logging.getLogger(__name__)
+MAX_BODY_BYTES = 1024 * 1024
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SEARCH_PARAMS = {"topk": int, "topk_bm25": int, "topk_vec": int, "graph_expand": bool, "ef_search": int, "probes": int}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class SearchService:
+    # Long-lived search endpoint: the embedding model, Postgres pool and
+    # OpenSearch client are created once and shared by every request. The
+    # blocking clients run on a thread pool so the event loop only parses
+    # HTTP and awaits the BM25 and vector legs side by side.
+
+    def __init__(
+        self,
+        embedder: EmbeddingProvider,
+        pg: "PostgresStore",
+        os_store: "OpenSearchStore",
+        threads: int | None = None,
+        timeout_bm25: float | None = None,
+        timeout_vec: float | None = None,
+        cache: QueryResultCache | None = None,
+        vector_index: "LocalVectorIndex | None" = None,
+    ) -> None:
+        self.embedder = embedder
+        self.pg = pg
+        self.vector_index = vector_index
+        self.os_store = os_store
+        self.timeout_bm25 = timeout_bm25 or SETTINGS.search_bm25_timeout
+        self.timeout_vec = timeout_vec or SETTINGS.search_vector_timeout
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=threads or SETTINGS.serve_threads, thread_name_prefix="search")
+        self.server: asyncio.AbstractServer | None = None
+
+    def warm(self) -> None:
+        # First encode call pays for CUDA/tokenizer initialisation.
+        self.embedder.embed(["warm up"])
+
+    async def search(
+        self,
+        query: str,
+        topk: int = 50,
+        topk_bm25: int = 200,
+        topk_vec: int = 200,
+        graph_expand: bool = False,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> dict:
+        with SEARCH_SECONDS.time(mode="service"):
+            return await self._search(query, topk, topk_bm25, topk_vec, graph_expand, ef_search, probes)
+
+    async def _search(
+        self,
+        query: str,
+        topk: int,
+        topk_bm25: int,
+        topk_vec: int,
+        graph_expand: bool,
+        ef_search: int | None,
+        probes: int | None,
+    ) -> dict:
+        key = search_cache_key(
+            query, self.embedder, topk=topk, topk_bm25=topk_bm25, topk_vec=topk_vec, graph_expand=graph_expand,
+            ef_search=ef_search, probes=probes, vector_backend=vector_backend(self.vector_index),
+        )
+        # The result cache may hit SQLite on disk, so it runs on the pool
+        # with the other blocking calls instead of on the event loop.
+        loop = asyncio.get_running_loop()
+        if self.cache is not None and (hit := await loop.run_in_executor(self.executor, self.cache.get, key)) is not None:
+            return hit
+        bm25, vec = await asyncio.gather(
+            self._leg("bm25", self.timeout_bm25, self.os_store.bm25_search, query, topk_bm25),
+            self._leg("vector", self.timeout_vec, vector_leg, query, self.embedder, self.vector_index or self.pg, topk_vec, ef_search, probes),
+        )
+        if bm25 is None and vec is None:
+            raise RuntimeError("both search legs failed")
+        out = await loop.run_in_executor(self.executor, timed_leg, "fuse", fuse_results, bm25, vec, self.pg, topk, graph_expand)
+        if self.cache is not None:
+            await loop.run_in_executor(self.executor, self.cache.put, key, out)
+        return out
+
+    async def _leg(self, name: str, timeout: float, fn: Callable[..., list], *args: Any) -> list | None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.executor, timed_leg, name, fn, *args), timeout)
+        except Exception as exc:  # noqa: BLE001
+            SEARCH_DEGRADED.inc(leg=name)
+            LOGGER.warning("Search leg %s degraded: %r", name, exc)
+            return None
+
+    @staticmethod
+    def _search_args(body: bytes) -> dict[str, Any]:
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as exc:
+            raise BadRequest(f"invalid JSON: {exc}") from exc
+        if not isinstance(payload, dict) or not isinstance(payload.get("query"), str) or not payload["query"].strip():
+            raise BadRequest("body must be a JSON object with a non-empty 'query' string")
+        args: dict[str, Any] = {"query": payload["query"]}
+        for name, kind in SEARCH_PARAMS.items():
+            if name in payload:
+                if not isinstance(payload[name], kind) or (kind is int and isinstance(payload[name], bool)):
+                    raise BadRequest(f"'{name}' must be {kind.__name__}")
+                args[name] = payload[name]
+        return args
+
+    async def handle(self, method: str, path: str, body: bytes) -> tuple[int, dict | str]:
+        if path == "/health":
+            if method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use GET"}
+            return HTTPStatus.OK, {"status": "ok"}
+        if path == "/metrics":
+            if method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use GET"}
+            if not METRICS.enabled:
+                return HTTPStatus.NOT_FOUND, {"error": "metrics are disabled; set METRICS_ENABLED=1"}
+            return HTTPStatus.OK, METRICS.render_prometheus()
+        if path == "/search":
+            if method != "POST":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+            try:
+                args = self._search_args(body)
+            except BadRequest as exc:
+                return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+            try:
+                return HTTPStatus.OK, await self.search(**args)
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.exception("Search failed for query=%r", args["query"][:80])
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)}
+        return HTTPStatus.NOT_FOUND, {"error": f"unknown path {path}"}
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes] | None:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, path, _version = request_line.decode("latin-1").split(maxsplit=2)
+        headers: dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(f"body larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict | str, keep_alive: bool) -> None:
+        # Text payloads are Prometheus exposition output; everything else is JSON.
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), PROMETHEUS_CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (BadRequest, ValueError) as exc:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": str(exc)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self.handle(method, path, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str | None = None, port: int | None = None) -> asyncio.AbstractServer:
+        self.server = await asyncio.start_server(
+            self._serve_connection,
+            host or SETTINGS.serve_host,
+            SETTINGS.serve_port if port is None else port,
+        )
+        return self.server
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+
+def serve(host: str | None = None, port: int | None = None, threads: int | None = None) -> None:
+    from patent_mvp.embeddings import SentenceTransformerProvider
+    from patent_mvp.storage import OpenSearchStore, PostgresStore
+
+    pg = PostgresStore(SETTINGS.postgres_dsn, pooled=True)
+    os_store = OpenSearchStore(SETTINGS.opensearch_url, SETTINGS.opensearch_index)
+    cache = open_query_cache()
+    service = SearchService(
+        SentenceTransformerProvider(SETTINGS.embedding_model),
+        pg,
+        os_store,
+        threads=threads,
+        cache=cache,
+        vector_index=open_vector_index(),
+    )
+    service.warm()
+
+    async def main() -> None:
+        server = await service.start(host, port)
+        LOGGER.info("Serving hybrid search on %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        with exporting():
+            asyncio.run(main())
+    except KeyboardInterrupt:
+        LOGGER.info("Shutting down")
+    finally:
+        pg.close()
+        if cache is not None:
+            cache.close()
@@ -1,31 +1,89 @@
 from __future__ import annotations
 
 import json
-from typing import Iterable
+import logging
+import math
+from contextlib import AbstractContextManager, contextmanager
+from typing import Iterable, Iterator, Sequence
 
 import psycopg
-from opensearchpy import OpenSearch
+from opensearchpy import OpenSearch, helpers
+from pgvector.psycopg import register_vector
 
+from patent_mvp.config import SETTINGS
+from patent_mvp.metrics import DB_ROWS, DB_WRITE_SECONDS
 from patent_mvp.models import EvidenceChunk, PatentRecord
+from patent_mvp.text_utils import content_hash
+
+LOGGER = logging.getLogger(__name__)
+
+def _vector_literal(embedding: Sequence[float]) -> str:
+    return "[" + ",".join(str(x) for x in embedding) + "]"
+
+
+def ivfflat_lists(rows: int) -> int:
+    # pgvector guidance: rows / 1000 lists up to 1M rows, sqrt(rows) beyond.
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def _configure_pooled_connection(conn: psycopg.Connection) -> None:
+    register_vector(conn)
+    conn.commit()
 
 
 class PostgresStore:
-    def __init__(self, dsn: str) -> None:
+    def __init__(self, dsn: str, pooled: bool = False, search_timeout: float | None = None) -> None:
         self.dsn = dsn
+        self.pool = None
+        # Server-side cap on vector search statements, so a search leg that
+        # hybrid_search has already given up on does not hold its thread.
+        self.search_timeout = search_timeout or SETTINGS.search_vector_timeout
+        if pooled:
+            from psycopg_pool import ConnectionPool
 
-    def conn(self) -> psycopg.Connection:
+            self.pool = ConnectionPool(
+                dsn,
+                min_size=SETTINGS.pg_pool_min_size,
+                max_size=SETTINGS.pg_pool_max_size,
+                timeout=SETTINGS.pg_pool_timeout,
+                max_idle=SETTINGS.pg_pool_max_idle,
+                check=ConnectionPool.check_connection if SETTINGS.pg_pool_check else None,
+                configure=_configure_pooled_connection,
+                name="patent_mvp",
+                open=True,
+            )
+
+    def conn(self) -> AbstractContextManager[psycopg.Connection]:
+        # Pooled connections commit/rollback and return to the pool on exit;
+        # plain connections commit and close, as before.
+        if self.pool is not None:
+            return self.pool.connection()
         return psycopg.connect(self.dsn)
 
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
     def upsert_patent(self, patent: PatentRecord) -> None:
         with self.conn() as conn, conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO patents(publication_number, grant_date, title, abstract, raw_json)
-                VALUES (%s, %s, %s, %s, %s)
+                INSERT INTO patents(publication_number, grant_date, title, abstract, raw_json, content_hash)
+                VALUES (%s, %s, %s, %s, %s, %s)
                 ON CONFLICT (publication_number) DO UPDATE
-                  SET grant_date=EXCLUDED.grant_date, title=EXCLUDED.title, abstract=EXCLUDED.abstract, raw_json=EXCLUDED.raw_json
+                  SET grant_date=EXCLUDED.grant_date, title=EXCLUDED.title, abstract=EXCLUDED.abstract,
+                      raw_json=EXCLUDED.raw_json, content_hash=EXCLUDED.content_hash
                 """,
-                (patent.publication_number, patent.grant_date, patent.title, patent.abstract, json.dumps(patent.raw_json)),
+                (
+                    patent.publication_number,
+                    patent.grant_date,
+                    patent.title,
+                    patent.abstract,
+                    json.dumps(patent.raw_json),
+                    content_hash(patent.__dict__),
+                ),
             )
             for cpc in patent.cpc_codes:
                 cur.execute(
@@ -61,13 +119,202 @@ class PostgresStore:
                     ),
                 )
 
+    def bulk_write(
+        self,
+        patents: Sequence[PatentRecord],
+        chunks: Sequence[EvidenceChunk],
+        embeddings: Sequence[Sequence[float] | None] | None = None,
+        embedding_namespace: str | None = None,
+    ) -> None:
+        # Stage every row of the batch through COPY into ON COMMIT DROP temp
+        # tables, then merge with one INSERT ... ON CONFLICT per table. Chunk
+        # embeddings travel in the same COPY in pgvector's binary format,
+        # tagged with the namespace of the model that produced them.
+        if embeddings is not None and len(embeddings) != len(chunks):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(chunks)} chunks")
+        if not patents and not chunks:
+            return
+        with DB_WRITE_SECONDS.time(store="postgres"), self.conn() as conn, conn.cursor() as cur:
+            if self.pool is None:
+                register_vector(conn)
+            if patents:
+                self._merge_patents(cur, patents)
+            if chunks:
+                self._merge_chunks(cur, chunks, embeddings, embedding_namespace)
+        DB_ROWS.inc(len(patents), store="postgres", kind="patents")
+        DB_ROWS.inc(len(chunks), store="postgres", kind="chunks")
+
+    @staticmethod
+    def _merge_patents(cur: psycopg.Cursor, patents: Sequence[PatentRecord]) -> None:
+        cur.execute("CREATE TEMP TABLE stage_patents (LIKE patents INCLUDING DEFAULTS) ON COMMIT DROP")
+        cur.execute("CREATE TEMP TABLE stage_cpc (LIKE patent_cpc) ON COMMIT DROP")
+        cur.execute("CREATE TEMP TABLE stage_citations (LIKE patent_citations) ON COMMIT DROP")
+        with cur.copy(
+            "COPY stage_patents (publication_number, grant_date, title, abstract, raw_json, content_hash) FROM STDIN"
+        ) as copy:
+            for p in patents:
+                copy.write_row(
+                    (p.publication_number, p.grant_date, p.title, p.abstract, json.dumps(p.raw_json), content_hash(p.__dict__))
+                )
+        with cur.copy("COPY stage_cpc (publication_number, cpc_code) FROM STDIN") as copy:
+            for p in patents:
+                for cpc in p.cpc_codes:
+                    copy.write_row((p.publication_number, cpc))
+        with cur.copy("COPY stage_citations (publication_number, cited_publication_number) FROM STDIN") as copy:
+            for p in patents:
+                for cited in p.citations:
+                    copy.write_row((p.publication_number, cited))
+
+        cur.execute(
+            """
+            INSERT INTO patents(publication_number, grant_date, title, abstract, raw_json, content_hash)
+            SELECT DISTINCT ON (publication_number) publication_number, grant_date, title, abstract, raw_json, content_hash
+            FROM stage_patents
+            ORDER BY publication_number
+            ON CONFLICT (publication_number) DO UPDATE
+              SET grant_date=EXCLUDED.grant_date, title=EXCLUDED.title, abstract=EXCLUDED.abstract,
+                  raw_json=EXCLUDED.raw_json, content_hash=EXCLUDED.content_hash
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO patent_cpc(publication_number, cpc_code)
+            SELECT DISTINCT publication_number, cpc_code FROM stage_cpc
+            ON CONFLICT DO NOTHING
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO patent_citations(publication_number, cited_publication_number)
+            SELECT DISTINCT publication_number, cited_publication_number FROM stage_citations
+            ON CONFLICT DO NOTHING
+            """
+        )
+
+    @staticmethod
+    def _merge_chunks(
+        cur: psycopg.Cursor,
+        chunks: Sequence[EvidenceChunk],
+        embeddings: Sequence[Sequence[float] | None] | None,
+        embedding_namespace: str | None,
+    ) -> None:
+        cur.execute("CREATE TEMP TABLE stage_chunks (LIKE evidence_chunks INCLUDING DEFAULTS) ON COMMIT DROP")
+        with cur.copy(
+            """
+            COPY stage_chunks (
+              chunk_id, publication_number, section_type, claim_num, para_id, is_independent, text, text_hash, metadata,
+              embedding, embedding_namespace
+            )
+            FROM STDIN (FORMAT BINARY)
+            """
+        ) as copy:
+            copy.set_types(["text", "text", "text", "text", "text", "bool", "text", "text", "jsonb", "vector", "text"])
+            for i, c in enumerate(chunks):
+                vector = embeddings[i] if embeddings is not None else None
+                copy.write_row(
+                    (
+                        c.chunk_id,
+                        c.publication_number,
+                        c.section_type,
+                        c.claim_num,
+                        c.para_id,
+                        c.is_independent,
+                        c.text,
+                        c.metadata.get("text_hash", ""),
+                        c.metadata,
+                        vector,
+                        embedding_namespace if vector is not None else None,
+                    )
+                )
+
+        cur.execute(
+            """
+            INSERT INTO evidence_chunks(
+              chunk_id, publication_number, section_type, claim_num, para_id, is_independent, text, text_hash, metadata,
+              embedding, embedding_namespace
+            )
+            SELECT DISTINCT ON (chunk_id)
+              chunk_id, publication_number, section_type, claim_num, para_id, is_independent, text, text_hash, metadata,
+              embedding, embedding_namespace
+            FROM stage_chunks
+            ORDER BY chunk_id
+            ON CONFLICT (chunk_id) DO UPDATE
+            SET text=EXCLUDED.text, metadata=EXCLUDED.metadata,
+                embedding=COALESCE(EXCLUDED.embedding, evidence_chunks.embedding),
+                embedding_namespace=CASE WHEN EXCLUDED.embedding IS NULL
+                  THEN evidence_chunks.embedding_namespace ELSE EXCLUDED.embedding_namespace END
+            """
+        )
+
+    def fetch_patent_hashes(self, publication_numbers: Sequence[str]) -> dict[str, str | None]:
+        if not publication_numbers:
+            return {}
+        with self.conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT publication_number, content_hash FROM patents WHERE publication_number = ANY(%s)",
+                (list(publication_numbers),),
+            )
+            return {pub: h for pub, h in cur.fetchall()}
+
+    def fetch_chunk_state(self, publication_numbers: Sequence[str]) -> dict[str, tuple[str, str | None]]:
+        # chunk_id -> (text_hash, embedding_namespace) for every stored chunk
+        # of these patents, the namespace being NULL when there is no vector;
+        # what incremental ingest diffs a fresh chunk set against.
+        if not publication_numbers:
+            return {}
+        with self.conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT chunk_id, text_hash, CASE WHEN embedding IS NULL THEN NULL ELSE embedding_namespace END
+                FROM evidence_chunks
+                WHERE publication_number = ANY(%s)
+                """,
+                (list(publication_numbers),),
+            )
+            return {chunk_id: (text_hash, namespace) for chunk_id, text_hash, namespace in cur.fetchall()}
+
+    def delete_chunks(self, chunk_ids: Sequence[str]) -> int:
+        if not chunk_ids:
+            return 0
+        with self.conn() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM evidence_chunks WHERE chunk_id = ANY(%s)", (list(chunk_ids),))
+        DB_ROWS.inc(len(chunk_ids), store="postgres", kind="deleted_chunks")
+        return len(chunk_ids)
+
     def update_embedding(self, chunk_id: str, embedding: list[float]) -> None:
         with self.conn() as conn, conn.cursor() as cur:
-            vector_literal = "[" + ",".join(str(x) for x in embedding) + "]"
-            cur.execute("UPDATE evidence_chunks SET embedding=%s::vector WHERE chunk_id=%s", (vector_literal, chunk_id))
+            cur.execute("UPDATE evidence_chunks SET embedding=%s::vector WHERE chunk_id=%s", (_vector_literal(embedding), chunk_id))
 
-    def vector_search(self, query_embedding: list[float], topk: int) -> list[tuple[str, str, float]]:
+    def _apply_search_knobs(
+        self, cur: psycopg.Cursor, ef_search: int | None, probes: int | None, exact: bool = False
+    ) -> None:
+        # Transaction-local, so pooled connections never leak one query's
+        # setting into the next. exact=True forces a sequential scan, which
+        # is the brute-force baseline the benchmark measures recall against;
+        # it is deliberately slow and runs without the statement timeout.
+        knobs = [
+            ("hnsw.ef_search", str(int(ef_search or SETTINGS.vector_ef_search))),
+            ("ivfflat.probes", str(int(probes or SETTINGS.vector_probes))),
+        ]
+        if exact:
+            knobs += [("enable_indexscan", "off"), ("enable_bitmapscan", "off")]
+        else:
+            knobs.append(("statement_timeout", str(int(self.search_timeout * 1000))))
+        for name, value in knobs:
+            if value != "0":
+                cur.execute("SELECT set_config(%s, %s, true)", (name, value), prepare=True)
+
+    def vector_search(
+        self,
+        query_embedding: list[float],
+        topk: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        exact: bool = False,
+    ) -> list[tuple[str, str, float]]:
+        vector_literal = _vector_literal(query_embedding)
         with self.conn() as conn, conn.cursor() as cur:
+            self._apply_search_knobs(cur, ef_search, probes, exact)
             cur.execute(
                 """
                 SELECT chunk_id, publication_number, 1 - (embedding <=> %s::vector) AS score
@@ -76,10 +323,47 @@ class PostgresStore:
                 ORDER BY embedding <=> %s::vector
                 LIMIT %s
                 """,
-                ("[" + ",".join(str(x) for x in query_embedding) + "]", "[" + ",".join(str(x) for x in query_embedding) + "]", topk),
+                (vector_literal, vector_literal, topk),
+                prepare=True,
             )
             return [(r[0], r[1], float(r[2])) for r in cur.fetchall()]
 
+    def vector_search_batch(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        topk: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[list[tuple[str, str, float]]]:
+        # One round trip for many queries: each array element drives its own
+        # index-backed nearest-neighbour scan through the LATERAL subquery.
+        if not query_embeddings:
+            return []
+        out: list[list[tuple[str, str, float]]] = [[] for _ in query_embeddings]
+        with self.conn() as conn, conn.cursor() as cur:
+            self._apply_search_knobs(cur, ef_search, probes)
+            cur.execute(
+                """
+                SELECT q.ord, nn.chunk_id, nn.publication_number, nn.score
+                FROM unnest(%s::vector[]) WITH ORDINALITY AS q(embedding, ord)
+                CROSS JOIN LATERAL (
+                  SELECT chunk_id, publication_number,
+                         1 - (c.embedding <=> q.embedding) AS score,
+                         c.embedding <=> q.embedding AS distance
+                  FROM evidence_chunks c
+                  WHERE c.embedding IS NOT NULL
+                  ORDER BY c.embedding <=> q.embedding
+                  LIMIT %s
+                ) nn
+                ORDER BY q.ord, nn.distance
+                """,
+                ([_vector_literal(e) for e in query_embeddings], topk),
+                prepare=True,
+            )
+            for ord_, chunk_id, pub, score in cur.fetchall():
+                out[ord_ - 1].append((chunk_id, pub, float(score)))
+        return out
+
     def graph_expand_patents(self, patents: set[str], limit: int = 300) -> set[str]:
         if not patents:
             return set()
@@ -93,6 +377,7 @@ class PostgresStore:
                 LIMIT %s
                 """,
                 (list(patents), limit),
+                prepare=True,
             )
             cpc_neighbors = {r[0] for r in cur.fetchall()}
             cur.execute(
@@ -103,14 +388,90 @@ class PostgresStore:
                 LIMIT %s
                 """,
                 (list(patents), limit),
+                prepare=True,
             )
             cited = {r[0] for r in cur.fetchall()}
         return patents | cpc_neighbors | cited
 
+    def iter_embeddings(self, batch_size: int = 10_000) -> Iterator[tuple[str, str, list[float]]]:
+        # Server-side cursor: exporting every vector (e.g. into a local
+        # vector index) streams rows instead of holding the table in memory.
+        with self.conn() as conn, conn.cursor(name="iter_embeddings") as cur:
+            cur.itersize = batch_size
+            cur.execute(
+                """
+                SELECT chunk_id, publication_number, embedding::real[]
+                FROM evidence_chunks
+                WHERE embedding IS NOT NULL
+                ORDER BY chunk_id
+                """
+            )
+            yield from cur
+
+    def vector_index_info(self) -> dict:
+        with self.conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM evidence_chunks WHERE embedding IS NOT NULL")
+            (rows,) = cur.fetchone()
+            cur.execute(
+                """
+                SELECT indexname, indexdef, pg_relation_size(format('%I.%I', schemaname, indexname)::regclass)
+                FROM pg_indexes
+                WHERE tablename = 'evidence_chunks' AND indexdef ILIKE '%(embedding %'
+                """
+            )
+            indexes = [{"name": r[0], "definition": r[1], "bytes": r[2]} for r in cur.fetchall()]
+        return {"rows_with_embeddings": rows, "recommended_ivfflat_lists": ivfflat_lists(rows), "indexes": indexes}
+
+    def build_vector_index(
+        self,
+        kind: str = "hnsw",
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: int | None = None,
+        concurrently: bool = False,
+        maintenance_work_mem: str | None = None,
+    ) -> dict:
+        # Built after bulk load: HNSW graphs and IVF centroids both need the
+        # data to be present. The new index is created under a temporary name
+        # and swapped in, so searches keep their old index until it is ready.
+        if kind == "hnsw":
+            options = f"USING hnsw (embedding vector_cosine_ops) WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+        elif kind == "ivfflat":
+            if lists is None:
+                lists = ivfflat_lists(self.vector_index_info()["rows_with_embeddings"])
+            options = f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {int(lists)})"
+        else:
+            raise ValueError(f"Unknown vector index type {kind!r}; expected 'hnsw' or 'ivfflat'")
+        concurrent = " CONCURRENTLY" if concurrently else ""
+        with psycopg.connect(self.dsn, autocommit=True) as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT set_config('maintenance_work_mem', %s, false)",
+                (maintenance_work_mem or SETTINGS.vector_index_maintenance_work_mem,),
+            )
+            cur.execute("DROP INDEX IF EXISTS idx_chunks_embedding_build")
+            LOGGER.info("Building %s vector index: %s", kind, options)
+            cur.execute(f"CREATE INDEX{concurrent} idx_chunks_embedding_build ON evidence_chunks {options}")
+            cur.execute(f"DROP INDEX{concurrent} IF EXISTS idx_chunks_embedding")
+            cur.execute("ALTER INDEX idx_chunks_embedding_build RENAME TO idx_chunks_embedding")
+            cur.execute("ANALYZE evidence_chunks")
+        return {"type": kind, "options": options, **self.vector_index_info()}
 
 class OpenSearchStore:
-    def __init__(self, base_url: str, index_name: str) -> None:
-        self.client = OpenSearch(hosts=[base_url])
+    def __init__(
+        self,
+        base_url: str,
+        index_name: str,
+        bulk_chunk_size: int | None = None,
+        bulk_max_bytes: int | None = None,
+        bulk_threads: int | None = None,
+        search_timeout: float | None = None,
+    ) -> None:
+        self.bulk_chunk_size = bulk_chunk_size or SETTINGS.os_bulk_chunk_size
+        # Client-side cap on BM25 requests; see PostgresStore.search_timeout.
+        self.search_timeout = search_timeout or SETTINGS.search_bm25_timeout
+        self.bulk_max_bytes = bulk_max_bytes or SETTINGS.os_bulk_max_bytes
+        self.bulk_threads = bulk_threads or SETTINGS.os_bulk_threads
+        self.client = OpenSearch(hosts=[base_url], pool_maxsize=max(10, self.bulk_threads))
         self.index_name = index_name
 
     def ensure_index(self) -> None:
@@ -129,33 +490,101 @@ class OpenSearchStore:
         }
         self.client.indices.create(index=self.index_name, body=mapping)
 
-    def index_chunks(self, chunks: Iterable[EvidenceChunk]) -> None:
+    def _index_actions(self, chunks: Iterable[EvidenceChunk]) -> Iterator[dict]:
         for c in chunks:
-            self.client.index(
-                index=self.index_name,
-                id=c.chunk_id,
-                body={
+            yield {
+                "_index": self.index_name,
+                "_id": c.chunk_id,
+                "_source": {
                     "chunk_id": c.chunk_id,
                     "publication_number": c.publication_number,
                     "section_type": c.section_type,
                     "text": c.text,
                 },
-                refresh=False,
-            )
+            }
+
+    def index_chunks(self, chunks: Iterable[EvidenceChunk], refresh: bool = True) -> int:
+        options = {"chunk_size": self.bulk_chunk_size, "max_chunk_bytes": self.bulk_max_bytes}
+        actions = self._index_actions(chunks)
+        if self.bulk_threads > 1:
+            results = helpers.parallel_bulk(self.client, actions, thread_count=self.bulk_threads, **options)
+        else:
+            results = helpers.streaming_bulk(self.client, actions, **options)
+        with DB_WRITE_SECONDS.time(store="opensearch"):
+            indexed = sum(1 for ok, _ in results if ok)
+        DB_ROWS.inc(indexed, store="opensearch", kind="chunks")
+        if refresh:
+            self.refresh()
+        return indexed
+
+    def refresh(self) -> None:
         self.client.indices.refresh(index=self.index_name)
 
-    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
-        response = self.client.search(
-            index=self.index_name,
-            body={
-                "size": topk,
-                "query": {"match": {"text": query}},
-                "highlight": {"fields": {"text": {}}},
-            },
-        )
+    def delete_chunks(self, chunk_ids: Sequence[str]) -> int:
+        # Missing documents (404) are fine: the goal is that they are gone.
+        if not chunk_ids:
+            return 0
+        actions = ({"_op_type": "delete", "_index": self.index_name, "_id": cid} for cid in chunk_ids)
+        deleted = 0
+        for ok, item in helpers.streaming_bulk(
+            self.client, actions, chunk_size=self.bulk_chunk_size, max_chunk_bytes=self.bulk_max_bytes, raise_on_error=False
+        ):
+            result = item.get("delete", {})
+            if ok:
+                deleted += 1
+            elif result.get("status") != 404:
+                raise RuntimeError(f"OpenSearch delete of {result.get('_id')} failed: {result.get('error')}")
+        DB_ROWS.inc(deleted, store="opensearch", kind="deleted_chunks")
+        return deleted
+
+    @contextmanager
+    def bulk_ingest_mode(self) -> Iterator[None]:
+        # Disable periodic refresh while bulk loading, then restore the previous
+        # interval (None resets it to the cluster default) and refresh once.
+        current = self.client.indices.get_settings(index=self.index_name, name="index.refresh_interval")
+        index_settings = next(iter(current.values()), {}).get("settings", {}).get("index", {})
+        previous = index_settings.get("refresh_interval")
+        self.client.indices.put_settings(index=self.index_name, body={"index": {"refresh_interval": "-1"}})
+        try:
+            yield
+        finally:
+            self.client.indices.put_settings(index=self.index_name, body={"index": {"refresh_interval": previous}})
+            self.refresh()
+            LOGGER.info("Restored refresh_interval=%s on %s", previous or "default", self.index_name)
+
+    @staticmethod
+    def _bm25_body(query: str, topk: int) -> dict:
+        return {
+            "size": topk,
+            "query": {"match": {"text": query}},
+            "highlight": {"fields": {"text": {}}},
+        }
+
+    @staticmethod
+    def _bm25_hits(response: dict) -> list[tuple[str, str, float, str]]:
         out: list[tuple[str, str, float, str]] = []
         for h in response["hits"]["hits"]:
             src = h["_source"]
             snippet = " ".join(h.get("highlight", {}).get("text", [])[:1])
             out.append((src["chunk_id"], src["publication_number"], float(h["_score"]), snippet))
         return out
+
+    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
+        response = self.client.search(
+            index=self.index_name, body=self._bm25_body(query, topk), request_timeout=self.search_timeout
+        )
+        return self._bm25_hits(response)
+
+    def bm25_msearch(self, queries: Sequence[str], topk: int) -> list[list[tuple[str, str, float, str]]]:
+        if not queries:
+            return []
+        body: list[dict] = []
+        for query in queries:
+            body += [{"index": self.index_name}, self._bm25_body(query, topk)]
+        response = self.client.msearch(body=body, request_timeout=self.search_timeout)
+        out = []
+        for query, item in zip(queries, response["responses"]):
+            if "error" in item:
+                raise RuntimeError(f"BM25 msearch failed for query {query[:80]!r}: {item['error']}")
+            out.append(self._bm25_hits(item))
+        return out
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import random
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+from xml.sax.saxutils import escape
+
+SCHEMA_VARIANTS = ("grant", "variant", "mixed")
+DEFAULT_CPC_MIX = {"G06F": 0.4, "H04L": 0.25, "G06N": 0.2, "A61B": 0.1, "B60W": 0.05}
+WORDS = (
+    "system method apparatus device processor memory controller module circuit network node signal data "
+    "packet buffer queue thread task schedule allocate configure determine receive transmit store retrieve "
+    "encode decode compress encrypt authenticate request response client server interface layer channel "
+    "sensor image pixel frame vector matrix model training inference weight gradient parameter threshold "
+    "value index table record field entry cache page block sector register instruction pipeline branch "
+    "clock voltage current power battery charge vehicle wheel motor torque patient tissue catheter probe "
+    "wherein comprising plurality first second third least each respective corresponding associated based "
+    "according configured operable coupled connected disposed adjacent within between during response"
+).split()
+
+
+@dataclass(frozen=True)
+class SyntheticWeekSpec:
+    patents: int = 1000
+    claims: tuple[int, int] = (10, 25)
+    summary_paragraphs: tuple[int, int] = (2, 6)
+    description_paragraphs: tuple[int, int] = (20, 60)
+    words_per_paragraph: tuple[int, int] = (40, 160)
+    citations: tuple[int, int] = (0, 15)
+    cpc_mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_CPC_MIX))
+    schema: str = "mixed"
+    week_date: str = "20250107"
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        if self.schema not in SCHEMA_VARIANTS:
+            raise ValueError(f"Unknown schema {self.schema!r}; expected one of {SCHEMA_VARIANTS}")
+
+
+def _words(rng: random.Random, bounds: tuple[int, int]) -> str:
+    return escape(" ".join(rng.choices(WORDS, k=rng.randint(*bounds))))
+
+
+def _paragraphs(rng: random.Random, spec: SyntheticWeekSpec, bounds: tuple[int, int], indent: str) -> str:
+    return "".join(f"{indent}<p>{_words(rng, spec.words_per_paragraph)}.</p>\n" for _ in range(rng.randint(*bounds)))
+
+
+def _cpc_codes(rng: random.Random, spec: SyntheticWeekSpec) -> list[str]:
+    sections = rng.choices(list(spec.cpc_mix), weights=list(spec.cpc_mix.values()), k=rng.randint(1, 3))
+    return [f"{s} {rng.randint(1, 40)}/{rng.randint(0, 999):02d}" for s in dict.fromkeys(sections)]
+
+
+def _claim_texts(rng: random.Random, spec: SyntheticWeekSpec) -> list[tuple[int, str, str]]:
+    # (num, lead text, nested limitation text); dependent claims refer back
+    # to an earlier independent claim the way real grants do.
+    claims = []
+    for num in range(1, rng.randint(*spec.claims) + 1):
+        if num == 1 or rng.random() < 0.15:
+            lead = f"{num}. A {rng.choice(WORDS)} comprising:"
+        else:
+            lead = f"{num}. The {rng.choice(WORDS)} of claim {rng.randint(1, num - 1)}, wherein"
+        claims.append((num, lead, _words(rng, (15, 60))))
+    return claims
+
+
+def synthetic_grant_xml(rng: random.Random, spec: SyntheticWeekSpec, index: int) -> bytes:
+    schema = spec.schema if spec.schema != "mixed" else ("grant" if rng.random() < 0.8 else "variant")
+    pub = f"US{11_000_000 + spec.seed * 1_000_000 + index}B2"
+    title = _words(rng, (3, 10))
+    cpc = "".join(
+        f"<classification-cpc><classification-cpc-text>{c}</classification-cpc-text></classification-cpc>"
+        for c in _cpc_codes(rng, spec)
+    )
+    abstract = _words(rng, spec.words_per_paragraph)
+    claims = _claim_texts(rng, spec)
+    cited = [f"US{rng.randint(5_000_000, 10_999_999)}B1" for _ in range(rng.randint(*spec.citations))]
+
+    if schema == "grant":
+        claims_xml = "".join(
+            f'    <claim id="CLM-{num:05d}" num="{num}"><claim-text>{lead} '
+            f"<claim-text>{body};</claim-text></claim-text></claim>\n"
+            for num, lead, body in claims
+        )
+        citations_xml = "".join(
+            f"    <citation><patcit><document-id><doc-number>{c}</doc-number></document-id></patcit></citation>\n"
+            for c in cited
+        )
+        body = (
+            f'<us-patent-grant xmlns="http://www.uspto.gov" file="{pub}.xml" lang="EN">\n'
+            "  <us-bibliographic-data-grant>\n"
+            f"    <publication-reference><document-id><country>US</country><doc-number>{pub}</doc-number>"
+            f"<kind>B2</kind><date>{spec.week_date}</date></document-id></publication-reference>\n"
+            f"    <invention-title>{title}</invention-title>\n"
+            f"    <classifications-cpc>{cpc}</classifications-cpc>\n"
+            "  </us-bibliographic-data-grant>\n"
+            f"  <abstract><p>{abstract}.</p></abstract>\n"
+            "  <summary-of-invention>\n"
+            f"{_paragraphs(rng, spec, spec.summary_paragraphs, '    ')}"
+            "  </summary-of-invention>\n"
+            "  <description>\n"
+            f"{_paragraphs(rng, spec, spec.description_paragraphs, '    ')}"
+            "  </description>\n"
+            f'  <claims id="claims">\n{claims_xml}  </claims>\n'
+            f"  <references-cited>\n{citations_xml}  </references-cited>\n"
+            "</us-patent-grant>\n"
+        )
+    else:
+        claims_xml = "".join(
+            f"    <claim><claim-num>{num}</claim-num><claim-text>{lead} {body}.</claim-text></claim>\n"
+            for num, lead, body in claims
+        )
+        body = (
+            "<us-patent-grant>\n"
+            "  <bibliographic-data-grant>\n"
+            f"    <publication-reference><document-id><doc-number>{pub}</doc-number>"
+            f"<date>{spec.week_date}</date></document-id></publication-reference>\n"
+            f"    <invention-title>{title}</invention-title>\n"
+            f"    <classifications-cpc>{cpc}</classifications-cpc>\n"
+            "  </bibliographic-data-grant>\n"
+            f"  <abstract><p>{abstract}.</p></abstract>\n"
+            "  <description>\n"
+            f"    <summary>\n{_paragraphs(rng, spec, spec.summary_paragraphs, '      ')}    </summary>\n"
+            "    <detailed-description>\n"
+            f"{_paragraphs(rng, spec, spec.description_paragraphs, '      ')}"
+            "    </detailed-description>\n"
+            "  </description>\n"
+            f"  <claims>\n{claims_xml}  </claims>\n"
+            "</us-patent-grant>\n"
+        )
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n' + body).encode("utf-8")
+
+
+def iter_synthetic_week(spec: SyntheticWeekSpec) -> Iterator[bytes]:
+    rng = random.Random(spec.seed)
+    for i in range(spec.patents):
+        yield synthetic_grant_xml(rng, spec, i)
+
+
+def write_synthetic_week(out_dir: str | Path, spec: SyntheticWeekSpec) -> Path:
+    # Same shape as a real ODP weekly file: one zip holding one XML member of
+    # concatenated grant documents, each with its own XML declaration.
+    out = Path(out_dir) / f"ipg{spec.week_date}" / f"ipg{spec.week_date}.zip"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(f"ipg{spec.week_date}.xml", "w", force_zip64=True) as member:
+            for doc in iter_synthetic_week(spec):
+                member.write(doc)
+    return out
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import hashlib
 import html
+import json
 import re
 import unicodedata
 
@@ -22,6 +23,10 @@ def sha256_hex(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
+def content_hash(payload: object) -> str:
+    return sha256_hex(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str))
+
+
 def make_chunk_id(publication_number: str, section_type: str, claim_or_para: str, text: str) -> str:
     payload = f"{publication_number}|{section_type}|{claim_or_para}|{sha256_hex(text)}"
     return sha256_hex(payload)
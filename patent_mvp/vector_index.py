@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+import numpy as np
+
+from patent_mvp.config import SETTINGS
+
+if TYPE_CHECKING:
+    from patent_mvp.columnar import ColumnarStore
+
+LOGGER = logging.getLogger(__name__)
+VECTOR_BACKENDS = ("pgvector", "local")
+_FILES = ("vectors.npy", "chunk_ids.npy", "publication_numbers.npy")
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    # Indices of the k largest scores, best first: argpartition is O(n), and
+    # only the k survivors are sorted.
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def vector_index_dir() -> Path:
+    return Path(SETTINGS.vector_index_dir or Path(SETTINGS.data_root) / "vector_index")
+
+
+class LocalVectorIndex:
+    # Exact cosine search over a contiguous float32 matrix of unit-length
+    # rows, with chunk_id/publication_number side arrays in the same order.
+    # Saved as three .npy files and loaded as memory maps, so opening costs
+    # nothing and the OS pages rows in as they are scanned. Queries are scored
+    # with one matrix product per block of rows and cut with argpartition.
+    # Exposes the PostgresStore vector search surface (scores are
+    # 1 - cosine distance, as pgvector returns), so it can stand in for
+    # pgvector in tests and on dev boxes and is the exact-recall baseline
+    # for tuning ANN settings.
+
+    def __init__(
+        self,
+        chunk_ids: Sequence[str] | np.ndarray,
+        publication_numbers: Sequence[str] | np.ndarray,
+        matrix: np.ndarray,
+        normalize: bool = True,
+        block_rows: int = 65_536,
+    ) -> None:
+        # asanyarray keeps a loaded np.memmap mapped rather than copied.
+        matrix = np.asanyarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or len(matrix) != len(chunk_ids) or len(chunk_ids) != len(publication_numbers):
+            raise ValueError(
+                f"Expected an (n, dim) matrix with n ids; got {matrix.shape}, {len(chunk_ids)} chunk ids, "
+                f"{len(publication_numbers)} publication numbers"
+            )
+        if normalize:
+            matrix = _normalize_rows(matrix)
+        self.matrix = matrix if matrix.flags.c_contiguous else np.ascontiguousarray(matrix)
+        self.chunk_ids = np.asarray(chunk_ids)
+        self.publication_numbers = np.asarray(publication_numbers)
+        self.block_rows = block_rows
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1])
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[tuple[str, str, Sequence[float]]], dim: int, normalize: bool = True, batch_rows: int = 10_000
+    ) -> LocalVectorIndex:
+        # Vectors are packed into float32 blocks as they stream in, so a
+        # Postgres export never holds more than one block as Python floats.
+        chunk_ids: list[str] = []
+        pubs: list[str] = []
+        blocks: list[np.ndarray] = []
+        pending: list[Sequence[float]] = []
+        for chunk_id, pub, vector in rows:
+            chunk_ids.append(chunk_id)
+            pubs.append(pub)
+            pending.append(vector)
+            if len(pending) >= batch_rows:
+                blocks.append(np.asarray(pending, dtype=np.float32).reshape(-1, dim))
+                pending = []
+        blocks.append(np.asarray(pending, dtype=np.float32).reshape(-1, dim))
+        return cls(chunk_ids, pubs, np.concatenate(blocks), normalize=normalize)
+
+    @classmethod
+    def from_columnar(cls, store: ColumnarStore, weeks: Iterable[str] | None = None) -> LocalVectorIndex:
+        ids: list[str] = []
+        pubs: list[str] = []
+        blocks: list[np.ndarray] = []
+        for week_date in weeks if weeks is not None else store.weeks("embeddings"):
+            pub_of = {}
+            for batch in store.scan("chunks", [week_date], columns=["chunk_id", "publication_number"]):
+                pub_of.update(zip(batch.column(0).to_pylist(), batch.column(1).to_pylist()))
+            week_ids, matrix = store.embedding_matrix(week_date)
+            ids.extend(week_ids)
+            pubs.extend(pub_of.get(cid, "") for cid in week_ids)
+            blocks.append(matrix)
+        if not blocks:
+            raise ValueError(f"No columnar embeddings under {store.root}")
+        return cls(ids, pubs, np.concatenate(blocks))
+
+    def save(self, path: str | Path) -> Path:
+        # Each file is written beside its target and renamed into place.
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        arrays = (self.matrix, self.chunk_ids.astype(str), self.publication_numbers.astype(str))
+        for name, array in zip(_FILES, arrays):
+            tmp = out / f"{name}.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, array)
+            os.replace(tmp, out / name)
+        return out
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True, block_rows: int = 65_536) -> LocalVectorIndex:
+        # Rows were normalised when the index was built; the arrays are used
+        # as mapped, without a copy.
+        root = Path(path)
+        matrix, chunk_ids, pubs = (np.load(root / name, mmap_mode="r" if mmap else None) for name in _FILES)
+        LOGGER.info("Loaded local vector index %s: rows=%s dim=%s mmap=%s", root, len(matrix), matrix.shape[1], mmap)
+        return cls(chunk_ids, pubs, matrix, normalize=False, block_rows=block_rows)
+
+    def describe(self) -> dict:
+        return {"rows": len(self), "dim": self.dim, "bytes": int(self.matrix.nbytes)}
+
+    def _queries(self, query_embeddings: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dim)
+        return _normalize_rows(queries)
+
+    def _rows(self, idx: np.ndarray, scores: np.ndarray) -> list[tuple[str, str, float]]:
+        return [(str(self.chunk_ids[i]), str(self.publication_numbers[i]), float(s)) for i, s in zip(idx, scores)]
+
+    def search_matrix(self, queries: np.ndarray, topk: int) -> tuple[np.ndarray, np.ndarray]:
+        # (indices, scores), each (q, k), best first. Rows are scanned block
+        # by block so the score matrix stays q x block_rows regardless of the
+        # corpus size; each block's top k is merged into the running top k.
+        k = min(topk, len(self))
+        best_idx = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        if k <= 0:
+            return best_idx, best_scores
+        for start in range(0, len(self), self.block_rows):
+            block = self.matrix[start : start + self.block_rows]
+            scores = queries @ block.T
+            if scores.shape[1] > k:
+                part = np.argpartition(-scores, k, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, part, axis=1)
+            else:
+                part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            best_idx = np.concatenate([best_idx, part + start], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k, axis=1)[:, :k]
+                best_idx = np.take_along_axis(best_idx, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def vector_search(
+        self,
+        query_embedding: Sequence[float],
+        topk: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        exact: bool = False,
+    ) -> list[tuple[str, str, float]]:
+        # ANN knobs are accepted for interface parity; search is always exact.
+        return self.vector_search_batch([query_embedding], topk)[0]
+
+    def vector_search_batch(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        topk: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[list[tuple[str, str, float]]]:
+        if len(query_embeddings) == 0:
+            return []
+        idx, scores = self.search_matrix(self._queries(query_embeddings), topk)
+        return [self._rows(i, s) for i, s in zip(idx, scores)]
+
+
+def open_vector_index(backend: str | None = None, path: str | Path | None = None) -> LocalVectorIndex | None:
+    # The local index when the backend (default VECTOR_BACKEND) is "local";
+    # None means the vector leg stays on pgvector.
+    backend = backend or SETTINGS.vector_backend
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend {backend!r}; expected one of {VECTOR_BACKENDS}")
+    if backend != "local":
+        return None
+    return LocalVectorIndex.load(path or vector_index_dir())
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import numpy as np
+
+from patent_mvp.bench import HashingEmbedder, MemoryBM25Store, MemoryVectorStore, bench_parse, bench_search, synthetic_corpus
+
+
+def test_hashing_embedder_is_deterministic_and_normalized() -> None:
+    emb = HashingEmbedder(dim=64)
+    a, b, c = emb.embed_matrix(["gpu task scheduler", "gpu task scheduler", "memory controller refresh"])
+    assert np.allclose(a, b)
+    assert abs(float(np.linalg.norm(a)) - 1.0) < 1e-5
+    assert float(a @ b) > float(a @ c)
+
+
+def test_memory_stores_find_the_source_chunk() -> None:
+    corpus = synthetic_corpus(n_chunks=300, n_queries=0, seed=1)
+    emb = HashingEmbedder(dim=128)
+    pg = MemoryVectorStore(corpus.chunks, emb.embed_matrix([c.text for c in corpus.chunks]), corpus.cpc, corpus.citations)
+    target = corpus.chunks[42]
+    assert pg.vector_search(emb.embed([target.text])[0], 1)[0][0] == target.chunk_id
+    assert MemoryBM25Store(corpus.chunks).bm25_search(target.text, 1)[0][0] == target.chunk_id
+    assert target.publication_number in pg.graph_expand_patents({target.publication_number})
+
+
+def test_bench_search_reports_stage_percentiles_and_recall() -> None:
+    exact = bench_search(chunks=400, queries=8, dim=64, topk=5)
+    assert exact["queries"] == 8
+    assert exact["embedding_cache"] is False
+    assert set(exact["latency"]) == {"embed", "bm25", "vector", "merge", "graph", "end_to_end"}
+    assert set(exact["latency"]["vector"]) == {"p50_ms", "p95_ms", "p99_ms", "mean_ms"}
+    assert exact["recall"]["vector@5"] == 1.0
+
+    approx = bench_search(chunks=400, queries=8, dim=64, topk=5, lists=16, probes=1, graph_expand=False)
+    assert "graph" not in approx["latency"]
+    assert 0.0 <= approx["recall"]["vector@5"] <= 1.0
+
+
+def test_bench_parse_compares_engines_on_a_synthetic_week() -> None:
+    report = bench_parse(patents=20, claims=(2, 3), description_paragraphs=(2, 3), words_per_paragraph=(5, 10), repeat=1)
+    assert set(report["engines"]) == {"walk", "xpath"}
+    assert report["engines"]["walk"]["docs_per_sec"] > 0
+    assert report["speedup"] > 0
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from patent_mvp.columnar import ColumnarStore
+from patent_mvp.models import EvidenceChunk, PatentRecord
+
+
+def _patent(pub: str) -> PatentRecord:
+    return PatentRecord(
+        pub,
+        "20250107",
+        f"title {pub}",
+        "abstract",
+        ["summary"],
+        ["para 1", "para 2"],
+        [{"claim_num": "1", "text": "A method.", "is_independent": True}],
+        ["G06F 16/00"],
+        ["US1B1"],
+        {"source": "test"},
+    )
+
+
+def _chunks(pub: str, n: int) -> list[EvidenceChunk]:
+    return [
+        EvidenceChunk(f"{pub}-c{i}", pub, "CLAIM", f"text {i}", claim_num=str(i), is_independent=i == 0, metadata={"text_hash": f"h{pub}{i}"})
+        for i in range(n)
+    ]
+
+
+def test_week_round_trips_patents_chunks_and_embeddings(tmp_path: Path) -> None:
+    store = ColumnarStore(tmp_path)
+    writer = store.writer("20250107", dim=4)
+    chunks = _chunks("US1", 3) + _chunks("US2", 2)
+    writer.write_patents([_patent("US1")])
+    writer.write_patents([_patent("US2")])
+    writer.write_chunks(chunks[:3])
+    writer.write_chunks(chunks[3:])
+    vectors = np.arange(20, dtype=np.float32).reshape(5, 4)
+    writer.write_embeddings(chunks[:2], vectors[:2])
+    writer.write_embeddings(chunks[2:], vectors[2:].tolist())
+    assert store.weeks() == []
+    assert writer.close() == {"patents": 2, "chunks": 5, "embeddings": 5}
+
+    assert store.weeks() == store.weeks("embeddings") == ["20250107"]
+    assert list(store.iter_patents("20250107")) == [_patent("US1"), _patent("US2")]
+    assert list(store.iter_chunks("20250107")) == chunks
+    ids, matrix = store.embedding_matrix("20250107")
+    assert ids == [c.chunk_id for c in chunks]
+    assert matrix.dtype == np.float32 and np.array_equal(matrix, vectors)
+    batches = list(store.scan("chunks", columns=["chunk_id"]))
+    assert [b.num_rows for b in batches] == [3, 2] and batches[0].schema.names == ["chunk_id"]
+
+
+def test_aborted_week_leaves_previous_files(tmp_path: Path) -> None:
+    store = ColumnarStore(tmp_path)
+    first = store.writer("20250107", dim=4)
+    first.write_chunks(_chunks("US1", 2))
+    first.close()
+
+    retry = store.writer("20250107", dim=4)
+    retry.write_chunks(_chunks("US1", 5))
+    retry.abort()
+    assert store.read_table("chunks", "20250107").num_rows == 2
+    assert not list(tmp_path.rglob("*.part"))
+    with pytest.raises(ValueError):
+        store.path("vectors", "20250107")
@@ -1,7 +1,14 @@
+import base64
+import hashlib
 import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
-from patent_mvp.downloader import PTGRXMLDownloader
+import pytest
+
+from patent_mvp.downloader import PTGRXMLDownloader, RemoteFile
 
 
 def test_parse_search_response_sorts_latest_first_and_dedupes() -> None:
@@ -46,3 +53,157 @@ def test_select_weeks_skips_processed_even_without_since_last(tmp_path) -> None:
     selected = downloader.select_weeks(weeks=2, since_last=False)
 
     assert selected == [("20240130", "https://example.org/ipg20240130.zip")]
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    files: dict[str, bytes] = {}
+    ranges = True
+    send_md5 = True
+    corrupt = False
+    head_fails = False
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        return
+
+    def _headers(self, body: bytes, status: int, extra: dict[str, str]) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if self.send_md5:
+            payload = self.files[self.path]
+            self.send_header("Content-MD5", base64.b64encode(hashlib.md5(payload).digest()).decode())
+        for k, v in extra.items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        if self.head_fails:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._headers(self.files[self.path], 200, {})
+
+    def do_GET(self) -> None:  # noqa: N802
+        payload = self.files[self.path]
+        if self.corrupt:
+            payload = payload[:-1] + b"X"
+        requested = self.headers.get("Range")
+        if requested and self.ranges:
+            start, end = requested.removeprefix("bytes=").split("-")
+            end = int(end) if end else len(payload) - 1
+            body = payload[int(start) : end + 1]
+            self._headers(body, 206, {"Content-Range": f"bytes {start}-{end}/{len(payload)}"})
+        else:
+            body = payload
+            self._headers(body, 200, {})
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def http_server():
+    handler = type("Handler", (_RangeHandler,), {"files": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _downloader(tmp_path, **kwargs) -> PTGRXMLDownloader:
+    return PTGRXMLDownloader(data_root=str(tmp_path), segment_min_bytes=1024, **kwargs)
+
+
+def test_download_week_fetches_segments_and_verifies_md5(tmp_path, http_server) -> None:
+    handler, base = http_server
+    payload = os.urandom(10_000)
+    handler.files["/ipg20240102.zip"] = payload
+    downloader = _downloader(tmp_path, segments=4)
+
+    path = downloader.download_week("20240102", f"{base}/ipg20240102.zip")
+
+    assert path.read_bytes() == payload
+    assert not list(path.parent.glob("*.part")) and not list(path.parent.glob("*.segments"))
+
+
+def test_download_week_resumes_unfinished_segments(tmp_path, http_server) -> None:
+    handler, base = http_server
+    payload = os.urandom(8_000)
+    handler.files["/ipg20240102.zip"] = payload
+    downloader = _downloader(tmp_path, segments=4)
+    part = tmp_path / "raw" / "ptgrxml" / "ipg20240102" / "ipg20240102.zip.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(payload[:2_000] + b"\0" * 6_000)
+    part.with_suffix(".segments").write_text(json.dumps({"size": 8_000, "segments": 4, "done": [0]}))
+
+    path = downloader.download_week("20240102", f"{base}/ipg20240102.zip")
+
+    assert path.read_bytes() == payload
+
+
+def test_stream_fallback_discards_interrupted_segmented_part(tmp_path, http_server) -> None:
+    handler, base = http_server
+    handler.head_fails = True
+    payload = os.urandom(8_000)
+    handler.files["/ipg20240102.zip"] = payload
+    part = tmp_path / "raw" / "ptgrxml" / "ipg20240102" / "ipg20240102.zip.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(payload[:2_000] + b"\0" * 6_000)
+    part.with_suffix(".segments").write_text(json.dumps({"size": 8_000, "segments": 4, "done": [0]}))
+
+    path = _downloader(tmp_path, segments=4).download_week("20240102", f"{base}/ipg20240102.zip")
+
+    assert path.read_bytes() == payload
+    assert not part.with_suffix(".segments").exists()
+
+
+def test_download_week_falls_back_to_single_stream_without_ranges(tmp_path, http_server) -> None:
+    handler, base = http_server
+    handler.ranges = False
+    payload = os.urandom(5_000)
+    handler.files["/ipg20240102.zip"] = payload
+
+    path = _downloader(tmp_path, segments=4).download_week("20240102", f"{base}/ipg20240102.zip")
+
+    assert path.read_bytes() == payload
+
+
+def test_download_week_rejects_checksum_mismatch(tmp_path, http_server) -> None:
+    handler, base = http_server
+    handler.corrupt = True
+    handler.files["/ipg20240102.zip"] = os.urandom(5_000)
+
+    with pytest.raises(RuntimeError, match="md5"):
+        _downloader(tmp_path, segments=2).download_week("20240102", f"{base}/ipg20240102.zip")
+
+    week_dir = tmp_path / "raw" / "ptgrxml" / "ipg20240102"
+    assert not (week_dir / "ipg20240102.zip").exists()
+    assert not (week_dir / "ipg20240102.zip.part").exists()
+
+
+def test_download_weeks_runs_concurrently_and_keeps_order(tmp_path, http_server) -> None:
+    handler, base = http_server
+    weeks = ["20240213", "20240130", "20240102"]
+    for week in weeks:
+        handler.files[f"/ipg{week}.zip"] = week.encode() * 500
+    downloader = _downloader(tmp_path, download_workers=3, segments=2)
+
+    paths = downloader.download_weeks([(w, f"{base}/ipg{w}.zip") for w in weeks])
+
+    assert [w for w, _ in paths] == weeks
+    for week, path in paths:
+        assert path.read_bytes() == week.encode() * 500
+
+
+def test_remote_file_reads_md5_from_headers_but_not_etags() -> None:
+    digest = hashlib.md5(b"abc")
+    etag = RemoteFile.from_headers("u", {"ETag": f'"{digest.hexdigest()}"', "Content-Length": "3"})
+    assert etag.md5 is None and etag.size == 3
+    weak = RemoteFile.from_headers("u", {"ETag": f'W/"{digest.hexdigest()}"'})
+    assert weak.md5 is None
+    content_md5 = RemoteFile.from_headers("u", {"Content-MD5": base64.b64encode(digest.digest()).decode(), "ETag": '"x"'})
+    assert content_md5.md5 == digest.hexdigest()
+    goog = RemoteFile.from_headers("u", {"x-goog-hash": f"crc32c=AAAA==,md5={base64.b64encode(digest.digest()).decode()}"})
+    assert goog.md5 == digest.hexdigest()
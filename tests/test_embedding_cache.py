@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from patent_mvp.embedding_cache import LEGACY_NAMESPACE, MmapEmbeddingCache
+from patent_mvp.embeddings import SentenceTransformerProvider, embedding_namespace
+from patent_mvp.text_utils import sha256_hex
+
+
+def test_put_get_roundtrip_and_reopen(tmp_path: Path) -> None:
+    cache = MmapEmbeddingCache(tmp_path, dim=4)
+    assert cache.put_many({"a": [1, 0, 0, 0], "b": [0, 1, 0, 0]}) == 2
+    assert cache.put_many({"a": [9, 9, 9, 9], "c": [0, 0, 1, 0]}) == 1
+    cache.close()
+
+    reopened = MmapEmbeddingCache(tmp_path, dim=4)
+    got = reopened.get_many(["c", "a", "missing"])
+    assert sorted(got) == ["a", "c"]
+    np.testing.assert_array_equal(got["a"], [1, 0, 0, 0])
+    np.testing.assert_array_equal(got["c"], [0, 0, 1, 0])
+    assert len(reopened) == 3
+
+
+def test_torn_append_is_truncated_on_open(tmp_path: Path) -> None:
+    cache = MmapEmbeddingCache(tmp_path, dim=4)
+    cache.put_many({"a": [1, 2, 3, 4]})
+    cache.close()
+    with (tmp_path / "vectors.f32").open("ab") as f:
+        f.write(b"\x00" * 10)
+
+    reopened = MmapEmbeddingCache(tmp_path, dim=4)
+    assert (tmp_path / "vectors.f32").stat().st_size == 16
+    reopened.put_many({"b": [5, 6, 7, 8]})
+    np.testing.assert_array_equal(reopened.get_many(["b"])["b"], [5, 6, 7, 8])
+
+
+def test_dimension_mismatch_is_rejected(tmp_path: Path) -> None:
+    MmapEmbeddingCache(tmp_path, dim=4).close()
+    with pytest.raises(ValueError, match="4-d"):
+        MmapEmbeddingCache(tmp_path, dim=8)
+
+
+def test_import_legacy_json_goes_to_legacy_namespace(tmp_path: Path) -> None:
+    legacy = tmp_path / "embeddings.json"
+    legacy.write_text(json.dumps({"k1": [0.5, 0.5, 0.5, 0.5], "bad": [1.0]}))
+    cache = MmapEmbeddingCache(tmp_path, dim=4)
+    assert cache.import_json(legacy) == 1
+    assert cache.get_many(["k1", "bad"]) == {}
+    assert cache.namespaces() == [LEGACY_NAMESPACE]
+    assert list(MmapEmbeddingCache(tmp_path, dim=4, namespace=LEGACY_NAMESPACE).get_many(["k1"])) == ["k1"]
+    other = MmapEmbeddingCache(tmp_path, dim=4, namespace="other-model")
+    assert other.import_json(legacy) == 0
+
+
+def test_namespaces_are_isolated(tmp_path: Path) -> None:
+    a = MmapEmbeddingCache(tmp_path, dim=4, namespace=embedding_namespace("model-a"))
+    b = MmapEmbeddingCache(tmp_path, dim=4, namespace=embedding_namespace("model-a", normalize=False))
+    a.put_many({"k": [1, 1, 1, 1]})
+    assert b.get_many(["k"]) == {}
+    assert b.stats == {"hits": 0, "misses": 1, "evictions": 0}
+
+
+def test_lru_eviction_reuses_slots_and_counts(tmp_path: Path) -> None:
+    cache = MmapEmbeddingCache(tmp_path, dim=4, max_entries=2)
+    cache.put_many({"a": [1, 0, 0, 0]})
+    cache.put_many({"b": [0, 1, 0, 0]})
+    cache.get_many(["a"])
+    cache.put_many({"c": [0, 0, 1, 0]})
+
+    assert sorted(cache.get_many(["a", "b", "c"])) == ["a", "c"]
+    cache.put_many({"d": [0, 0, 0, 1]})
+    assert cache.slots == 3
+    assert (tmp_path / "vectors.f32").stat().st_size == 3 * 16
+    np.testing.assert_array_equal(cache.get_many(["d"])["d"], [0, 0, 0, 1])
+    assert cache.stats["evictions"] == 2
+    counters = cache.describe()["namespaces"]["default"]
+    assert counters["entries"] == 2
+    assert counters["evictions"] == 2
+    assert counters["misses"] == 1
+
+
+def test_prune_drops_namespace(tmp_path: Path) -> None:
+    old = MmapEmbeddingCache(tmp_path, dim=4, namespace="old")
+    old.put_many({"a": [1, 0, 0, 0], "b": [0, 1, 0, 0]})
+    current = MmapEmbeddingCache(tmp_path, dim=4, namespace="current")
+    current.put_many({"a": [1, 1, 1, 1]})
+    assert current.prune(drop_namespaces=["old"]) == 2
+    assert current.namespaces() == ["current"]
+    assert current.describe()["free_slots"] == 2
+
+
+
+def test_lookups_without_eviction_do_not_write(tmp_path: Path) -> None:
+    cache = MmapEmbeddingCache(tmp_path, dim=4)
+    cache.put_many({"a": [1, 0, 0, 0]})
+    before = cache.db.total_changes
+    assert list(cache.get_many(["a", "missing"])) == ["a"]
+    assert cache.db.total_changes == before
+    cache.close()
+    counters = MmapEmbeddingCache(tmp_path, dim=4).describe()["namespaces"]["default"]
+    assert (counters["hits"], counters["misses"]) == (1, 1)
+
+
+def test_get_many_drops_a_slot_reused_during_the_read(tmp_path: Path) -> None:
+    reader = MmapEmbeddingCache(tmp_path, dim=4)
+    reader.put_many({"a": [1, 0, 0, 0]})
+    writer = MmapEmbeddingCache(tmp_path, dim=4, max_entries=1)
+    mapped = reader._mapped
+
+    def racing(min_rows: int):
+        # Another process evicts "a" and hands its slot to "c" mid-read.
+        writer.put_many({"b": [0, 1, 0, 0]})
+        writer.put_many({"c": [0, 0, 1, 0]})
+        return mapped(min_rows)
+
+    reader._mapped = racing
+    assert reader.get_many(["a"]) == {}
+    assert reader.stats["misses"] == 1
+
+class _CountingModel:
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, texts, batch_size: int, convert_to_numpy: bool, normalize_embeddings: bool) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.ones((len(texts), 768), dtype=np.float32)
+
+
+def test_provider_only_encodes_cache_misses(tmp_path: Path) -> None:
+    provider = SentenceTransformerProvider.__new__(SentenceTransformerProvider)
+    provider.model_name = "test-model"
+    provider.normalize = True
+    provider.batch_size = 32
+    provider.model = _CountingModel()
+    provider.cache = MmapEmbeddingCache(tmp_path, dim=768)
+    provider.cache.put_many({sha256_hex("cached"): np.zeros(768)})
+
+    vectors = provider.embed(["cached", "new", "new"])
+
+    assert provider.model.encoded == ["new"]
+    assert vectors[0] == [0.0] * 768
+    assert vectors[1] == vectors[2] == [1.0] * 768
+    assert len(provider.cache) == 2
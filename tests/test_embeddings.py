@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 
-from patent_mvp.embeddings import SentenceTransformerProvider
+from patent_mvp.embeddings import EmbeddingProvider, EmbeddingScheduler, SentenceTransformerProvider
+from patent_mvp.models import EvidenceChunk
 
 
 def test_embedding_dimension_validation_error_message() -> None:
@@ -8,3 +10,44 @@ def test_embedding_dimension_validation_error_message() -> None:
     provider.model_name = "test-model"
     with pytest.raises(ValueError, match=r"vector\(768\)"):
         provider._validate_dimension(1024)
+
+
+class _CountingModel:
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, texts: list[str], **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.ones((len(texts), 768), dtype=np.float32)
+
+
+def test_uncached_provider_encodes_every_call() -> None:
+    provider = SentenceTransformerProvider.__new__(SentenceTransformerProvider)
+    provider.model_name, provider.model, provider.cache = "test-model", _CountingModel(), None
+    provider.batch_size, provider.normalize = 8, True
+    assert len(provider.embed(["a", "b"])[0]) == 768
+    provider.embed(["a"])
+    assert provider.model.encoded == ["a", "b", "a"]
+
+
+class _LengthEmbedder(EmbeddingProvider):
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        return [[float(len(t.split()))] for t in texts]
+
+
+def test_scheduler_runs_length_sorted_micro_batches() -> None:
+    texts = ["a b c d e", "a", "a b c", "a b", "a b c d"]
+    chunks = [EvidenceChunk(chunk_id=str(i), publication_number="US1", section_type="CLAIM", text=t) for i, t in enumerate(texts)]
+    embedder = _LengthEmbedder()
+    written: list[tuple[list[str], list[list[float]]]] = []
+
+    stats = EmbeddingScheduler(embedder, batch_size=2).run(chunks, lambda batch, vecs: written.append(([c.chunk_id for c in batch], vecs)))
+
+    assert embedder.calls == [["a", "a b"], ["a b c", "a b c d"], ["a b c d e"]]
+    assert [ids for ids, _ in written] == [["1", "3"], ["2", "4"], ["0"]]
+    assert written[0][1] == [[1.0], [2.0]]
+    assert (stats.chunks, stats.tokens, stats.batches) == (5, 15, 3)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import zipfile
+from contextlib import contextmanager
 from pathlib import Path
 from types import SimpleNamespace
 
@@ -10,12 +11,16 @@ import pytest
 pytest.importorskip("lxml")
 
 import patent_mvp.ingest as ingest_mod
+from patent_mvp.embeddings import EmbeddingProvider, embedding_namespace
+from patent_mvp.ingest_state import IngestStateStore
+from patent_mvp.text_utils import content_hash
 
 
 class _FakeDownloader:
     def __init__(self, data_root: str) -> None:
         self.data_root = data_root
         self.marked: list[str] = []
+        self.state = IngestStateStore(Path(data_root) / "ingest_state.sqlite")
 
     def select_weeks(self, weeks: int, since_last: bool) -> list[tuple[str, str]]:
         return [("20250107", "https://example.local/ipg20250107.zip")]
@@ -24,13 +29,32 @@ class _FakeDownloader:
         return Path(self.data_root) / "raw" / "ptgrxml" / f"ipg{week_date}" / f"ipg{week_date}.zip"
 
     def mark_processed(self, week_date: str) -> None:
+        self.state.mark_processed(week_date)
         self.marked.append(week_date)
 
 
 class _FakePostgresStore:
-    def __init__(self, dsn: str) -> None:
+    def __init__(self, dsn: str, pooled: bool = False) -> None:
         self.patents: list[str] = []
         self.chunk_ids: list[str] = []
+        self.hashes: dict[str, str] = {}
+        self.stored: dict[str, tuple[str, str, str | None]] = {}
+        self.deleted: list[str] = []
+
+    def fetch_patent_hashes(self, pubs) -> dict[str, str]:
+        return {p: self.hashes[p] for p in pubs if p in self.hashes}
+
+    def fetch_chunk_state(self, pubs) -> dict[str, tuple[str, str | None]]:
+        return {cid: (h, namespace) for cid, (pub, h, namespace) in self.stored.items() if pub in pubs}
+
+    def delete_chunks(self, chunk_ids) -> int:
+        self.deleted.extend(chunk_ids)
+        for cid in chunk_ids:
+            self.stored.pop(cid, None)
+        return len(chunk_ids)
+
+    def close(self) -> None:
+        return
 
     def upsert_patent(self, patent) -> None:
         self.patents.append(patent.publication_number)
@@ -41,23 +65,52 @@ class _FakePostgresStore:
     def update_embedding(self, chunk_id: str, embedding: list[float]) -> None:
         assert len(embedding) == 768
 
+    def bulk_write(self, patents, chunks, embeddings=None, embedding_namespace=None) -> None:
+        self.patents.extend(p.publication_number for p in patents)
+        self.hashes.update((p.publication_number, content_hash(p.__dict__)) for p in patents)
+        self.upsert_chunks(chunks)
+        for i, c in enumerate(chunks):
+            has_vec = embeddings is not None and embeddings[i] is not None
+            self.stored[c.chunk_id] = (c.publication_number, c.metadata["text_hash"], embedding_namespace if has_vec else None)
+        if chunks:
+            assert embeddings is not None and len(embeddings) == len(chunks)
+            for vec in embeddings:
+                assert len(vec) == 768
+
 
 class _FakeOpenSearchStore:
     def __init__(self, base_url: str, index_name: str) -> None:
         self.indexed: list[str] = []
+        self.deleted: list[str] = []
+        self.refreshes = 0
+
+    def delete_chunks(self, chunk_ids) -> int:
+        self.deleted.extend(chunk_ids)
+        return len(chunk_ids)
 
     def ensure_index(self) -> None:
         return
 
-    def index_chunks(self, chunks) -> None:
+    def index_chunks(self, chunks, refresh: bool = True) -> None:
+        assert refresh is False
         self.indexed.extend([c.chunk_id for c in chunks])
 
+    def refresh(self) -> None:
+        self.refreshes += 1
+
+    @contextmanager
+    def bulk_ingest_mode(self):
+        yield
+
+
+class _FakeEmbedder(EmbeddingProvider):
+    embedded = 0
 
-class _FakeEmbedder:
     def __init__(self, model_name: str) -> None:
         self.model_name = model_name
 
     def embed(self, texts: list[str]) -> list[list[float]]:
+        type(self).embedded += len(texts)
         return [[0.0] * 768 for _ in texts]
 
 
@@ -77,6 +130,10 @@ def test_run_ingest_smoke_with_fixture_zip(tmp_path: Path, monkeypatch: pytest.M
         opensearch_url="http://unused",
         opensearch_index="unused",
         embedding_model="BAAI/bge-base-en-v1.5",
+        ingest_batch_size=256,
+        pg_pool_enabled=False,
+        columnar_enabled=False,
+        embedding_batch_size=2,
     ))
     monkeypatch.setattr(ingest_mod, "PTGRXMLDownloader", _FakeDownloader)
     monkeypatch.setattr(ingest_mod, "PostgresStore", _FakePostgresStore)
@@ -93,3 +150,254 @@ def test_run_ingest_smoke_with_fixture_zip(tmp_path: Path, monkeypatch: pytest.M
     lines = [json.loads(line) for line in chunk_file.read_text().splitlines()]
     assert len(lines) >= 4
     assert any(line["section_type"] == "CLAIM" for line in lines)
+
+
+def test_run_ingest_pipelines_multiple_weeks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    week_ids = ["20250107", "20250114", "20250121"]
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    for week in week_ids:
+        zip_dir = tmp_path / "raw" / "ptgrxml" / f"ipg{week}"
+        zip_dir.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(zip_dir / f"ipg{week}.zip", "w") as zf:
+            zf.writestr("ipg.xml", fixture_xml)
+
+    downloader = _FakeDownloader(str(tmp_path))
+    downloader.select_weeks = lambda weeks, since_last: [(w, f"https://example.local/ipg{w}.zip") for w in week_ids]
+    pg = _FakePostgresStore("unused")
+    os_store = _FakeOpenSearchStore("unused", "unused")
+
+    monkeypatch.setattr(ingest_mod, "SETTINGS", SimpleNamespace(
+        data_root=str(tmp_path),
+        postgres_dsn="postgresql://unused",
+        opensearch_url="http://unused",
+        opensearch_index="unused",
+        embedding_model="BAAI/bge-base-en-v1.5",
+        ingest_batch_size=1,
+        pg_pool_enabled=False,
+        columnar_enabled=False,
+        embedding_batch_size=3,
+    ))
+    monkeypatch.setattr(ingest_mod, "PTGRXMLDownloader", lambda data_root: downloader)
+    monkeypatch.setattr(ingest_mod, "PostgresStore", lambda dsn, pooled=False: pg)
+    monkeypatch.setattr(ingest_mod, "OpenSearchStore", lambda url, index: os_store)
+    monkeypatch.setattr(ingest_mod, "SentenceTransformerProvider", _FakeEmbedder)
+
+    ingest_mod.run_ingest(
+        weeks=3,
+        stage_workers=ingest_mod.StageWorkers(download=2, parse=2, chunk=2, embed=2, write=3),
+        queue_size=1,
+        # Every week holds the same fixture patent; write each copy in full.
+        reprocess=True,
+    )
+
+    assert sorted(downloader.marked) == week_ids
+    assert (tmp_path / "ingest_generation").read_text() == "3"
+    assert os_store.refreshes == len(week_ids)
+    for week in week_ids:
+        lines = (tmp_path / "derived" / "chunks" / f"ipg{week}.jsonl").read_text().splitlines()
+        assert len(lines) >= 4
+    assert sorted(os_store.indexed) == sorted(pg.chunk_ids)
+    assert len(pg.chunk_ids) == 3 * len(lines)
+
+
+def _patch_single_week(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, xml: str) -> tuple[_FakePostgresStore, _FakeOpenSearchStore]:
+    zip_dir = tmp_path / "raw" / "ptgrxml" / "ipg20250107"
+    zip_dir.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(zip_dir / "ipg20250107.zip", "w") as zf:
+        zf.writestr("ipg.xml", xml)
+    pg = _FakePostgresStore("unused")
+    os_store = _FakeOpenSearchStore("unused", "unused")
+    monkeypatch.setattr(ingest_mod, "SETTINGS", SimpleNamespace(
+        data_root=str(tmp_path),
+        postgres_dsn="postgresql://unused",
+        opensearch_url="http://unused",
+        opensearch_index="unused",
+        embedding_model="BAAI/bge-base-en-v1.5",
+        ingest_batch_size=256,
+        pg_pool_enabled=False,
+        columnar_enabled=False,
+        embedding_batch_size=4,
+    ))
+    monkeypatch.setattr(ingest_mod, "PTGRXMLDownloader", _FakeDownloader)
+    monkeypatch.setattr(ingest_mod, "PostgresStore", lambda dsn, pooled=False: pg)
+    monkeypatch.setattr(ingest_mod, "OpenSearchStore", lambda url, index: os_store)
+    monkeypatch.setattr(ingest_mod, "SentenceTransformerProvider", _FakeEmbedder)
+    return pg, os_store
+
+
+def test_reingesting_an_unchanged_week_writes_and_embeds_nothing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    pg, os_store = _patch_single_week(tmp_path, monkeypatch, fixture_xml)
+    _FakeEmbedder.embedded = 0
+    ingest_mod.run_ingest(weeks=1)
+    first = (len(pg.patents), len(pg.chunk_ids), len(os_store.indexed), _FakeEmbedder.embedded)
+    assert first[1] == first[2] == first[3] > 0
+
+    ingest_mod.run_ingest(weeks=1)
+    assert (len(pg.patents), len(pg.chunk_ids), len(os_store.indexed), _FakeEmbedder.embedded) == first
+    assert pg.deleted == os_store.deleted == []
+    chunk_file = tmp_path / "derived" / "chunks" / "ipg20250107.jsonl"
+    assert len(chunk_file.read_text().splitlines()) == first[1]
+
+    ingest_mod.run_ingest(weeks=1, reprocess=True)
+    assert len(pg.chunk_ids) == 2 * first[1]
+    assert _FakeEmbedder.embedded == 2 * first[3]
+
+
+def test_reingest_rewrites_changed_chunks_and_deletes_orphans(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    pg, os_store = _patch_single_week(tmp_path, monkeypatch, fixture_xml)
+    ingest_mod.run_ingest(weeks=1)
+    before = set(pg.stored)
+    written = len(pg.chunk_ids)
+
+    start = fixture_xml.index("<abstract>")
+    revised = fixture_xml[:start] + fixture_xml[start:].replace("<p>", "<p>Revised ", 1)
+    with zipfile.ZipFile(tmp_path / "raw" / "ptgrxml" / "ipg20250107" / "ipg20250107.zip", "w") as zf:
+        zf.writestr("ipg.xml", revised)
+    _FakeEmbedder.embedded = 0
+    ingest_mod.run_ingest(weeks=1)
+
+    assert len(pg.deleted) == 1 and pg.deleted == os_store.deleted
+    assert pg.deleted[0] in before
+    assert len(pg.chunk_ids) == written + 1
+    assert _FakeEmbedder.embedded == 1
+    assert pg.patents.count("US1234567B2") == 2
+
+
+def test_reprocess_still_deletes_stale_chunks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    pg, os_store = _patch_single_week(tmp_path, monkeypatch, fixture_xml)
+    ingest_mod.run_ingest(weeks=1)
+    pg.stored["US1234567B2:retired-chunker:0"] = ("US1234567B2", "old", "old-model")
+
+    _FakeEmbedder.embedded = 0
+    ingest_mod.run_ingest(weeks=1, reprocess=True)
+
+    assert pg.deleted == os_store.deleted == ["US1234567B2:retired-chunker:0"]
+    assert "US1234567B2:retired-chunker:0" not in pg.stored
+    assert _FakeEmbedder.embedded > 0
+
+
+def test_interrupted_ingest_resumes_from_batch_checkpoints(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    pubs = ["US1234567B2", "US1234568B2", "US1234569B2"]
+    week_xml = "".join(fixture_xml.replace("US1234567B2", pub) for pub in pubs)
+    pg, os_store = _patch_single_week(tmp_path, monkeypatch, week_xml)
+    monkeypatch.setattr(ingest_mod.SETTINGS, "ingest_batch_size", 1)
+
+    # OpenSearch goes away when the last batch reaches it. Single workers
+    # keep batches in order, so the first two are fully committed by then.
+    index_chunks = os_store.index_chunks
+
+    def flaky_index(chunks, refresh: bool = True) -> None:
+        if any(c.publication_number == pubs[-1] for c in chunks):
+            raise ConnectionError("opensearch unavailable")
+        index_chunks(chunks, refresh=refresh)
+
+    os_store.index_chunks = flaky_index
+    serial = ingest_mod.StageWorkers(download=1, parse=1, chunk=1, embed=1, write=1)
+    with pytest.raises(ConnectionError):
+        ingest_mod.run_ingest(weeks=1, stage_workers=serial)
+    state = IngestStateStore(tmp_path / "ingest_state.sqlite")
+    progress = state.describe()
+    assert progress["processed"] == []
+    assert progress["in_progress"]["20250107"]["indexed"]["batches"] == 2
+    assert progress["in_progress"]["20250107"]["parsed"]["batches"] == 3
+    assert set(progress["in_progress"]["20250107"]) == {"parsed", "indexed"}
+    committed = set(os_store.indexed)
+
+    os_store.index_chunks = index_chunks
+    _FakeEmbedder.embedded = 0
+    patents_before = list(pg.patents)
+    written_before = len(pg.chunk_ids)
+    ingest_mod.run_ingest(weeks=1, stage_workers=serial)
+
+    # Committed batches are neither rewritten nor re-embedded; of the last
+    # one, only chunks whose vectors never reached Postgres are embedded.
+    rewritten = pg.chunk_ids[written_before:]
+    assert committed and not committed & set(rewritten)
+    assert pg.patents == patents_before
+    last_batch = [cid for cid, (pub, _, _) in pg.stored.items() if pub == pubs[-1]]
+    assert _FakeEmbedder.embedded == len(rewritten) < len(last_batch)
+    assert set(os_store.indexed) == set(pg.stored)
+    chunk_file = tmp_path / "derived" / "chunks" / "ipg20250107.jsonl"
+    assert {json.loads(line)["chunk_id"] for line in chunk_file.read_text().splitlines()} == set(pg.stored)
+    assert state.describe() == {"processed": ["20250107"], "in_progress": {}}
+
+
+def test_columnar_week_matches_chunk_jsonl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("pyarrow")
+    from patent_mvp.columnar import ColumnarStore
+
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    pg, _ = _patch_single_week(tmp_path, monkeypatch, fixture_xml)
+    ingest_mod.run_ingest(weeks=1, columnar=True)
+
+    store = ColumnarStore(tmp_path / "derived" / "columnar")
+    chunk_file = tmp_path / "derived" / "chunks" / "ipg20250107.jsonl"
+    jsonl_ids = [json.loads(line)["chunk_id"] for line in chunk_file.read_text().splitlines()]
+    assert [p.publication_number for p in store.iter_patents("20250107")] == ["US1234567B2"]
+    assert sorted(c.chunk_id for c in store.iter_chunks("20250107")) == sorted(jsonl_ids) == sorted(pg.stored)
+    ids, matrix = store.embedding_matrix("20250107")
+    assert sorted(ids) == sorted(jsonl_ids) and matrix.shape == (len(ids), 768)
+
+    # An unchanged re-ingest embeds nothing; vectors come from the cache.
+    class _Cache:
+        def get_many(self, keys):
+            return {k: [1.0] * 768 for k in keys}
+
+    monkeypatch.setattr(_FakeEmbedder, "cache", _Cache(), raising=False)
+    _FakeEmbedder.embedded = 0
+    ingest_mod.run_ingest(weeks=1, columnar=True)
+    ids, matrix = store.embedding_matrix("20250107")
+    assert _FakeEmbedder.embedded == 0
+    assert sorted(ids) == sorted(jsonl_ids) and float(matrix.min()) == 1.0
+
+
+def test_diff_chunks_reembeds_chunks_stored_without_a_vector() -> None:
+    from patent_mvp.models import EvidenceChunk, PatentRecord
+
+    patent = PatentRecord("US1", None, "t", "a", [], [], [], [], [])
+    chunks = [EvidenceChunk(f"c{i}", "US1", "CLAIM", f"x{i}", metadata={"text_hash": f"h{i}"}) for i in range(3)]
+    stored = {"c0": ("h0", "model@default|normalize=1"), "c1": ("h1", None), "old": ("h9", "model@default|normalize=1")}
+    diff = ingest_mod.diff_chunks([patent], chunks, {"US1": content_hash(patent.__dict__)}, stored, "model@default|normalize=1")
+    assert diff.patents == []
+    assert [c.chunk_id for c in diff.chunks] == ["c1", "c2"]
+    assert diff.orphans == ["old"] and len(diff.unchanged) == 1
+
+
+def test_incremental_ingest_reembeds_chunks_after_a_model_change(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture_xml = Path("tests/fixtures/sample_patent.xml").read_text()
+    pg, _ = _patch_single_week(tmp_path, monkeypatch, fixture_xml)
+    ingest_mod.run_ingest(weeks=1)
+    assert {namespace for _, _, namespace in pg.stored.values()} == {embedding_namespace("BAAI/bge-base-en-v1.5")}
+
+    _FakeEmbedder.embedded = 0
+    monkeypatch.setattr(ingest_mod.SETTINGS, "embedding_model", "other-model")
+    ingest_mod.run_ingest(weeks=1)
+
+    assert _FakeEmbedder.embedded == len(pg.stored)
+    assert {namespace for _, _, namespace in pg.stored.values()} == {embedding_namespace("other-model")}
+
+
+def test_week_progress_runs_callbacks_outside_its_lock() -> None:
+    calls: list = []
+
+    def unlocked() -> None:
+        assert progress._lock.acquire(blocking=False)
+        progress._lock.release()
+
+    def on_batch(batch) -> None:
+        unlocked()
+        calls.append(batch.seq)
+
+    def on_complete(week_date: str, n_chunks: int) -> None:
+        unlocked()
+        calls.append((week_date, n_chunks))
+
+    progress = ingest_mod.WeekProgress(on_complete, on_batch)
+    progress.written(ingest_mod.IngestBatch(week_date="20250107", seq=0, patents=[], pending=2), 2)
+    progress.parsed("20250107", 2)
+    progress.written(ingest_mod.IngestBatch(week_date="20250107", seq=1, patents=[], pending=3), 3)
+    assert calls == [0, 1, ("20250107", 5)]
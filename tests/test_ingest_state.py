@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from patent_mvp.ingest_state import IngestStateStore
+
+
+def test_legacy_json_is_imported_once_and_renamed(tmp_path: Path) -> None:
+    legacy = tmp_path / "processed_weeks.json"
+    legacy.write_text(json.dumps(["20250107", "20250114"]))
+    store = IngestStateStore(tmp_path / "state.sqlite", legacy_json=legacy)
+    assert store.processed_weeks() == {"20250107", "20250114"}
+    assert not legacy.exists() and legacy.with_name("processed_weeks.json.migrated").exists()
+    store.close()
+
+    reopened = IngestStateStore(tmp_path / "state.sqlite", legacy_json=legacy)
+    assert reopened.processed_weeks() == {"20250107", "20250114"}
+    reopened.set_processed(["20250121"])
+    assert reopened.processed_weeks() == {"20250121"}
+
+
+def test_batch_checkpoints_survive_reopen_and_reset_on_plan_change(tmp_path: Path) -> None:
+    store = IngestStateStore(tmp_path / "state.sqlite")
+    assert store.start_week("20250107", "plan-a") == {}
+    store.checkpoint("20250107", 0, "parsed", 10)
+    store.checkpoint("20250107", 0, "indexed", 42)
+    store.checkpoint("20250107", 1, "parsed", 10)
+    with pytest.raises(ValueError):
+        store.checkpoint("20250107", 1, "embedded")
+    store.close()
+
+    store = IngestStateStore(tmp_path / "state.sqlite")
+    assert store.start_week("20250107", "plan-a") == {0: {"parsed", "indexed"}, 1: {"parsed"}}
+    assert store.describe()["in_progress"]["20250107"]["parsed"] == {"batches": 2, "items": 20}
+    assert store.start_week("20250107", "plan-b") == {}
+
+    store.checkpoint("20250107", 0, "parsed", 10)
+    assert store.start_week("20250107", "plan-b", reset=True) == {}
+    store.checkpoint("20250107", 0, "parsed", 10)
+    store.mark_processed("20250107")
+    assert store.describe() == {"processed": ["20250107"], "in_progress": {}}
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+
+import pytest
+
+from patent_mvp.logging_utils import JsonFormatter, TextFormatter
+from patent_mvp.metrics import CHUNKS_BUILT, STAGE_SECONDS, MetricsRegistry, exporting
+from patent_mvp.pipeline import Pipeline
+
+
+def test_counter_and_histogram_render_prometheus_text() -> None:
+    registry = MetricsRegistry(enabled=True)
+    rows = registry.counter("rows_total", "Rows written", ("store",))
+    latency = registry.histogram("leg_seconds", "Leg latency", ("leg",), buckets=(0.1, 1.0))
+    rows.inc(3, store="postgres")
+    rows.inc(store="postgres")
+    latency.observe(0.05, leg="bm25")
+    latency.observe(0.5, leg="bm25")
+    latency.observe(5.0, leg="bm25")
+
+    text = registry.render_prometheus()
+    assert "# TYPE rows_total counter\n" in text
+    assert 'rows_total{store="postgres"} 4\n' in text
+    assert 'leg_seconds_bucket{leg="bm25",le="0.1"} 1\n' in text
+    assert 'leg_seconds_bucket{leg="bm25",le="1"} 2\n' in text
+    assert 'leg_seconds_bucket{leg="bm25",le="+Inf"} 3\n' in text
+    assert 'leg_seconds_count{leg="bm25"} 3\n' in text
+    assert registry.snapshot()['leg_seconds{leg="bm25"}'] == {"count": 3, "sum": 5.55}
+    with pytest.raises(ValueError):
+        rows.inc(store="postgres", kind="chunks")
+    with pytest.raises(ValueError):
+        registry.histogram("rows_total", "clash")
+
+
+def test_disabled_registry_records_nothing() -> None:
+    registry = MetricsRegistry(enabled=False)
+    counter = registry.counter("c_total", "c")
+    histogram = registry.histogram("h_seconds", "h")
+    counter.inc(5)
+    with histogram.time():
+        pass
+    assert counter.value() == 0
+    assert histogram.summary() == {"count": 0, "sum": 0.0}
+    assert registry.render_prometheus() == ""
+
+
+def test_counters_are_thread_safe() -> None:
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter("c_total", "c")
+
+    def work() -> None:
+        for _ in range(10_000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value() == 40_000
+
+
+def test_exporting_writes_textfile_and_logs_json_snapshot(metrics_enabled, tmp_path, caplog) -> None:
+    out = tmp_path / "metrics" / "patent_mvp.prom"
+    with caplog.at_level(logging.INFO, logger="patent_mvp.metrics"), exporting(interval=60, path=out):
+        CHUNKS_BUILT.inc(7)
+    assert "patent_mvp_chunks_built_total 7\n" in out.read_text()
+    record = next(r for r in caplog.records if r.getMessage() == "Metrics snapshot")
+    assert record.fields["metrics"]["patent_mvp_chunks_built_total"] == 7
+
+    line = json.loads(JsonFormatter().format(record))
+    assert line["message"] == "Metrics snapshot"
+    assert line["metrics"]["patent_mvp_chunks_built_total"] == 7
+    assert "metrics=" in TextFormatter("%(message)s").format(record)
+
+
+def test_pipeline_records_per_stage_timings(metrics_enabled) -> None:
+    pipeline = Pipeline(queue_size=2)
+    pipeline.add_stage("double", lambda x: [x * 2], workers=2)
+    pipeline.add_stage("sink", lambda x: None)
+    pipeline.run(range(5))
+    assert STAGE_SECONDS.summary(stage="double")["count"] == 5
+    assert STAGE_SECONDS.summary(stage="sink")["count"] == 5
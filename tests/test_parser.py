@@ -1,10 +1,24 @@
+import io
+import types
+import zipfile
 from pathlib import Path
 
 import pytest
 
 pytest.importorskip("lxml")
 
-from patent_mvp.parser import parse_claim, parse_patent_xml
+from patent_mvp.parser import (
+    doc_matches_cpc,
+    iter_week_zip,
+    parse_claim,
+    parse_patent_xml,
+    parse_week_zip,
+    split_xml_documents,
+)
+
+
+def _concatenated_week() -> bytes:
+    return Path("tests/fixtures/sample_patent.xml").read_bytes() + Path("tests/fixtures/sample_patent_variant.xml").read_bytes()
 
 
 def test_claim_independent_dependent_detect() -> None:
@@ -36,3 +50,108 @@ def test_fixture_parse_smoke_variant() -> None:
     assert p.publication_number == "US2222222B1"
     assert p.summary_paragraphs == ["Summary inside description variant."]
     assert p.description_paragraphs == ["Implementation details paragraph."]
+
+
+def test_split_xml_documents_on_declarations() -> None:
+    docs = list(split_xml_documents(io.BytesIO(_concatenated_week())))
+    assert len(docs) == 2
+    assert all(d.startswith(b"<?xml") for d in docs)
+
+
+def _write_week_zip(tmp_path: Path, copies: int = 1) -> Path:
+    zip_path = tmp_path / "ipg20250107.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ipg250107.xml", _concatenated_week() * copies)
+    return zip_path
+
+
+def test_iter_week_zip_streams_concatenated_documents(tmp_path: Path) -> None:
+    zip_path = _write_week_zip(tmp_path)
+
+    records = iter_week_zip(zip_path, tmp_path / "parsed")
+    assert isinstance(records, types.GeneratorType)
+    assert [p.publication_number for p in records] == ["US1234567B2", "US2222222B1"]
+    assert (tmp_path / "parsed" / "US2222222B1.json").exists()
+
+
+def test_parse_week_zip_parallel_keeps_order(tmp_path: Path) -> None:
+    zip_path = _write_week_zip(tmp_path, copies=150)
+    serial = [p.publication_number for p in iter_week_zip(zip_path)]
+    parallel = [p.publication_number for p in iter_week_zip(zip_path, workers=2)]
+    assert len(serial) == 300
+    assert parallel == serial
+
+
+TRICKY_XML = b"""<?xml version="1.0"?>
+<us-patent-grant xmlns:x="urn:x">
+  <x:us-bibliographic-data-grant>
+    <publication-reference><document-id><doc-number><!-- c -->US3333333B2</doc-number><date>20250114</date></document-id></publication-reference>
+    <x:invention-title>Nested <b>claims</b> handling</x:invention-title>
+    <references-cited><citation><patcit><document-id><doc-number>US1</doc-number></document-id></patcit></citation>
+      <citation><nplcit><doc-number>US2</doc-number></nplcit></citation></references-cited>
+    <classification-cpc-text>G06F 3/01</classification-cpc-text>
+  </x:us-bibliographic-data-grant>
+  <abstract><p>First <i>abstract</i> part.</p><p>  </p><p>Second part.</p></abstract>
+  <description>
+    <p>Lead paragraph.</p>
+    <summary-of-invention><p>Summary <p>nested</p> text.</p></summary-of-invention>
+    <detailed-description><p>Detail one.</p><?pi ignored?><p>Detail two.</p></detailed-description>
+  </description>
+  <claims>
+    <claim num="1"><claim-text>1. A method comprising: <claim-text>a step;</claim-text></claim-text></claim>
+    <claim><claim-num>2</claim-num><claim-text>2. The method of claim 1.</claim-text></claim>
+    <claim num="3">3. Bare claim text without claim-text.</claim>
+  </claims>
+</us-patent-grant>
+"""
+
+
+@pytest.mark.parametrize(
+    "xml",
+    [
+        TRICKY_XML,
+        Path("tests/fixtures/sample_patent.xml").read_bytes(),
+        Path("tests/fixtures/sample_patent_variant.xml").read_bytes(),
+    ],
+)
+def test_walk_engine_matches_xpath_engine(xml: bytes) -> None:
+    walk = parse_patent_xml(xml, engine="walk")
+    assert walk
+    assert walk == parse_patent_xml(xml, engine="xpath")
+
+
+def test_doc_matches_cpc_byte_scan() -> None:
+    xml = Path("tests/fixtures/sample_patent.xml").read_bytes()
+    assert doc_matches_cpc(xml, "g06f")
+    assert doc_matches_cpc(xml, "H04L")
+    assert not doc_matches_cpc(xml, "A01B")
+
+
+
+@pytest.mark.parametrize(
+    "cpc_xml",
+    [
+        b"<classification-cpc-text><![CDATA[G06F 3/01]]></classification-cpc-text>",
+        b"<classification-cpc-text>&#71;06F 3/01</classification-cpc-text>",
+        b"<classification-cpc-text><!-- primary -->G06F 3/01</classification-cpc-text>",
+    ],
+)
+def test_cpc_byte_scan_never_drops_a_document_the_full_parse_keeps(cpc_xml: bytes) -> None:
+    xml = TRICKY_XML.replace(b"<classification-cpc-text>G06F 3/01</classification-cpc-text>", cpc_xml)
+    assert doc_matches_cpc(xml, "G06F")
+    assert [p.publication_number for p in parse_patent_xml(xml, cpc_prefix="G06F")] == ["US3333333B2"]
+    cdata_only = b"<![CDATA[" in cpc_xml
+    assert doc_matches_cpc(xml, "H04L") is not cdata_only
+
+def test_cpc_prefix_skips_non_matching_documents(tmp_path: Path) -> None:
+    zip_path = _write_week_zip(tmp_path)
+    assert [p.publication_number for p in iter_week_zip(zip_path, cpc_prefix="H04L")] == ["US1234567B2"]
+    assert len(parse_week_zip(zip_path, tmp_path / "parsed", cpc_prefix="G06F")) == 2
+    assert parse_patent_xml(_concatenated_week(), cpc_prefix="A01B") == []
+    assert list(iter_week_zip(zip_path, workers=2, cpc_prefix="H04L"))[0].publication_number == "US1234567B2"
+
+
+def test_cpc_prefix_checks_each_grant_in_wrapped_document() -> None:
+    wrapped = b"<root>" + TRICKY_XML.split(b"?>", 1)[1] + Path("tests/fixtures/sample_patent_variant.xml").read_bytes().split(b"<root>", 1)[1]
+    wrapped = wrapped.replace(b"G06F 3/01", b"H04L 9/00")
+    assert [p.publication_number for p in parse_patent_xml(wrapped, cpc_prefix="G06F")] == ["US2222222B1"]
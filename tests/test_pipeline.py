@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from patent_mvp.pipeline import Pipeline
+
+
+def test_pipeline_runs_all_items_through_every_stage() -> None:
+    seen: list[int] = []
+    lock = threading.Lock()
+
+    def sink(item: int) -> None:
+        with lock:
+            seen.append(item)
+
+    pipeline = Pipeline(queue_size=2)
+    pipeline.add_stage("fanout", lambda n: [n * 10, n * 10 + 1], workers=2)
+    pipeline.add_stage("double", lambda n: [n * 2], workers=3)
+    pipeline.add_stage("sink", sink, workers=2)
+    pipeline.run(range(20))
+
+    assert sorted(seen) == sorted(2 * v for n in range(20) for v in (n * 10, n * 10 + 1))
+    assert [s.items for s in pipeline.stages] == [20, 40, 40]
+
+
+def test_pipeline_bounds_in_flight_items() -> None:
+    produced = 0
+    max_ahead = 0
+    consumed = 0
+    lock = threading.Lock()
+
+    def produce(n: int):
+        nonlocal produced
+        with lock:
+            produced += 1
+        yield n
+
+    def consume(n: int) -> None:
+        nonlocal consumed, max_ahead
+        time.sleep(0.005)
+        with lock:
+            consumed += 1
+            max_ahead = max(max_ahead, produced - consumed)
+
+    pipeline = Pipeline(queue_size=2)
+    pipeline.add_stage("produce", produce)
+    pipeline.add_stage("consume", consume)
+    pipeline.run(range(30))
+
+    assert consumed == 30
+    # Input queue, one item in each worker and the bounded queue between them.
+    assert max_ahead <= 2 + 1 + 1
+
+
+def test_pipeline_propagates_first_error_and_stops() -> None:
+    def explode(n: int):
+        if n == 3:
+            raise RuntimeError("boom")
+        yield n
+
+    pipeline = Pipeline(queue_size=1)
+    pipeline.add_stage("explode", explode, workers=2)
+    pipeline.add_stage("sink", lambda n: time.sleep(0.01))
+    with pytest.raises(RuntimeError, match="boom"):
+        pipeline.run(iter(range(10_000)))
+
+
+def test_pipeline_stops_draining_generators_after_a_failure() -> None:
+    produced = 0
+    closed = threading.Event()
+
+    def produce(n: int):
+        nonlocal produced
+        try:
+            for i in range(10_000):
+                produced += 1
+                yield i
+        finally:
+            closed.set()
+
+    def sink(n: int) -> None:
+        raise RuntimeError("sink down")
+
+    pipeline = Pipeline(queue_size=1)
+    pipeline.add_stage("produce", produce)
+    pipeline.add_stage("sink", sink)
+    with pytest.raises(RuntimeError, match="sink down"):
+        pipeline.run([0])
+
+    assert closed.is_set()
+    assert produced < 100
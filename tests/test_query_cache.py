@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from patent_mvp.embeddings import EmbeddingProvider
+from patent_mvp.query_cache import QueryResultCache, bump_generation, result_key
+from patent_mvp.search import hybrid_search, hybrid_search_batch, search_cache_key
+
+RESULT = {"chunks": [{"chunk_id": "c1", "score": 1.0}], "patents": [], "degraded": []}
+
+
+def _cache(tmp_path: Path, **kwargs) -> QueryResultCache:
+    return QueryResultCache(generation_file=tmp_path / "ingest_generation", **kwargs)
+
+
+def test_key_normalizes_whitespace_and_includes_params() -> None:
+    assert result_key("  gpu   scheduling\n", topk=5) == result_key("gpu scheduling", topk=5)
+    assert result_key("gpu scheduling", topk=5) != result_key("gpu scheduling", topk=6)
+
+
+def test_search_key_includes_embedding_revision_and_normalize() -> None:
+    embedder = _Embedder()
+    base = search_cache_key("gpu", embedder, topk=5)
+    embedder.revision = "abc123"
+    revised = search_cache_key("gpu", embedder, topk=5)
+    embedder.normalize = False
+    assert len({base, revised, search_cache_key("gpu", embedder, topk=5)}) == 3
+
+
+def test_memory_tier_returns_copies_and_evicts_lru(tmp_path: Path) -> None:
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("a", RESULT)
+    cache.put("b", RESULT)
+    hit = cache.get("a")
+    hit["chunks"].clear()
+    assert cache.get("a") == RESULT
+    cache.put("c", RESULT)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_entries_expire_after_ttl(tmp_path: Path) -> None:
+    cache = _cache(tmp_path, ttl_seconds=0.05, disk_dir=tmp_path / "qc")
+    cache.put("a", RESULT)
+    assert cache.get("a") == RESULT
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart_and_ingest_invalidates_both_tiers(tmp_path: Path) -> None:
+    cache = _cache(tmp_path, disk_dir=tmp_path / "qc")
+    cache.put("a", RESULT)
+    cache.close()
+
+    reopened = _cache(tmp_path, disk_dir=tmp_path / "qc")
+    assert reopened.get("a") == RESULT
+    assert reopened.stats["disk_hits"] == 1
+
+    bump_generation(tmp_path / "ingest_generation")
+    assert reopened.get("a") is None
+    assert _cache(tmp_path, disk_dir=tmp_path / "qc").get("a") is None
+
+
+def test_degraded_results_are_not_cached(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    assert cache.put("a", {**RESULT, "degraded": ["vector"]}) is False
+    assert cache.get("a") is None
+
+
+class _Embedder(EmbeddingProvider):
+    model_name = "fake"
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [[1.0] for _ in texts]
+
+
+class _Postgres:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def vector_search(self, query_embedding, topk, ef_search=None, probes=None):
+        self.calls += 1
+        return [("c1", "US1", 0.9)]
+
+    def vector_search_batch(self, query_embeddings, topk, ef_search=None, probes=None):
+        self.calls += 1
+        return [[("c1", "US1", 0.9)] for _ in query_embeddings]
+
+    def graph_expand_patents(self, patents, limit=300):
+        return set()
+
+
+class _OpenSearch:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    def bm25_search(self, query, topk):
+        self.queries.append(query)
+        return [("c2", "US2", 3.0, "")]
+
+    def bm25_msearch(self, queries, topk):
+        self.queries.extend(queries)
+        return [[("c2", "US2", 3.0, "")] for _ in queries]
+
+
+def test_hybrid_search_uses_cache(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    pg, os_store = _Postgres(), _OpenSearch()
+    first = hybrid_search("gpu", _Embedder(), pg, os_store, cache=cache)
+    second = hybrid_search(" gpu ", _Embedder(), pg, os_store, cache=cache)
+    assert first == second
+    assert pg.calls == 1 and os_store.queries == ["gpu"]
+
+    batch = hybrid_search_batch(["gpu", "cpu"], _Embedder(), pg, os_store, cache=cache)
+    assert batch[0] == first
+    assert os_store.queries == ["gpu", "cpu"]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import patent_mvp.reindex as reindex_mod
+from patent_mvp.chunker import build_chunks, write_chunk_jsonl
+from patent_mvp.embedding_cache import MmapEmbeddingCache
+from patent_mvp.models import PatentRecord
+
+WEEKS = ("20250107", "20250114")
+
+
+class _FakePostgresStore:
+    def __init__(self) -> None:
+        self.patents: list[str] = []
+        self.chunks: dict[str, np.ndarray | None] = {}
+        self.closed = False
+
+    def bulk_write(self, patents, chunks, embeddings=None, embedding_namespace=None) -> None:
+        self.namespace = embedding_namespace
+        self.patents.extend(p.publication_number for p in patents)
+        assert embeddings is not None and len(embeddings) == len(chunks)
+        assert {c.publication_number for c in chunks} <= {p.publication_number for p in patents}
+        self.chunks.update((c.chunk_id, v) for c, v in zip(chunks, embeddings))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _FakeIndices:
+    def __init__(self) -> None:
+        self.deleted: list[str] = []
+
+    def exists(self, index: str) -> bool:
+        return True
+
+    def delete(self, index: str) -> None:
+        self.deleted.append(index)
+
+
+class _FakeOpenSearchStore:
+    def __init__(self) -> None:
+        self.index_name = "chunks"
+        self.client = SimpleNamespace(indices=_FakeIndices())
+        self.indexed: list[str] = []
+        self.bulk_mode = False
+
+    def ensure_index(self) -> None:
+        return
+
+    def index_chunks(self, chunks, refresh: bool = True) -> int:
+        assert refresh is False and self.bulk_mode
+        self.indexed.extend(c.chunk_id for c in chunks)
+        return len(chunks)
+
+    @contextmanager
+    def bulk_ingest_mode(self):
+        self.bulk_mode = True
+        yield
+        self.bulk_mode = False
+
+
+def _write_artifacts(root: Path) -> tuple[dict[str, list], MmapEmbeddingCache]:
+    # Two weeks of ingest leftovers: chunk JSONL, parsed patent JSON and a
+    # cache holding vectors for every chunk but the last of each week.
+    cache = MmapEmbeddingCache(root / "cache", dim=768)
+    chunks_by_week: dict[str, list] = {}
+    for w, week in enumerate(WEEKS):
+        patents = [
+            PatentRecord(
+                f"US{week}{i}B2",
+                week,
+                f"title {i}",
+                f"abstract of {week} {i}",
+                [f"summary of {week} {i}"],
+                [f"description of {week} {i}"],
+                [{"claim_num": "1", "text": f"A method {week} {i}.", "is_independent": True}],
+                ["G06F 16/00"],
+                [],
+            )
+            for i in range(3)
+        ]
+        chunks = [c for p in patents for c in build_chunks(p)]
+        write_chunk_jsonl(chunks, root / "derived" / "chunks" / f"ipg{week}.jsonl")
+        parsed = root / "parsed" / "patents"
+        parsed.mkdir(parents=True, exist_ok=True)
+        for p in patents:
+            (parsed / f"{p.publication_number}.json").write_text(json.dumps(p.__dict__))
+        cache.put_many({c.metadata["text_hash"]: np.full(768, w + 1, dtype=np.float32) for c in chunks[:-1]})
+        chunks_by_week[week] = chunks
+    return chunks_by_week, cache
+
+
+def _patch(monkeypatch: pytest.MonkeyPatch, root: Path, cache: MmapEmbeddingCache):
+    pg, os_store = _FakePostgresStore(), _FakeOpenSearchStore()
+    monkeypatch.setattr(reindex_mod, "SETTINGS", SimpleNamespace(
+        data_root=str(root),
+        postgres_dsn="postgresql://unused",
+        pg_pool_enabled=False,
+        opensearch_url="http://unused",
+        opensearch_index="unused",
+        ingest_batch_size=2,
+    ))
+    monkeypatch.setattr(reindex_mod, "PostgresStore", lambda dsn, pooled=False: pg)
+    monkeypatch.setattr(reindex_mod, "OpenSearchStore", lambda url, index: os_store)
+    monkeypatch.setattr(reindex_mod, "open_embedding_cache", lambda: cache)
+    return pg, os_store
+
+
+def test_reindex_streams_jsonl_and_cached_vectors_into_both_stores(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    chunks_by_week, cache = _write_artifacts(tmp_path)
+    pg, os_store = _patch(monkeypatch, tmp_path, cache)
+    missing_pub = chunks_by_week[WEEKS[1]][0].publication_number
+    (tmp_path / "parsed" / "patents" / f"{missing_pub}.json").unlink()
+
+    out = reindex_mod.run_reindex(read_workers=2, write_workers=2, recreate_index=True)
+
+    all_chunks = [c for chunks in chunks_by_week.values() for c in chunks]
+    orphaned = [c for c in all_chunks if c.publication_number == missing_pub]
+    assert out["weeks"] == 2 and out["sources"] == {w: "jsonl" for w in WEEKS}
+    assert out["chunks"] == len(all_chunks) and out["patents"] == 5
+    assert out["missing_patents"] == len(orphaned) and out["missing_vectors"] == 2
+    assert sorted(os_store.indexed) == sorted(c.chunk_id for c in all_chunks)
+    assert set(pg.chunks) == {c.chunk_id for c in all_chunks} - {c.chunk_id for c in orphaned}
+    for w, week in enumerate(WEEKS):
+        first, last = chunks_by_week[week][-3], chunks_by_week[week][-1]
+        assert pg.chunks[last.chunk_id] is None
+        assert float(pg.chunks[first.chunk_id][0]) == w + 1
+    assert pg.namespace == cache.namespace
+    assert os_store.client.indices.deleted == ["chunks"] and not os_store.bulk_mode
+    assert pg.closed and (tmp_path / "ingest_generation").read_text() == "1"
+
+
+def test_reindex_opensearch_only_prefers_columnar_week(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("pyarrow")
+    from patent_mvp.columnar import ColumnarStore
+
+    chunks_by_week, cache = _write_artifacts(tmp_path)
+    pg, os_store = _patch(monkeypatch, tmp_path, cache)
+    columnar_week = chunks_by_week[WEEKS[0]][:4]
+    writer = ColumnarStore(tmp_path / "derived" / "columnar").writer(WEEKS[0], dim=768)
+    writer.write_chunks(columnar_week)
+    writer.close()
+
+    out = reindex_mod.run_reindex(targets=["opensearch"])
+
+    assert out["sources"] == {WEEKS[0]: "columnar", WEEKS[1]: "jsonl"}
+    assert sorted(os_store.indexed) == sorted(c.chunk_id for c in columnar_week + chunks_by_week[WEEKS[1]])
+    assert pg.patents == [] and not pg.closed and out["missing_vectors"] == 0
+    with pytest.raises(ValueError):
+        reindex_mod.run_reindex(targets=["solr"])
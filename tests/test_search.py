@@ -1,4 +1,11 @@
-from patent_mvp.search import merge_scores
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from patent_mvp.embeddings import EmbeddingProvider
+from patent_mvp import search as search_mod
+from patent_mvp.search import hybrid_search, hybrid_search_batch, leg_threads, merge_scores
 
 
 def test_hybrid_merge_and_dedupe() -> None:
@@ -15,3 +22,128 @@ def test_hybrid_merge_and_dedupe() -> None:
     assert len(ids) == 3
     assert len(set(ids)) == 3
     assert ids[0] == "c1"
+
+
+class _Embedder(EmbeddingProvider):
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+class _Postgres:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+
+    def vector_search(self, query_embedding: list[float], topk: int, ef_search=None, probes=None) -> list[tuple[str, str, float]]:
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("postgres down")
+        return [("c1", "US1", 0.9), ("c3", "US3", 0.8)]
+
+    def graph_expand_patents(self, patents: set[str], limit: int = 300) -> set[str]:
+        return set()
+
+
+class _OpenSearch:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+
+    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("opensearch down")
+        return [("c1", "US1", 10.0, "snippet"), ("c2", "US2", 5.0, "snippet")]
+
+
+def test_hybrid_search_runs_legs_concurrently() -> None:
+    t0 = time.perf_counter()
+    out = hybrid_search("q", _Embedder(), _Postgres(delay=0.2), _OpenSearch(delay=0.2), topk=10)
+    elapsed = time.perf_counter() - t0
+    assert elapsed < 0.35
+    assert out["degraded"] == []
+    assert {c["chunk_id"] for c in out["chunks"]} == {"c1", "c2", "c3"}
+
+
+def test_hybrid_search_returns_partial_results_when_a_leg_times_out() -> None:
+    t0 = time.perf_counter()
+    out = hybrid_search("q", _Embedder(), _Postgres(delay=1.0), _OpenSearch(), topk=10, timeout_vec=0.1)
+    assert time.perf_counter() - t0 < 0.5
+    assert out["degraded"] == ["vector"]
+    assert [c["chunk_id"] for c in out["chunks"]] == ["c1", "c2"]
+
+
+def test_hybrid_search_returns_partial_results_when_a_leg_fails() -> None:
+    out = hybrid_search("q", _Embedder(), _Postgres(), _OpenSearch(fail=True), topk=10)
+    assert out["degraded"] == ["bm25"]
+    assert [c["chunk_id"] for c in out["chunks"]] == ["c1", "c3"]
+
+
+def test_leg_pool_covers_both_legs_of_every_serve_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(search_mod, "SETTINGS", SimpleNamespace(serve_threads=12, search_leg_threads=0))
+    assert leg_threads() == 24
+    monkeypatch.setattr(search_mod, "SETTINGS", SimpleNamespace(serve_threads=12, search_leg_threads=5))
+    assert leg_threads() == 5
+
+
+def test_hybrid_search_raises_when_every_leg_fails() -> None:
+    with pytest.raises(ConnectionError):
+        hybrid_search("q", _Embedder(), _Postgres(fail=True), _OpenSearch(fail=True))
+
+
+class _QueryDependentPostgres(_Postgres):
+    def vector_search(self, query_embedding: list[float], topk: int, ef_search=None, probes=None) -> list[tuple[str, str, float]]:
+        n = int(query_embedding[0])
+        return [(f"c{n + i}", f"US{(n + i) % 3}", 1.0 / (i + 1)) for i in range(topk)]
+
+    def vector_search_batch(self, query_embeddings, topk: int, ef_search=None, probes=None):
+        self.batch_calls = getattr(self, "batch_calls", 0) + 1
+        return [self.vector_search(e, topk) for e in query_embeddings]
+
+    def graph_expand_patents(self, patents: set[str], limit: int = 300) -> set[str]:
+        return {"US1"}
+
+
+class _QueryDependentOpenSearch(_OpenSearch):
+    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
+        return [(f"c{len(query) * 2 + i}", f"US{i % 2}", 10.0 - i, query) for i in range(topk)]
+
+    def bm25_msearch(self, queries, topk: int):
+        self.msearch_calls = getattr(self, "msearch_calls", 0) + 1
+        if self.fail:
+            raise ConnectionError("opensearch down")
+        return [self.bm25_search(q, topk) for q in queries]
+
+
+def test_hybrid_search_batch_matches_per_query_results() -> None:
+    queries = ["a", "gpu scheduling", "cpu", "memory controller"]
+    embedder, pg, os_store = _Embedder(), _QueryDependentPostgres(), _QueryDependentOpenSearch()
+    params = dict(topk=5, topk_bm25=4, topk_vec=4, graph_expand=True)
+
+    batch = hybrid_search_batch(queries, embedder, pg, os_store, **params)
+
+    assert embedder.calls == [queries]
+    assert pg.batch_calls == 1 and os_store.msearch_calls == 1
+    assert batch == [hybrid_search(q, embedder, pg, os_store, **params) for q in queries]
+
+
+def test_hybrid_search_batch_marks_every_result_degraded_when_a_leg_fails() -> None:
+    out = hybrid_search_batch(["a", "b"], _Embedder(), _QueryDependentPostgres(), _QueryDependentOpenSearch(fail=True), topk=3)
+    assert [r["degraded"] for r in out] == [["bm25"], ["bm25"]]
+    assert all(r["chunks"] for r in out)
+
+
+def test_hybrid_search_records_leg_latency_and_degraded_legs(metrics_enabled) -> None:
+    from patent_mvp.metrics import SEARCH_DEGRADED, SEARCH_LEG_SECONDS, SEARCH_SECONDS
+
+    hybrid_search("gpu", _Embedder(), _Postgres(), _OpenSearch())
+    hybrid_search("gpu", _Embedder(), _Postgres(fail=True), _OpenSearch())
+    assert SEARCH_SECONDS.summary(mode="single")["count"] == 2
+    assert SEARCH_LEG_SECONDS.summary(leg="bm25")["count"] == 2
+    assert SEARCH_LEG_SECONDS.summary(leg="fuse")["count"] == 2
+    assert SEARCH_DEGRADED.value(leg="vector") == 1
+    assert SEARCH_DEGRADED.value(leg="bm25") == 0
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+
+from patent_mvp.embeddings import EmbeddingProvider
+from patent_mvp.search import hybrid_search
+from patent_mvp.service import SearchService
+
+
+class _SlowEmbedder(EmbeddingProvider):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return [[float(len(t))] for t in texts]
+
+
+class _SlowPostgres:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    def vector_search(self, query_embedding: list[float], topk: int, ef_search=None, probes=None) -> list[tuple[str, str, float]]:
+        time.sleep(self.delay)
+        return [("c1", "US1", 0.9), ("c3", "US3", 0.5)][:topk]
+
+    def graph_expand_patents(self, patents: set[str], limit: int = 300) -> set[str]:
+        return {"US3"}
+
+
+class _SlowOpenSearch:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return [("c1", "US1", 10.0, query), ("c2", "US2", 4.0, "")][:topk]
+
+
+async def _request(port: int, method: str, path: str, body: dict | None = None) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    headers: dict[str, str] = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    payload = json.loads(await reader.readexactly(int(headers["content-length"])))
+    writer.close()
+    return int(status_line.split()[1]), payload
+
+
+def _service(delay: float = 0.0) -> SearchService:
+    return SearchService(_SlowEmbedder(), _SlowPostgres(delay), _SlowOpenSearch(delay), threads=16)
+
+
+def test_service_search_matches_hybrid_search() -> None:
+    service = _service()
+
+    async def run() -> tuple[int, dict]:
+        server = await service.start("127.0.0.1", 0)
+        try:
+            return await _request(server.sockets[0].getsockname()[1], "POST", "/search", {"query": "gpu", "topk": 3, "graph_expand": True})
+        finally:
+            await service.close()
+
+    status, payload = asyncio.run(run())
+    expected = hybrid_search("gpu", service.embedder, service.pg, service.os_store, topk=3, graph_expand=True)
+    assert status == 200
+    assert payload == json.loads(json.dumps(expected))
+
+
+def test_service_runs_legs_and_requests_concurrently() -> None:
+    service = _service(delay=0.2)
+
+    async def run() -> float:
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            t0 = time.perf_counter()
+            results = await asyncio.gather(*[_request(port, "POST", "/search", {"query": f"q{i}"}) for i in range(6)])
+            elapsed = time.perf_counter() - t0
+        finally:
+            await service.close()
+        assert all(status == 200 for status, _ in results)
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    # Sequential legs for six requests would take 6 * 0.4s.
+    assert elapsed < 1.0
+    assert service.os_store.max_active > 1
+
+
+def test_service_rejects_bad_requests() -> None:
+    service = _service()
+
+    async def run() -> list[tuple[int, dict]]:
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [
+                await _request(port, "GET", "/health"),
+                await _request(port, "POST", "/search", {"topk": 3}),
+                await _request(port, "POST", "/search", {"query": "x", "topk": "many"}),
+                await _request(port, "GET", "/search"),
+                await _request(port, "GET", "/nope"),
+            ]
+        finally:
+            await service.close()
+
+    statuses = [status for status, _ in asyncio.run(run())]
+    assert statuses == [200, 400, 400, 405, 404]
+
+
+def test_service_marks_timed_out_leg_as_degraded() -> None:
+    service = SearchService(_SlowEmbedder(), _SlowPostgres(1.0), _SlowOpenSearch(0.0), threads=4, timeout_vec=0.1)
+
+    async def run() -> tuple[int, dict]:
+        server = await service.start("127.0.0.1", 0)
+        try:
+            return await _request(server.sockets[0].getsockname()[1], "POST", "/search", {"query": "gpu"})
+        finally:
+            await service.close()
+
+    status, payload = asyncio.run(run())
+    assert status == 200
+    assert payload["degraded"] == ["vector"]
+    assert [c["chunk_id"] for c in payload["chunks"]] == ["c1", "c2"]
+
+
+def test_service_exposes_prometheus_metrics(metrics_enabled) -> None:
+    service = _service()
+
+    async def run() -> tuple[tuple[int, dict | str], tuple[int, dict | str]]:
+        try:
+            await service.handle("POST", "/search", json.dumps({"query": "gpu"}).encode())
+            return await service.handle("GET", "/metrics", b""), await service.handle("POST", "/metrics", b"")
+        finally:
+            await service.close()
+
+    (status, text), (post_status, _) = asyncio.run(run())
+    assert status == 200 and post_status == 405
+    assert 'patent_mvp_search_seconds_count{mode="service"} 1' in text
+    assert 'patent_mvp_search_leg_seconds_count{leg="vector"} 1' in text
+
+
+class _ThreadRecordingCache:
+    def __init__(self) -> None:
+        self.threads: list[str] = []
+        self.store: dict[str, dict] = {}
+
+    def get(self, key: str) -> dict | None:
+        self.threads.append(threading.current_thread().name)
+        return self.store.get(key)
+
+    def put(self, key: str, result: dict) -> bool:
+        self.threads.append(threading.current_thread().name)
+        self.store[key] = result
+        return True
+
+
+def test_service_reads_and_writes_the_result_cache_off_the_event_loop() -> None:
+    cache = _ThreadRecordingCache()
+    service = SearchService(_SlowEmbedder(), _SlowPostgres(0.0), _SlowOpenSearch(0.0), threads=4, cache=cache)
+
+    async def run() -> tuple[dict, dict]:
+        try:
+            return await service.search("gpu"), await service.search("gpu")
+        finally:
+            await service.close()
+
+    first, second = asyncio.run(run())
+    assert first == second and len(cache.store) == 1
+    assert len(cache.threads) == 3
+    assert all(name.startswith("search") for name in cache.threads)
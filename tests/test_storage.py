@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("pgvector")
+pytest.importorskip("opensearchpy")
+
+import patent_mvp.storage as storage_mod
+from patent_mvp.models import EvidenceChunk, PatentRecord
+from opensearchpy.serializer import JSONSerializer
+
+from patent_mvp.storage import OpenSearchStore, PostgresStore
+
+
+class _FakeCopy:
+    def __init__(self, sql: str, log: dict) -> None:
+        self.rows: list[tuple] = []
+        self.types: list[str] | None = None
+        log["copies"].append((sql, self))
+
+    def __enter__(self) -> "_FakeCopy":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def set_types(self, types: list[str]) -> None:
+        self.types = types
+
+    def write_row(self, row: tuple) -> None:
+        self.rows.append(row)
+
+
+class _FakeCursor:
+    def __init__(self, log: dict) -> None:
+        self.log = log
+
+    def __enter__(self) -> "_FakeCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def execute(self, sql: str, params=None, prepare: bool | None = None) -> None:
+        self.log["sql"].append(" ".join(sql.split()))
+        self.log.setdefault("params", []).append(params)
+        self.log.setdefault("prepared", []).append(prepare)
+
+    def fetchall(self) -> list[tuple]:
+        return self.log.get("rows", [("c1", "US1", 0.25)])
+
+    def copy(self, sql: str) -> _FakeCopy:
+        return _FakeCopy(" ".join(sql.split()), self.log)
+
+
+class _FakeConnection:
+    def __init__(self, log: dict) -> None:
+        self.log = log
+
+    def __enter__(self) -> "_FakeConnection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def cursor(self) -> _FakeCursor:
+        return _FakeCursor(self.log)
+
+
+def _store(monkeypatch: pytest.MonkeyPatch) -> tuple[PostgresStore, dict]:
+    log: dict = {"sql": [], "copies": []}
+    monkeypatch.setattr(storage_mod, "register_vector", lambda conn: None)
+    store = PostgresStore("postgresql://unused")
+    monkeypatch.setattr(store, "conn", lambda: _FakeConnection(log))
+    return store, log
+
+
+def _patent() -> PatentRecord:
+    return PatentRecord(
+        publication_number="US1",
+        grant_date="20250107",
+        title="t",
+        abstract="a",
+        summary_paragraphs=[],
+        description_paragraphs=[],
+        claims=[],
+        cpc_codes=["G06F 9/445", "H04L 67/10"],
+        citations=["US7"],
+    )
+
+
+def _chunk(cid: str) -> EvidenceChunk:
+    return EvidenceChunk(chunk_id=cid, publication_number="US1", section_type="CLAIM", text="x", metadata={"text_hash": "h"})
+
+
+def test_bulk_write_stages_rows_and_merges_once_per_table(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, log = _store(monkeypatch)
+    store.bulk_write([_patent()], [_chunk("c1"), _chunk("c2")], [[0.1] * 768, None], "model@default|normalize=1")
+
+    inserts = [s for s in log["sql"] if s.startswith("INSERT")]
+    assert [s.split()[2].split("(")[0] for s in inserts] == ["patents", "patent_cpc", "patent_citations", "evidence_chunks"]
+
+    copies = {sql.split()[1]: c for sql, c in log["copies"]}
+    assert len(copies["stage_cpc"].rows) == 2
+    assert copies["stage_citations"].rows == [("US1", "US7")]
+    assert len(copies["stage_patents"].rows[0][-1]) == 64
+    chunk_copy = copies["stage_chunks"]
+    assert chunk_copy.types[-2:] == ["vector", "text"]
+    assert [r[0] for r in chunk_copy.rows] == ["c1", "c2"]
+    assert len(chunk_copy.rows[0][-2]) == 768 and chunk_copy.rows[0][-1] == "model@default|normalize=1"
+    assert chunk_copy.rows[1][-2:] == (None, None)
+
+
+def test_bulk_write_rejects_mismatched_embeddings(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, _ = _store(monkeypatch)
+    with pytest.raises(ValueError, match="embeddings"):
+        store.bulk_write([_patent()], [_chunk("c1")], [])
+
+
+def test_hot_search_queries_are_prepared(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, log = _store(monkeypatch)
+    assert store.vector_search([0.5] * 768, 5) == [("c1", "US1", 0.25)]
+    store.graph_expand_patents({"US1"})
+    assert log["prepared"] == [True] * 4
+
+
+def test_vector_search_batch_groups_rows_by_query(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, log = _store(monkeypatch)
+    log["rows"] = [(1, "c1", "US1", 0.9), (1, "c2", "US2", 0.5), (3, "c3", "US3", 0.7)]
+    out = store.vector_search_batch([[0.1] * 768, [0.2] * 768, [0.3] * 768], 2)
+    assert out == [[("c1", "US1", 0.9), ("c2", "US2", 0.5)], [], [("c3", "US3", 0.7)]]
+    assert "CROSS JOIN LATERAL" in log["sql"][-1]
+    assert all(log["prepared"])
+
+
+def test_vector_search_sets_transaction_local_knobs(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, log = _store(monkeypatch)
+    store.vector_search([0.5] * 768, 5, ef_search=200)
+    log["rows"] = []
+    store.vector_search_batch([[0.5] * 768], 5, probes=10)
+    knobs = [params for sql, params in zip(log["sql"], log["params"]) if "set_config" in sql]
+    assert ("hnsw.ef_search", "200") in knobs and ("ivfflat.probes", "10") in knobs
+    assert knobs.count(("statement_timeout", str(int(storage_mod.SETTINGS.search_vector_timeout * 1000)))) == 2
+    assert all(log["prepared"])
+
+
+def test_exact_vector_search_skips_statement_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, log = _store(monkeypatch)
+    store.search_timeout = 0.25
+    store.vector_search([0.5] * 768, 5)
+    assert ("statement_timeout", "250") in log["params"]
+    log["params"].clear()
+    store.vector_search([0.5] * 768, 5, exact=True)
+    assert all(p is None or p[0] != "statement_timeout" for p in log["params"])
+
+
+def test_ivfflat_lists_scale_with_rows() -> None:
+    assert storage_mod.ivfflat_lists(0) == 1
+    assert storage_mod.ivfflat_lists(500_000) == 500
+    assert storage_mod.ivfflat_lists(4_000_000) == 2000
+
+
+@pytest.mark.parametrize(
+    ("kind", "kwargs", "expected"),
+    [
+        ("hnsw", {"m": 24, "ef_construction": 128}, "USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 128)"),
+        ("ivfflat", {"lists": 300}, "USING ivfflat (embedding vector_cosine_ops) WITH (lists = 300)"),
+    ],
+)
+def test_build_vector_index_swaps_in_new_index(monkeypatch: pytest.MonkeyPatch, kind: str, kwargs: dict, expected: str) -> None:
+    store, log = _store(monkeypatch)
+    monkeypatch.setattr(storage_mod.psycopg, "connect", lambda dsn, autocommit=False: _FakeConnection(log))
+    monkeypatch.setattr(store, "vector_index_info", lambda: {"rows_with_embeddings": 10})
+    out = store.build_vector_index(kind, concurrently=True, **kwargs)
+    assert out["options"] == expected
+    ddl = [sql for sql in log["sql"] if "INDEX" in sql]
+    assert ddl == [
+        "DROP INDEX IF EXISTS idx_chunks_embedding_build",
+        f"CREATE INDEX CONCURRENTLY idx_chunks_embedding_build ON evidence_chunks {expected}",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_chunks_embedding",
+        "ALTER INDEX idx_chunks_embedding_build RENAME TO idx_chunks_embedding",
+    ]
+
+
+def test_build_vector_index_rejects_unknown_type(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, _ = _store(monkeypatch)
+    with pytest.raises(ValueError, match="hnsw"):
+        store.build_vector_index("flat")
+
+
+def test_pooled_store_hands_out_pool_connections() -> None:
+    pytest.importorskip("psycopg_pool")
+    store = PostgresStore("postgresql://unused", pooled=False)
+    assert store.pool is None
+
+    class _Pool:
+        def __init__(self) -> None:
+            self.closed = False
+
+        def connection(self) -> str:
+            return "pooled-conn"
+
+        def close(self) -> None:
+            self.closed = True
+
+    store.pool = _Pool()
+    assert store.conn() == "pooled-conn"
+    store.close()
+    assert store.pool.closed
+
+
+class _FakeIndices:
+    def __init__(self) -> None:
+        self.calls: list[tuple] = []
+
+    def get_settings(self, index: str, name: str) -> dict:
+        return {index: {"settings": {"index": {"refresh_interval": "5s"}}}}
+
+    def put_settings(self, index: str, body: dict) -> None:
+        self.calls.append(("put_settings", body["index"]["refresh_interval"]))
+
+    def refresh(self, index: str) -> None:
+        self.calls.append(("refresh",))
+
+
+class _FakeOpenSearch:
+    def __init__(self) -> None:
+        self.indices = _FakeIndices()
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+        self.bulk_bodies: list[str] = []
+        self.msearch_bodies: list[list[dict]] = []
+
+    def msearch(self, body: list[dict], request_timeout: float | None = None) -> dict:
+        self.msearch_bodies.append(body)
+        self.request_timeout = request_timeout
+        responses = []
+        for header, query in zip(body[::2], body[1::2]):
+            text = query["query"]["match"]["text"]
+            hits = [{"_source": {"chunk_id": f"{text}-c", "publication_number": "US1"}, "_score": 2.0}]
+            responses.append({"hits": {"hits": hits}})
+        return {"responses": responses}
+
+    def bulk(self, body: str, **kwargs) -> dict:
+        self.bulk_bodies.append(body)
+        items = []
+        for line in body.splitlines():
+            action = json.loads(line)
+            if "index" in action:
+                items.append({"index": {"status": 201}})
+            elif "delete" in action:
+                doc_id = action["delete"]["_id"]
+                status = 404 if doc_id.startswith("missing") else 200
+                items.append({"delete": {"_id": doc_id, "status": status}})
+        return {"errors": any(i.get("delete", {}).get("status") == 404 for i in items), "items": items}
+
+def test_fetch_chunk_state_and_delete_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    store, log = _store(monkeypatch)
+    log["rows"] = [("c1", "h1", "model@default|normalize=1"), ("c2", "h2", None)]
+    assert store.fetch_chunk_state(["US1"]) == {"c1": ("h1", "model@default|normalize=1"), "c2": ("h2", None)}
+    assert "FROM evidence_chunks WHERE publication_number = ANY(%s)" in log["sql"][0]
+    assert store.fetch_chunk_state([]) == {}
+    assert store.delete_chunks(["c1", "c2"]) == 2
+    assert log["sql"][-1] == "DELETE FROM evidence_chunks WHERE chunk_id = ANY(%s)"
+    assert len(log["sql"]) == 2
+
+
+def test_opensearch_delete_chunks_ignores_missing_documents() -> None:
+    store = OpenSearchStore("http://unused", "chunks", bulk_chunk_size=2, bulk_threads=1)
+    store.client = _FakeOpenSearch()
+    assert store.delete_chunks(["c1", "missing-1", "c2"]) == 2
+    assert len(store.client.bulk_bodies) == 2
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_index_chunks_uses_bulk_requests(threads: int) -> None:
+    store = OpenSearchStore("http://unused", "chunks", bulk_chunk_size=2, bulk_threads=threads)
+    store.client = _FakeOpenSearch()
+    indexed = store.index_chunks([_chunk(f"c{i}") for i in range(5)], refresh=False)
+    assert indexed == 5
+    assert len(store.client.bulk_bodies) == 3
+    assert store.client.indices.calls == []
+
+
+def test_bulk_ingest_mode_restores_refresh_interval_and_refreshes_once() -> None:
+    store = OpenSearchStore("http://unused", "chunks", bulk_threads=1)
+    store.client = _FakeOpenSearch()
+    with store.bulk_ingest_mode():
+        store.index_chunks([_chunk("c1")], refresh=False)
+        store.index_chunks([_chunk("c2")], refresh=False)
+    assert store.client.indices.calls == [("put_settings", "-1"), ("put_settings", "5s"), ("refresh",)]
+
+
+def test_bm25_msearch_sends_one_request_for_all_queries() -> None:
+    store = OpenSearchStore("http://unused", "chunks", bulk_threads=1)
+    store.client = _FakeOpenSearch()
+    out = store.bm25_msearch(["gpu", "cpu"], 10)
+    assert out == [[("gpu-c", "US1", 2.0, "")], [("cpu-c", "US1", 2.0, "")]]
+    assert len(store.client.msearch_bodies) == 1
+    assert store.client.msearch_bodies[0][0] == {"index": "chunks"}
+    assert store.client.request_timeout == store.search_timeout
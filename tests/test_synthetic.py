@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from patent_mvp.bench import bench_ingest
+from patent_mvp.parser import parse_patent_xml, parse_week_zip
+from patent_mvp.synthetic import SyntheticWeekSpec, iter_synthetic_week, write_synthetic_week
+
+SMALL = dict(patents=12, claims=(3, 6), description_paragraphs=(2, 4), words_per_paragraph=(10, 30))
+
+
+@pytest.mark.parametrize("schema", ["grant", "variant", "mixed"])
+def test_synthetic_grants_parse_the_same_with_both_engines(schema: str) -> None:
+    xml = b"".join(iter_synthetic_week(SyntheticWeekSpec(schema=schema, **SMALL)))
+    walk = parse_patent_xml(xml, engine="walk")
+    assert walk == parse_patent_xml(xml, engine="xpath")
+    assert len(walk) == 12
+    for p in walk:
+        assert 3 <= len(p.claims) <= 6
+        assert p.claims[0]["is_independent"] is True
+        assert p.summary_paragraphs and p.description_paragraphs
+
+
+def test_synthetic_week_is_deterministic_and_honours_cpc_mix(tmp_path) -> None:
+    spec = SyntheticWeekSpec(cpc_mix={"H04L": 1.0}, seed=3, **SMALL)
+    assert list(iter_synthetic_week(spec)) == list(iter_synthetic_week(spec))
+    zip_path = write_synthetic_week(tmp_path, spec)
+    assert zip_path.name == "ipg20250107.zip"
+    records = parse_week_zip(zip_path, tmp_path / "parsed", cpc_prefix="H04L")
+    assert len(records) == 12
+    assert all(code.startswith("H04L") for p in records for code in p.cpc_codes)
+    assert parse_week_zip(zip_path, tmp_path / "parsed", cpc_prefix="G06F") == []
+
+
+def test_synthetic_spec_rejects_unknown_schema() -> None:
+    with pytest.raises(ValueError):
+        SyntheticWeekSpec(schema="application")
+
+
+@pytest.mark.parametrize("writer", ["bulk", "rows"])
+def test_bench_ingest_reports_every_stage(tmp_path, writer: str) -> None:
+    report = bench_ingest(
+        patents=10, claims=(2, 4), description_paragraphs=(2, 3), words_per_paragraph=(10, 20),
+        writer=writer, batch_size=16, dim=32, trace_memory=True, workdir=str(tmp_path),
+    )
+    stages = report["stages"]
+    assert list(stages) == ["parse", "chunk", "embed", "postgres", "opensearch"]
+    assert stages["parse"]["patents"] == 10
+    assert stages["parse"]["docs_per_sec"] > 0 and stages["parse"]["mb_per_sec"] > 0
+    n_chunks = stages["chunk"]["chunks"]
+    assert stages["embed"]["chunks"] == n_chunks == stages["opensearch"]["chunks"]
+    assert stages["postgres"]["rows"] == 10 + n_chunks
+    assert "peak_traced_mb" in stages["embed"]
+    assert report["max_rss_mb"]["self"] > 0
+    if writer == "bulk":
+        assert stages["postgres"]["copy_rows"] >= 10 + n_chunks
+    else:
+        assert "copy_rows" not in stages["postgres"]
+        assert stages["postgres"]["statements"] >= 10 + 2 * n_chunks
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from patent_mvp.embeddings import EmbeddingProvider
+from patent_mvp.search import hybrid_search
+from patent_mvp.vector_index import LocalVectorIndex, open_vector_index, top_k_indices
+
+
+def _corpus(n: int = 500, dim: int = 16, seed: int = 0) -> tuple[list[str], list[str], np.ndarray]:
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((n, dim)).astype(np.float32)
+    return [f"c{i}" for i in range(n)], [f"US{i // 4}" for i in range(n)], matrix
+
+
+def _brute_force(matrix: np.ndarray, query: np.ndarray, k: int) -> list[int]:
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores, kind="stable")[:k])
+
+
+def test_blocked_search_matches_brute_force() -> None:
+    ids, pubs, matrix = _corpus()
+    index = LocalVectorIndex(ids, pubs, matrix, block_rows=37)
+    queries = np.random.default_rng(1).standard_normal((5, 16)).astype(np.float32)
+
+    batch = index.vector_search_batch(queries, topk=10)
+
+    assert len(batch) == 5
+    for query, rows in zip(queries, batch):
+        assert [r[0] for r in rows] == [ids[i] for i in _brute_force(matrix, query, 10)]
+        assert rows[0][1] == pubs[int(rows[0][0][1:])]
+        assert all(a[2] >= b[2] for a, b in zip(rows, rows[1:])) and rows[0][2] <= 1.0 + 1e-6
+    single = index.vector_search(queries[0], topk=10, ef_search=40, probes=5)
+    assert [r[0] for r in single] == [r[0] for r in batch[0]]
+    assert len(index.vector_search(queries[0], topk=10_000)) == len(ids)
+    assert index.vector_search_batch([], topk=10) == []
+    assert list(top_k_indices(np.array([0.1, 0.9, 0.5]), 2)) == [1, 2]
+
+
+def test_save_load_round_trip_is_memory_mapped(tmp_path: Path) -> None:
+    ids, pubs, matrix = _corpus(n=120)
+    rows = zip(ids, pubs, matrix.tolist())
+    built = LocalVectorIndex.from_rows(rows, dim=16, batch_rows=50)
+    built.save(tmp_path / "index")
+
+    loaded = open_vector_index("local", tmp_path / "index")
+
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.describe() == {"rows": 120, "dim": 16, "bytes": 120 * 16 * 4}
+    assert np.allclose(np.linalg.norm(loaded.matrix, axis=1), 1.0, atol=1e-5)
+    assert [r[0] for r in loaded.vector_search(matrix[7], topk=3)] == [r[0] for r in built.vector_search(matrix[7], topk=3)]
+    assert loaded.vector_search(matrix[7], topk=1)[0][:2] == ("c7", "US1")
+    assert open_vector_index("pgvector") is None
+    with pytest.raises(ValueError):
+        open_vector_index("faiss")
+    with pytest.raises(ValueError):
+        LocalVectorIndex(ids[:3], pubs, matrix)
+
+
+def test_from_columnar_joins_publication_numbers(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    from patent_mvp.columnar import ColumnarStore
+    from patent_mvp.models import EvidenceChunk
+
+    store = ColumnarStore(tmp_path)
+    chunks = [
+        EvidenceChunk(f"US{i}B2:abstract:0", f"US{i}B2", "abstract", f"text {i}", metadata={"text_hash": str(i)})
+        for i in range(4)
+    ]
+    writer = store.writer("20250107", dim=3)
+    writer.write_chunks(chunks)
+    writer.write_embeddings(chunks, np.eye(4, 3, dtype=np.float32) + 0.01)
+    writer.close()
+
+    index = LocalVectorIndex.from_columnar(store)
+
+    assert len(index) == 4
+    assert index.vector_search([0.0, 1.0, 0.0], topk=1)[0][:2] == ("US1B2:abstract:0", "US1B2")
+
+
+class _Embedder(EmbeddingProvider):
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+
+class _Postgres:
+    def vector_search(self, *args, **kwargs):
+        raise AssertionError("the local index should serve the vector leg")
+
+    def graph_expand_patents(self, patents: set[str], limit: int = 300) -> set[str]:
+        return set()
+
+
+class _OpenSearch:
+    def bm25_search(self, query: str, topk: int) -> list[tuple[str, str, float, str]]:
+        return [("c2", "US2", 5.0, "snippet")]
+
+
+def test_hybrid_search_uses_local_vector_index() -> None:
+    index = LocalVectorIndex(["c1", "c2"], ["US1", "US2"], np.array([[1.0, 0.0], [0.0, 1.0]]))
+
+    out = hybrid_search("q", _Embedder(), _Postgres(), _OpenSearch(), topk=10, vector_index=index)
+
+    assert out["degraded"] == []
+    assert {c["chunk_id"] for c in out["chunks"]} == {"c1", "c2"}